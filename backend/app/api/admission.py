@@ -0,0 +1,148 @@
+# backend/app/api/admission.py
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Tuple
+from fastapi import HTTPException, Request
+from starlette.requests import HTTPConnection
+from .. import config
+from ..services.metrics import metrics
+from .sessions import resolve_session_id
+
+class AdmissionController:
+    """Concurrency limit with a bounded wait queue for one endpoint class
+    
+    Requests beyond ``max_concurrent`` wait for a slot; once ``max_queue``
+    are already waiting, or a slot doesn't free up within ``queue_timeout``,
+    the request is shed with 503 instead of piling up behind the others.
+    """
+    
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_concurrent)
+    
+    def _reject(self, reason: str):
+        metrics.inc("admission_rejected_total", endpoint_class=self.name, reason=reason)
+        # Rough guess at when a slot frees up: one queue timeout
+        retry_after = max(1, math.ceil(self.queue_timeout))
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server busy ({self.name} requests), try again shortly",
+            headers={"Retry-After": str(retry_after)}
+        )
+    
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the request"""
+        if not self._slots.locked():
+            await self._slots.acquire()  # Free slot, no waiting
+        elif self.waiting >= self.max_queue:
+            self._reject("queue_full")
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject("queue_timeout")
+            finally:
+                self.waiting -= 1
+        
+        self.active += 1
+        metrics.inc("admission_admitted_total", endpoint_class=self.name)
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+class RateLimiter:
+    """Per-key token buckets: ``rate`` requests per second with ``burst`` headroom
+    
+    ``factor`` scales both for one check, e.g. for a bucket shared by every
+    session behind one client address.
+    """
+    
+    def __init__(self, name: str, rate: float, burst: int, max_keys: int = 10000):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+    
+    def check(self, key: str, factor: float = 1.0):
+        """Take a token for ``key`` or raise 429 with Retry-After"""
+        if self.rate <= 0:
+            return
+        
+        rate = self.rate * factor
+        burst = max(1.0, self.burst * factor)
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            metrics.inc("rate_limited_total", endpoint_class=self.name)
+            retry_after = max(1, math.ceil((1 - tokens) / rate))
+            raise HTTPException(
+                status_code=429,
+                detail=f"Too many {self.name} requests, slow down",
+                headers={"Retry-After": str(retry_after)}
+            )
+        
+        # Re-inserted last so the dict stays ordered by recent use
+        self._buckets[key] = (tokens - 1, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.pop(next(iter(self._buckets)))
+
+controllers: Dict[str, AdmissionController] = {
+    name: AdmissionController(name, concurrency, queue, config.ADMISSION_QUEUE_TIMEOUT)
+    for name, (concurrency, queue) in config.ADMISSION_LIMITS.items()
+}
+rate_limiters: Dict[str, RateLimiter] = {
+    name: RateLimiter(name, rate, burst)
+    for name, (rate, burst) in config.RATE_LIMITS.items()
+}
+
+def rate_limit(endpoint_class: str) -> Callable:
+    """Dependency factory: apply the per-session and per-client rate limits of ``endpoint_class``"""
+    limiter = rate_limiters.get(endpoint_class)
+    
+    def dependency(request: HTTPConnection):
+        if limiter:
+            client = request.client.host if request.client else "unknown"
+            limiter.check(f"client:{client}", config.RATE_LIMIT_CLIENT_FACTOR)
+            session_id = resolve_session_id(request)
+            if session_id:
+                limiter.check(f"session:{session_id}")
+    
+    return dependency
+
+def admission(endpoint_class: str) -> Callable:
+    """Dependency factory: rate-limit the caller, then wait for a slot of ``endpoint_class``"""
+    async def dependency(request: Request) -> AsyncIterator[None]:
+        async with admit(request, endpoint_class):
+            yield
+    
+    return dependency
+
+@asynccontextmanager
+async def admit(connection: HTTPConnection, endpoint_class: str) -> AsyncIterator[None]:
+    """Rate-limit ``connection`` and hold a slot of ``endpoint_class``, for
+    work that doesn't arrive as a route (e.g. WebSocket commands)"""
+    rate_limit(endpoint_class)(connection)
+    async with controllers[endpoint_class].admit():
+        yield
+
+def _collect_admission(registry):
+    for name, controller in controllers.items():
+        registry.set_gauge("admission_active", controller.active, endpoint_class=name)
+        registry.set_gauge("admission_queue_depth", controller.waiting, endpoint_class=name)
+
+metrics.add_collector(_collect_admission)
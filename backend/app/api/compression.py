@@ -0,0 +1,69 @@
+# backend/app/api/compression.py
+import gzip
+from typing import Callable, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from .. import config
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """Parse an Accept-Encoding header, dropping codings with q=0"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if coding:
+            accepted.add(coding)
+    return accepted
+
+
+def compress_body(body: bytes, accept_encoding: str, level: int) -> Tuple[bytes, Optional[str]]:
+    """Compress a response body with the best coding the client accepts
+
+    Returns the (possibly unchanged) body and the Content-Encoding used.
+    """
+    if level <= 0 or len(body) < config.COMPRESSION_MIN_SIZE:
+        return body, None
+
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return brotli.compress(body, quality=min(level, 11)), "br"
+    if "gzip" in accepted or "*" in accepted:
+        return gzip.compress(body, compresslevel=min(level, 9)), "gzip"
+    return body, None
+
+
+class CompressedRoute(APIRoute):
+    """API route that compresses large JSON bodies
+
+    The level comes from COMPRESSION_ROUTE_LEVELS for this path, falling back
+    to COMPRESSION_LEVEL, so heavy state routes can trade CPU for bandwidth
+    independently of small control routes.
+    """
+
+    def get_route_handler(self) -> Callable:
+        original_handler = super().get_route_handler()
+        level = config.COMPRESSION_ROUTE_LEVELS.get(self.path, config.COMPRESSION_LEVEL)
+
+        async def compressed_handler(request: Request) -> Response:
+            response = await original_handler(request)
+            # Streaming responses and empty bodies (e.g. 304) are left alone
+            body = getattr(response, "body", None)
+            if not body or "content-encoding" in response.headers:
+                return response
+
+            compressed, encoding = compress_body(body, request.headers.get("accept-encoding", ""), level)
+            response.headers["vary"] = "Accept-Encoding"
+            if encoding:
+                response.body = compressed
+                response.headers["content-encoding"] = encoding
+                response.headers["content-length"] = str(len(compressed))
+            return response
+
+        return compressed_handler
@@ -0,0 +1,16 @@
+# backend/app/api/responses.py
+from typing import Any
+from fastapi.responses import Response
+from ..encoding import dumps, dumps_text
+
+
+class FastJSONResponse(Response):
+    """JSON response that skips FastAPI's jsonable_encoder and response_model validation
+
+    Returning an instance of this class from a route hands the body straight
+    to ``dumps``, so trusted simulation state is encoded exactly once.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
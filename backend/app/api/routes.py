@@ -1,9 +1,17 @@
 # backend/app/api/routes.py (UPDATE)
-from fastapi import APIRouter, HTTPException
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import AsyncIterator, List, Optional
+import threading
+import time
 import traceback
 from ..models.pydantic_models import (
     SimulationRequest,
     SimulationResponse,
+    BatchSimulationRequest,
     UpdateParameterRequest,
     StepRequest,
     CreateObjectRequest,
@@ -11,16 +19,65 @@ from ..models.pydantic_models import (
     CircularMotionRequest,
     CollisionSettingsRequest,
     ScenarioPresetRequest,
-    VectorModel
+    VectorModel,
+    DetailLevel
 )
 from ..services.simulation_service import SimulationService
+from ..services.executor import simulation_executor
+from ..services.session_manager import session_manager
+from ..services.batch_service import parse_batch
+from .. import config
 from ..physics.vector import Vector
+from .responses import FastJSONResponse, dumps_text
+from .compression import CompressedRoute
+from .sessions import get_simulation_service
+from .admission import admission, controllers, rate_limit
 
-router = APIRouter()
-simulation_service = SimulationService()
+router = APIRouter(default_response_class=FastJSONResponse, route_class=CompressedRoute)
 
-@router.post("/simulate", response_model=SimulationResponse)
-async def create_simulation(request: SimulationRequest):
+# Endpoint classes for admission control: LLM parsing is slow and costly,
+# stepping and preset builds are CPU-bound, everything else is cheap
+LLM = [Depends(admission("llm"))]
+HEAVY = [Depends(admission("heavy"))]
+CHEAP = [Depends(admission("cheap"))]
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Split a comma-separated ?fields= query value"""
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()]
+
+async def _offload(simulation_service: SimulationService, fn, *args, **kwargs):
+    """Run a synchronous service call on the session's simulation lane"""
+    return await simulation_executor.run(simulation_service.session_id, fn, *args, **kwargs)
+
+@asynccontextmanager
+async def _cancel_on_disconnect(
+    http_request: Request,
+    cancel_event: threading.Event,
+    interval: float = config.DISCONNECT_POLL_INTERVAL
+) -> AsyncIterator[None]:
+    """Set ``cancel_event`` if the client disconnects while the block runs
+
+    Starlette doesn't cancel a handler when its client goes away, so the
+    connection is polled instead.
+    """
+    async def watch():
+        while not await http_request.is_disconnected():
+            await asyncio.sleep(interval)
+        cancel_event.set()
+    
+    watcher = asyncio.create_task(watch())
+    try:
+        yield
+    finally:
+        watcher.cancel()
+
+@router.post("/simulate", response_model=SimulationResponse, response_class=FastJSONResponse, dependencies=LLM)
+async def create_simulation(
+    request: SimulationRequest,
+    simulation_service: SimulationService = Depends(get_simulation_service)
+):
     """Create a new simulation from natural language problem"""
     try:
         result = await simulation_service.create_from_text(request.problem_text)
@@ -30,7 +87,9 @@ async def create_simulation(request: SimulationRequest):
             print(f"Simulation creation failed: {error_msg}")
             raise HTTPException(status_code=400, detail=error_msg)
         
-        return SimulationResponse(**result)
+        # response_model documents the shape; returning the response directly
+        # skips re-validating the engine-produced world state
+        return FastJSONResponse(result)
     except HTTPException:
         raise
     except Exception as e:
@@ -38,38 +97,121 @@ async def create_simulation(request: SimulationRequest):
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/preset")
-async def create_preset(request: ScenarioPresetRequest):
+@router.post("/simulate/stream", dependencies=[Depends(rate_limit("llm"))])
+async def create_simulation_stream(
+    request: SimulationRequest,
+    simulation_service: SimulationService = Depends(get_simulation_service)
+):
+    """Create a simulation from text, streaming NDJSON progress
+
+    Emits ``partial`` world states as the model finishes each entity, so
+    the client can draw a first frame early, then ``complete`` or ``error``.
+    """
+    # Take the LLM slot now so overload is still a plain 503; it is held
+    # until the stream ends, including when the client disconnects
+    slot = AsyncExitStack()
+    await slot.enter_async_context(controllers["llm"].admit())
+    # The dependency unpins the session before the body is streamed; keep
+    # it pinned until the stream is done so it can't be evicted meanwhile
+    session_id = simulation_service.session_id
+    session_manager.pin(session_id)
+    
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in simulation_service.create_from_text_stream(request.problem_text):
+                yield dumps_text(event) + "\n"
+        except Exception as e:
+            print(f"Exception in create_simulation_stream: {str(e)}")
+            print(traceback.format_exc())
+            yield dumps_text({"type": "error", "error_message": str(e)}) + "\n"
+    
+    async def finish():
+        await slot.aclose()
+        session_manager.unpin(session_id)
+        await session_manager.release(session_id)
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson", background=BackgroundTask(finish))
+
+@router.post("/simulate/batch", dependencies=[Depends(rate_limit("llm"))])
+async def create_simulation_batch(request: BatchSimulationRequest):
+    """Parse a list of problems (e.g. a worksheet), streaming NDJSON results
+
+    Emits one ``item`` line per problem as soon as it is parsed (with its
+    ``index``; ``world_state`` too when ``build_worlds`` is set), then a
+    ``done`` summary. Sessions are not touched.
+    """
+    # The whole batch holds one LLM slot; it bounds its own model calls
+    slot = AsyncExitStack()
+    await slot.enter_async_context(controllers["llm"].admit())
+    
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in parse_batch(request.problems, request.build_worlds):
+                yield dumps_text(event) + "\n"
+        except Exception as e:
+            print(f"Exception in create_simulation_batch: {str(e)}")
+            print(traceback.format_exc())
+            yield dumps_text({"type": "error", "error_message": str(e)}) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson", background=BackgroundTask(slot.aclose))
+
+@router.post("/preset", dependencies=HEAVY)
+async def create_preset(
+    request: ScenarioPresetRequest,
+    simulation_service: SimulationService = Depends(get_simulation_service)
+):
     """Create simulation from preset"""
-    result = simulation_service.create_preset(request.preset_name, request.parameters)
+    result = await _offload(simulation_service, simulation_service.create_preset, request.preset_name, request.parameters)
     
     if not result.get("success"):
         raise HTTPException(status_code=400, detail=result.get("error_message"))
     
-    return result
+    return FastJSONResponse(result)
 
-@router.post("/step")
-async def step_simulation(request: StepRequest):
+@router.post("/step", dependencies=HEAVY)
+async def step_simulation(
+    request: StepRequest,
+    http_request: Request,
+    simulation_service: SimulationService = Depends(get_simulation_service)
+):
     """Advance simulation by specified steps"""
-    result = simulation_service.step(request.num_steps)
+    # Stepping stops at the time budget or when the client goes away
+    cancel_event = threading.Event()
+    async with _cancel_on_disconnect(http_request, cancel_event):
+        result = await simulation_executor.run(
+            simulation_service.session_id,
+            simulation_service.step,
+            request.num_steps,
+            request.detail,
+            request.fields,
+            deadline=time.monotonic() + config.STEP_TIME_BUDGET,
+            cancel_event=cancel_event
+        )
     
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     
-    return result
+    return FastJSONResponse(result)
 
-@router.post("/step-once")
-async def step_once():
+@router.post("/step-once", dependencies=HEAVY)
+async def step_once(
+    detail: DetailLevel = "full",
+    fields: Optional[str] = Query(None),
+    simulation_service: SimulationService = Depends(get_simulation_service)
+):
     """Execute single step (for step-by-step mode)"""
-    result = simulation_service.step_once()
+    result = await _offload(simulation_service, simulation_service.step_once, detail, _parse_fields(fields))
     
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     
-    return result
+    return FastJSONResponse(result)
 
-@router.post("/add-object")
-async def add_object(request: CreateObjectRequest):
+@router.post("/add-object", dependencies=CHEAP)
+async def add_object(
+    request: CreateObjectRequest,
+    simulation_service: SimulationService = Depends(get_simulation_service)
+):
     """Add a new object to the simulation"""
     obj_data = {
         "mass": request.mass,
@@ -83,17 +225,21 @@ async def add_object(request: CreateObjectRequest):
         "height": request.height
     }
     
-    result = simulation_service.add_object(obj_data)
+    result = await simulation_service.commands.submit(simulation_service.add_object, obj_data)
     
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     
-    return result
+    return FastJSONResponse(result)
 
-@router.post("/update")
-async def update_parameter(request: UpdateParameterRequest):
+@router.post("/update", dependencies=CHEAP)
+async def update_parameter(
+    request: UpdateParameterRequest,
+    simulation_service: SimulationService = Depends(get_simulation_service)
+):
     """Update simulation parameter"""
-    result = simulation_service.update_parameter(
+    result = await simulation_service.commands.submit(
+        simulation_service.update_parameter,
         request.object_id,
         request.parameter,
         request.value
@@ -102,10 +248,13 @@ async def update_parameter(request: UpdateParameterRequest):
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     
-    return result
+    return FastJSONResponse(result)
 
-@router.post("/update-world")
-async def update_world(request: UpdateWorldRequest):
+@router.post("/update-world", dependencies=CHEAP)
+async def update_world(
+    request: UpdateWorldRequest,
+    simulation_service: SimulationService = Depends(get_simulation_service)
+):
     """Update world settings"""
     updates = {}
     if request.gravity_enabled is not None:
@@ -115,18 +264,22 @@ async def update_world(request: UpdateWorldRequest):
     if request.collision_enabled is not None:
         updates["collision_enabled"] = request.collision_enabled
     
-    result = simulation_service.update_world(updates)
+    result = await simulation_service.commands.submit(simulation_service.update_world, updates)
     
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     
-    return result
+    return FastJSONResponse(result)
 
-@router.post("/circular-motion")
-async def set_circular_motion(request: CircularMotionRequest):
+@router.post("/circular-motion", dependencies=CHEAP)
+async def set_circular_motion(
+    request: CircularMotionRequest,
+    simulation_service: SimulationService = Depends(get_simulation_service)
+):
     """Set circular motion for an object"""
     center = Vector(request.center.x, request.center.y)
-    result = simulation_service.set_circular_motion(
+    result = await simulation_service.commands.submit(
+        simulation_service.set_circular_motion,
         request.object_id,
         center,
         request.radius,
@@ -138,12 +291,16 @@ async def set_circular_motion(request: CircularMotionRequest):
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     
-    return result
+    return FastJSONResponse(result)
 
-@router.post("/collision-settings")
-async def set_collision_settings(request: CollisionSettingsRequest):
+@router.post("/collision-settings", dependencies=CHEAP)
+async def set_collision_settings(
+    request: CollisionSettingsRequest,
+    simulation_service: SimulationService = Depends(get_simulation_service)
+):
     """Set collision settings for an object"""
-    result = simulation_service.set_collision_settings(
+    result = await simulation_service.commands.submit(
+        simulation_service.set_collision_settings,
         request.object_id,
         request.collision_type,
         request.restitution
@@ -152,52 +309,93 @@ async def set_collision_settings(request: CollisionSettingsRequest):
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     
-    return result
+    return FastJSONResponse(result)
 
-@router.post("/reset")
-async def reset_simulation():
+@router.post("/reset", dependencies=CHEAP)
+async def reset_simulation(simulation_service: SimulationService = Depends(get_simulation_service)):
     """Reset simulation to initial state"""
-    result = simulation_service.reset()
+    result = await simulation_service.commands.submit(simulation_service.reset)
     
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     
-    return result
+    return FastJSONResponse(result)
 
-@router.post("/start")
-async def start_simulation():
+@router.post("/start", dependencies=CHEAP)
+async def start_simulation(simulation_service: SimulationService = Depends(get_simulation_service)):
     """Start simulation"""
-    simulation_service.start()
+    await _offload(simulation_service, simulation_service.start)
     return {"status": "started"}
 
-@router.post("/stop")
-async def stop_simulation():
+@router.post("/stop", dependencies=CHEAP)
+async def stop_simulation(simulation_service: SimulationService = Depends(get_simulation_service)):
     """Stop simulation"""
-    simulation_service.stop()
+    await _offload(simulation_service, simulation_service.stop)
     return {"status": "stopped"}
 
-@router.get("/state")
-async def get_state():
-    """Get current simulation state"""
-    if simulation_service.world:
-        return simulation_service.world.to_dict()
-    else:
-        raise HTTPException(status_code=404, detail="No active simulation")
+@router.get("/state", dependencies=CHEAP)
+async def get_state(
+    request: Request,
+    detail: DetailLevel = "full",
+    fields: Optional[str] = Query(None),
+    simulation_service: SimulationService = Depends(get_simulation_service)
+):
+    """Get current simulation state
 
-# backend/app/api/routes.py (ADD new endpoint)
-@router.post("/circular-motion-radius")
-async def update_circular_motion_radius(object_id: str, radius: float):
-    """Update circular motion radius"""
+    ``detail`` picks a field set (minimal, render, analysis, full) and
+    ``fields`` is an optional comma-separated list that overrides it.
+    The encoded state is cached until the world changes and answers
+    ``If-None-Match`` with 304.
+    """
     if not simulation_service.world:
-        raise HTTPException(status_code=400, detail="No active simulation")
+        raise HTTPException(status_code=404, detail="No active simulation")
+    
+    try:
+        etag, body = await _offload(
+            simulation_service,
+            simulation_service.get_state_payload,
+            detail,
+            _parse_fields(fields)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    obj = simulation_service.world.get_object(object_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Object not found")
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
     
-    if not obj.circular_motion or not obj.circular_motion.enabled:
-        raise HTTPException(status_code=400, detail="Object is not in circular motion")
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+# backend/app/api/routes.py (ADD new endpoint)
+@router.post("/circular-motion-radius", dependencies=CHEAP)
+async def update_circular_motion_radius(
+    object_id: str,
+    radius: float,
+    simulation_service: SimulationService = Depends(get_simulation_service)
+):
+    """Update circular motion radius"""
+    result = await simulation_service.commands.submit(
+        simulation_service.set_circular_motion_radius,
+        object_id,
+        radius
+    )
     
-    obj.circular_motion.set_radius(radius)
+    if "error" in result:
+        raise HTTPException(status_code=result.get("status_code", 400), detail=result["error"])
     
-    return {"success": True, "world_state": simulation_service.world.to_dict()}
+    return FastJSONResponse(result)
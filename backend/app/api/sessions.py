@@ -0,0 +1,83 @@
+# backend/app/api/sessions.py
+from typing import AsyncIterator, Optional
+from fastapi import Request, WebSocket
+from .. import config
+from ..services.session_manager import session_manager
+from ..services.simulation_service import SimulationService
+
+def resolve_session_id(connection) -> Optional[str]:
+    """Read the session ID from the path, header, query string or cookie"""
+    return (
+        connection.path_params.get("session_id")
+        or connection.headers.get(config.SESSION_HEADER)
+        or connection.query_params.get("session_id")
+        or connection.cookies.get(config.SESSION_COOKIE)
+    )
+
+def get_session_id(request: Request) -> str:
+    """Dependency: the caller's session ID, minting a new one if absent"""
+    session_id = resolve_session_id(request)
+    if not session_id:
+        session_id = session_manager.new_session_id()
+        # Picked up by SessionCookieMiddleware on the way out
+        request.state.new_session_id = session_id
+    return session_id
+
+async def get_simulation_service(request: Request) -> AsyncIterator[SimulationService]:
+    """Dependency: the SimulationService for the caller's session
+
+    The session is pinned in memory while the route runs and saved to the
+    snapshot store (if any) once it is done.
+    """
+    session_id = get_session_id(request)
+    session_manager.pin(session_id)
+    try:
+        service = await session_manager.acquire(session_id)
+        try:
+            yield service
+        finally:
+            await session_manager.release(session_id)
+    finally:
+        session_manager.unpin(session_id)
+
+async def get_websocket_service(websocket: WebSocket) -> tuple:
+    """Resolve (session_id, service) for a WebSocket connection
+
+    A newly minted session ID is left on ``websocket.state`` so the endpoint
+    can send it to the client once the socket is accepted.
+    """
+    session_id = resolve_session_id(websocket)
+    if not session_id:
+        session_id = session_manager.new_session_id()
+        websocket.state.new_session_id = session_id
+    return session_id, await session_manager.acquire(session_id)
+
+class SessionCookieMiddleware:
+    """ASGI middleware that hands newly minted session IDs back to the client
+
+    Works for routes that return Response objects directly, which bypass
+    the dependency-injected response headers.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_session(message):
+            if message["type"] == "http.response.start":
+                session_id = scope.get("state", {}).get("new_session_id")
+                if session_id:
+                    headers = list(message.get("headers", []))
+                    headers.append((config.SESSION_HEADER.lower().encode(), session_id.encode()))
+                    headers.append((
+                        b"set-cookie",
+                        f"{config.SESSION_COOKIE}={session_id}; Path=/; HttpOnly; SameSite=Lax".encode()
+                    ))
+                    message["headers"] = headers
+            await send(message)
+        
+        await self.app(scope, receive, send_with_session)
@@ -1,34 +1,209 @@
 # backend/app/api/websocket.py
-from fastapi import WebSocket, WebSocketDisconnect
-from typing import List
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+from typing import Dict, List, Optional, Sequence
 import asyncio
 import json
+import logging
+from .. import config
+from ..physics.world import resolve_projection
+from ..services.session_manager import session_manager
+from ..services.executor import simulation_executor
+from .responses import dumps_text
+from .admission import admit, controllers
+
+logger = logging.getLogger(__name__)
+
+# Admission class of each command, matching the REST routes that do the same
+COMMAND_CLASSES = {
+    "subscribe": "cheap",
+    "step": "heavy",
+    "start": "heavy",
+    "stop": "cheap",
+}
+
+class ClientConnection:
+    """A connected client with its own bounded send queue and sender task"""
+    
+    def __init__(self, websocket: WebSocket, session_id: str, queue_size: int):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+        
+        # State projection, set by a "subscribe" command
+        self.detail = "full"
+        self.fields: Optional[Sequence[str]] = None
+    
+    @property
+    def projection(self) -> tuple:
+        return (self.detail, tuple(self.fields) if self.fields else None)
 
 class ConnectionManager:
-    """Manage WebSocket connections"""
+    """Manage WebSocket connections
+
+    Clients are grouped by simulation session. Every frame is encoded once
+    and queued to each client of the session; a per-client sender task does
+    the actual socket writes, so one slow viewer never delays the others.
+    Clients whose queue fills up or whose send fails or times out are evicted.
+    """
     
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, queue_size: int = config.WS_SEND_QUEUE_SIZE, send_timeout: float = config.WS_SEND_TIMEOUT):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        self.session_connections: Dict[str, Dict[WebSocket, ClientConnection]] = {}
+        self.steppers: Dict[str, asyncio.Task] = {}
     
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, session_id: str) -> ClientConnection:
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, session_id, self.queue_size)
+        client.sender = asyncio.create_task(self._sender(client))
+        self.active_connections[websocket] = client
+        self.session_connections.setdefault(session_id, {})[websocket] = client
+        return client
     
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if not client:
+            return
+        
+        viewers = self.session_connections.get(client.session_id, {})
+        viewers.pop(websocket, None)
+        if not viewers:
+            self.session_connections.pop(client.session_id, None)
+        if client.sender and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+    
+    def _evict(self, client: ClientConnection, reason: str):
+        """Drop a dead or slow client and close its socket in the background"""
+        logger.warning("Evicting WebSocket client of session %s: %s", client.session_id, reason)
+        self.disconnect(client.websocket)
+        asyncio.create_task(self._close(client.websocket))
+    
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), self.send_timeout)
+        except Exception:
+            pass  # The socket is already gone
+    
+    async def _sender(self, client: ClientConnection):
+        """Write queued frames to one client"""
+        while True:
+            frame = await client.queue.get()
+            try:
+                await asyncio.wait_for(client.websocket.send_text(frame), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self._evict(client, "send timed out")
+                return
+            except Exception as e:
+                self._evict(client, f"send failed: {e}")
+                return
+    
+    def _enqueue(self, client: ClientConnection, frame: str):
+        try:
+            client.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self._evict(client, "send queue full")
+    
+    async def send(self, websocket: WebSocket, message: dict):
+        """Queue a message for a single client"""
+        client = self.active_connections.get(websocket)
+        if client:
+            self._enqueue(client, dumps_text(message))
+    
+    def session_clients(self, session_id: str) -> List[ClientConnection]:
+        return list(self.session_connections.get(session_id, {}).values())
+    
+    async def broadcast(self, session_id: str, message: dict):
+        """Encode a message once and queue it for every client of a session"""
+        frame = dumps_text(message)
+        for client in self.session_clients(session_id):
+            self._enqueue(client, frame)
     
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
+    async def broadcast_state(self, session_id: str, simulation_service):
+        """Queue the world state to a session's clients, serializing once per projection"""
+        clients = self.session_clients(session_id)
+        if not clients:
+            return
+        
+        projections = {client.projection for client in clients}
+        frames = await simulation_executor.run(session_id, _encode_frames, simulation_service, projections)
+        for client in clients:
+            self._enqueue(client, frames[client.projection])
+    
+    def start_stepper(self, session_id: str, simulation_service):
+        """Drive a session's simulation from a single task shared by all its viewers"""
+        stepper = self.steppers.get(session_id)
+        if stepper is None or stepper.done():
+            self.steppers[session_id] = asyncio.create_task(self._run_stepper(session_id, simulation_service))
+    
+    async def shutdown(self):
+        """Stop all steppers and close every client, for server shutdown"""
+        steppers = list(self.steppers.values())
+        for stepper in steppers:
+            stepper.cancel()
+        await asyncio.gather(*steppers, return_exceptions=True)
+        
+        for client in list(self.active_connections.values()):
+            self.disconnect(client.websocket)
             try:
-                await connection.send_json(message)
-            except:
+                await asyncio.wait_for(client.websocket.close(code=1001), self.send_timeout)
+            except Exception:
                 pass
+    
+    async def _run_stepper(self, session_id: str, simulation_service):
+        session_manager.pin(session_id)
+        try:
+            # Send updates in real-time
+            while simulation_service.simulator and simulation_service.simulator.is_running:
+                # Every frame is stepping work, admitted like a REST /step;
+                # when the server is saturated frames are skipped
+                try:
+                    async with controllers["heavy"].admit():
+                        await simulation_executor.run(session_id, simulation_service.advance, 1)
+                        session_manager.touch(session_id)
+                        await self.broadcast_state(session_id, simulation_service)
+                except HTTPException:
+                    pass
+                await asyncio.sleep(config.WS_FRAME_INTERVAL)
+        finally:
+            self.steppers.pop(session_id, None)
+            session_manager.unpin(session_id)
+        
+        # Snapshot once the run ends rather than on every frame
+        await session_manager.release(session_id)
+
+def _encode_frames(simulation_service, projections) -> Dict[tuple, str]:
+    """Encode the current state once per (detail, fields) projection
+
+    Encodings come from the session's StateCache, so viewers of an unchanged
+    world (and /state polls of the same version) share them.
+    """
+    if not simulation_service.world:
+        frame = dumps_text({"error": "No active simulation"})
+        return {projection: frame for projection in projections}
+    return {
+        (detail, fields): simulation_service.get_state_payload(detail, list(fields) if fields else None)[1].decode("utf-8")
+        for detail, fields in projections
+    }
 
 manager = ConnectionManager()
 
-async def websocket_endpoint(websocket: WebSocket, simulation_service):
+async def websocket_endpoint(websocket: WebSocket, session_id: str, simulation_service):
     """WebSocket endpoint for real-time simulation updates"""
-    await manager.connect(websocket)
+    # Viewers keep their session in memory for as long as they're connected
+    session_manager.pin(session_id)
+    try:
+        client = await manager.connect(websocket, session_id)
+    except BaseException:
+        session_manager.unpin(session_id)
+        raise
+    
+    # Without its ID the client couldn't reach this session over REST
+    if getattr(websocket.state, "new_session_id", None):
+        await manager.send(websocket, {"type": "session", "session_id": session_id})
     
     try:
         while True:
@@ -36,21 +211,54 @@ async def websocket_endpoint(websocket: WebSocket, simulation_service):
             data = await websocket.receive_text()
             command = json.loads(data)
             
-            if command["type"] == "step":
-                result = simulation_service.step(1)
-                await websocket.send_json(result)
-            
-            elif command["type"] == "start":
-                simulation_service.start()
-                # Send updates in real-time
-                while simulation_service.simulator and simulation_service.simulator.is_running:
-                    result = simulation_service.step(1)
-                    await websocket.send_json(result)
-                    await asyncio.sleep(0.016)  # 60 FPS
-            
-            elif command["type"] == "stop":
-                simulation_service.stop()
-                await websocket.send_json({"status": "stopped"})
+            # Commands pass the same rate limits and admission control as
+            # the REST routes; overload is reported instead of a 429/503
+            try:
+                async with admit(websocket, COMMAND_CLASSES.get(command["type"], "cheap")):
+                    await _handle_command(websocket, client, session_id, command)
+            except HTTPException as e:
+                await manager.send(websocket, {
+                    "error": e.detail,
+                    "status_code": e.status_code,
+                    "retry_after": (e.headers or {}).get("Retry-After")
+                })
                 
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
+        try:
+            await session_manager.release(session_id)
+        finally:
+            session_manager.unpin(session_id)
+
+async def _handle_command(websocket: WebSocket, client: ClientConnection, session_id: str, command: dict):
+    """Apply one client command to its session"""
+    # Re-resolve each time: the session may have been hibernated or
+    # updated by another worker since the last command
+    simulation_service = await session_manager.acquire(session_id)
+    
+    if command["type"] == "subscribe":
+        try:
+            resolve_projection(command.get("detail", "full"), command.get("fields"))
+        except ValueError as e:
+            await manager.send(websocket, {"error": str(e)})
+            return
+        client.detail = command.get("detail", "full")
+        client.fields = command.get("fields")
+        await manager.send(websocket, {"status": "subscribed", "detail": client.detail, "fields": client.fields})
+    
+    elif command["type"] == "step":
+        if not await simulation_executor.run(session_id, simulation_service.advance, 1):
+            await manager.send(websocket, {"error": "No active simulation"})
+            return
+        await manager.broadcast_state(session_id, simulation_service)
+        await session_manager.release(session_id)
+    
+    elif command["type"] == "start":
+        await simulation_executor.run(session_id, simulation_service.start)
+        manager.start_stepper(session_id, simulation_service)
+    
+    elif command["type"] == "stop":
+        await simulation_executor.run(session_id, simulation_service.stop)
+        await manager.broadcast(session_id, {"status": "stopped"})
@@ -0,0 +1,149 @@
+# backend/app/config.py
+import os
+from typing import Dict
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment"""
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting from the environment"""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_mapping(name: str) -> Dict[str, str]:
+    """Read a "key=value,key=value" setting from the environment"""
+    mapping = {}
+    for item in (os.getenv(name) or "").split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            mapping[key.strip()] = value.strip()
+    return mapping
+
+
+# Response compression
+COMPRESSION_MIN_SIZE = env_int("COMPRESSION_MIN_SIZE", 1024)  # bytes
+COMPRESSION_LEVEL = env_int("COMPRESSION_LEVEL", 6)  # 0 disables, 1 (fast) to 9 (small)
+# Per-route overrides, e.g. COMPRESSION_ROUTE_LEVELS="/api/state=9,/api/step=1"
+COMPRESSION_ROUTE_LEVELS = {path: int(level) for path, level in env_mapping("COMPRESSION_ROUTE_LEVELS").items()}
+WS_PER_MESSAGE_DEFLATE = env_bool("WS_PER_MESSAGE_DEFLATE", True)
+
+# WebSocket fan-out
+WS_SEND_QUEUE_SIZE = env_int("WS_SEND_QUEUE_SIZE", 32)  # frames buffered per client before eviction
+WS_SEND_TIMEOUT = env_float("WS_SEND_TIMEOUT", 5.0)  # seconds a single send may take
+WS_FRAME_INTERVAL = env_float("WS_FRAME_INTERVAL", 0.016)  # 60 FPS
+
+# Simulation sessions
+SESSION_MAX_SESSIONS = env_int("SESSION_MAX_SESSIONS", 200)
+SESSION_IDLE_TTL = env_float("SESSION_IDLE_TTL", 1800.0)  # seconds
+SESSION_MAX_MEMORY_BYTES = env_int("SESSION_MAX_MEMORY_BYTES", 8 * 1024 * 1024)  # 0 disables the cap
+SESSION_HEADER = "X-Session-ID"
+SESSION_COOKIE = "session_id"
+
+# Simulation worker threads
+SIM_WORKERS = env_int("SIM_WORKERS", min(8, os.cpu_count() or 1))
+STEP_TIME_BUDGET = env_float("STEP_TIME_BUDGET", 2.0)  # seconds of stepping per request
+DISCONNECT_POLL_INTERVAL = env_float("DISCONNECT_POLL_INTERVAL", 0.1)  # seconds between client disconnect checks
+
+# Session snapshots shared between worker processes ("", "file" or "sqlite")
+SNAPSHOT_STORE = os.getenv("SNAPSHOT_STORE", "")
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "snapshots")  # directory for "file", database file for "sqlite"
+
+# Server processes; more than one worker needs SNAPSHOT_STORE so they share sessions
+WORKERS = env_int("WORKERS", 1)
+
+# Idle session hibernation to compressed local snapshots
+HIBERNATE_AFTER = env_float("HIBERNATE_AFTER", 300.0)  # seconds idle; 0 disables
+HIBERNATE_PATH = os.getenv("HIBERNATE_PATH", "snapshots/hibernated")
+HIBERNATE_COMPRESSION_LEVEL = env_int("HIBERNATE_COMPRESSION_LEVEL", 6)
+HIBERNATE_RETENTION = env_float("HIBERNATE_RETENTION", 7 * 24 * 3600.0)  # seconds before hibernated snapshots are deleted
+SESSION_SWEEP_INTERVAL = env_float("SESSION_SWEEP_INTERVAL", 30.0)  # seconds
+
+# Admission control: (max concurrent, max queued) per endpoint class
+ADMISSION_LIMITS = {
+    "llm": (env_int("ADMISSION_LLM_CONCURRENCY", 4), env_int("ADMISSION_LLM_QUEUE", 16)),
+    "heavy": (env_int("ADMISSION_HEAVY_CONCURRENCY", 16), env_int("ADMISSION_HEAVY_QUEUE", 64)),
+    "cheap": (env_int("ADMISSION_CHEAP_CONCURRENCY", 128), env_int("ADMISSION_CHEAP_QUEUE", 512)),
+}
+ADMISSION_QUEUE_TIMEOUT = env_float("ADMISSION_QUEUE_TIMEOUT", 5.0)  # seconds a request may wait for a slot
+# Per-session token buckets: (requests per second, burst) per endpoint class
+RATE_LIMITS = {
+    "llm": (env_float("RATE_LIMIT_LLM", 0.2), env_int("RATE_LIMIT_LLM_BURST", 3)),
+    "heavy": (env_float("RATE_LIMIT_HEAVY", 20.0), env_int("RATE_LIMIT_HEAVY_BURST", 40)),
+    "cheap": (env_float("RATE_LIMIT_CHEAP", 100.0), env_int("RATE_LIMIT_CHEAP_BURST", 200)),
+}
+# Each client address also gets a bucket this many times larger, so minting
+# new session IDs doesn't lift the limit (a classroom may share one address)
+RATE_LIMIT_CLIENT_FACTOR = env_float("RATE_LIMIT_CLIENT_FACTOR", 4.0)
+MAX_STEPS_PER_REQUEST = env_int("MAX_STEPS_PER_REQUEST", 5000)
+
+# Startup
+NLP_WARMUP = env_bool("NLP_WARMUP", True)  # Load the parser at startup; off for physics-only workers
+
+# LLM HTTP client
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "")  # empty uses the backend's usual address
+LLM_HTTP2 = env_bool("LLM_HTTP2", False)  # Needs the h2 package
+LLM_MAX_CONNECTIONS = env_int("LLM_MAX_CONNECTIONS", 20)
+LLM_MAX_KEEPALIVE = env_int("LLM_MAX_KEEPALIVE", 10)
+LLM_KEEPALIVE_EXPIRY = env_float("LLM_KEEPALIVE_EXPIRY", 60.0)  # seconds an idle connection is kept
+LLM_CONNECT_TIMEOUT = env_float("LLM_CONNECT_TIMEOUT", 5.0)
+LLM_READ_TIMEOUT = env_float("LLM_READ_TIMEOUT", 60.0)  # generation can be slow
+LLM_WRITE_TIMEOUT = env_float("LLM_WRITE_TIMEOUT", 10.0)
+LLM_POOL_TIMEOUT = env_float("LLM_POOL_TIMEOUT", 5.0)  # wait for a free pooled connection
+
+# LLM backend
+LLM_BACKEND = os.getenv("LLM_BACKEND", "ollama")  # ollama, ollama-local, openai, replay or record
+LLM_MODEL = os.getenv("LLM_MODEL", "kimi-k2.5:cloud")
+LLM_RECORD_BACKEND = os.getenv("LLM_RECORD_BACKEND", "ollama")  # record mode sends unrecorded prompts here
+LLM_REPLAY_DIR = os.getenv("LLM_REPLAY_DIR", "cache/llm_recordings")
+LLM_REPLAY_LATENCY = env_float("LLM_REPLAY_LATENCY", 0.0)  # seconds before a replayed response starts
+LLM_REPLAY_JITTER = env_float("LLM_REPLAY_JITTER", 0.0)  # up to this many extra seconds
+LLM_REPLAY_CHUNK_SIZE = env_int("LLM_REPLAY_CHUNK_SIZE", 16)  # characters per streamed chunk
+LLM_REPLAY_CHUNK_DELAY = env_float("LLM_REPLAY_CHUNK_DELAY", 0.0)  # seconds between streamed chunks
+LLM_REPLAY_SEED = env_int("LLM_REPLAY_SEED", 0)
+
+# LLM deadlines
+LLM_DEADLINE = env_float("LLM_DEADLINE", 20.0)  # seconds a parse waits on the model before using the local parser
+LLM_HEDGE = env_bool("LLM_HEDGE", True)
+LLM_HEDGE_PERCENTILE = env_float("LLM_HEDGE_PERCENTILE", 95.0)  # hedge calls slower than this percentile of recent ones
+LLM_HEDGE_DELAY = env_float("LLM_HEDGE_DELAY", 8.0)  # hedge delay until enough calls have been timed
+LLM_HEDGE_MIN_DELAY = env_float("LLM_HEDGE_MIN_DELAY", 1.0)
+LLM_HEDGE_BACKEND = os.getenv("LLM_HEDGE_BACKEND", "")  # empty sends hedges to the primary backend
+LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL", "")  # empty uses LLM_MODEL
+LLM_HEDGE_BASE_URL = os.getenv("LLM_HEDGE_BASE_URL", "")
+LLM_BREAKER_FAILURES = env_int("LLM_BREAKER_FAILURES", 5)  # failed calls in a row that open the circuit
+LLM_BREAKER_RESET = env_float("LLM_BREAKER_RESET", 30.0)  # seconds before a trial call is let through
+
+# Structured output
+LLM_STRUCTURED_OUTPUT = env_bool("LLM_STRUCTURED_OUTPUT", True)  # send the scenario JSON schema as the output format
+LLM_REPAIR_ATTEMPTS = env_int("LLM_REPAIR_ATTEMPTS", 1)  # repair prompts after a response fails validation
+
+# Parse cache
+PARSE_CACHE_SIZE = env_int("PARSE_CACHE_SIZE", 1024)  # in-memory entries, 0 disables
+PARSE_CACHE_TTL = env_float("PARSE_CACHE_TTL", 7 * 24 * 3600.0)  # seconds
+PARSE_CACHE_PATH = os.getenv("PARSE_CACHE_PATH", "cache/parse_cache.sqlite3")  # "" keeps it in memory only
+PARSE_CACHE_MAX_DISK_ENTRIES = env_int("PARSE_CACHE_MAX_DISK_ENTRIES", 100000)
+TEMPLATE_CACHE_SIZE = env_int("TEMPLATE_CACHE_SIZE", 512)  # text skeletons with reusable parses, 0 disables
+LOCAL_PARSER_THRESHOLD = env_float("LOCAL_PARSER_THRESHOLD", 0.8)  # rule-based parses this confident skip the LLM; above 1 disables
+
+# Parser prompt
+PROMPT_MAX_EXAMPLES = env_int("PROMPT_MAX_EXAMPLES", 3)  # worked examples picked per problem, 0 sends all of them
+
+# Batch parsing
+BATCH_MAX_PROBLEMS = env_int("BATCH_MAX_PROBLEMS", 100)
+BATCH_CONCURRENCY = env_int("BATCH_CONCURRENCY", 4)  # model calls in flight per batch
+
+# Compiled worlds
+COMPILED_WORLD_CACHE_SIZE = env_int("COMPILED_WORLD_CACHE_SIZE", 256)  # built scenarios/presets kept for cloning, 0 disables
@@ -0,0 +1,31 @@
+# backend/app/encoding.py
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib encoder
+    orjson = None
+
+
+def _default(obj: Any):
+    """Encode values the stdlib encoder does not know (numpy arrays and scalars)"""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize engine-produced state to JSON bytes
+
+    Engine output is already plain dicts/lists/floats (or numpy arrays), so
+    there is nothing to validate; it is encoded in a single pass.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY, default=_default)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def dumps_text(content: Any) -> str:
+    """Serialize to a JSON string (for WebSocket text frames)"""
+    return dumps(content).decode("utf-8")
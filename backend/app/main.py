@@ -1,10 +1,32 @@
 # backend/app/main.py
-from fastapi import FastAPI, WebSocket
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from .api import routes, websocket
-from .services.simulation_service import SimulationService
+from fastapi.responses import JSONResponse
+from .api import routes, websocket as websocket_api
+from .api.sessions import SessionCookieMiddleware, get_websocket_service
+from .services.session_manager import session_manager
+from .services.metrics import metrics
+from .services.executor import simulation_executor
+from .services.resources import resources
 
-app = FastAPI(title="Physics Simulation API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources before serving and drain them on shutdown"""
+    await resources.startup()
+    session_manager.start_sweeper()
+    resources.ready = True
+    try:
+        yield
+    finally:
+        # Fail readiness first so the load balancer stops sending traffic
+        resources.draining = True
+        await websocket_api.manager.shutdown()
+        await session_manager.drain()
+        simulation_executor.shutdown(wait=True)
+        await resources.shutdown()
+
+app = FastAPI(title="Physics Simulation API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -13,17 +35,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Session-ID"],
 )
+app.add_middleware(SessionCookieMiddleware)
 
 # Include routes
 app.include_router(routes.router, prefix="/api", tags=["simulation"])
 
-# WebSocket endpoint
-simulation_service = SimulationService()
-
+# WebSocket endpoint (session from ?session_id=, cookie, header or path)
 @app.websocket("/ws")
+@app.websocket("/ws/{session_id}")
 async def websocket_route(websocket: WebSocket):
-    await websocket.websocket_endpoint(websocket, simulation_service)
+    session_id, simulation_service = await get_websocket_service(websocket)
+    await websocket_api.websocket_endpoint(websocket, session_id, simulation_service)
 
 @app.get("/")
 async def root():
@@ -35,4 +59,18 @@ async def root():
 
 @app.get("/health")
 async def health():
+    """Liveness: the process is up"""
     return {"status": "healthy"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: startup has finished and the app isn't draining"""
+    status = resources.status()
+    return JSONResponse({"status": status}, status_code=200 if status == "ready" else 503)
+
+@app.get("/metrics")
+async def get_metrics(format: str = "prometheus"):
+    """Admission queue depths, rejections and session counts"""
+    if format == "json":
+        return metrics.to_dict()
+    return Response(content=metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
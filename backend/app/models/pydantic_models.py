@@ -1,6 +1,7 @@
 # backend/app/models/pydantic_models.py (UPDATE)
 from typing import List, Optional, Dict, Any, Literal
 from pydantic import BaseModel, Field
+from ..config import BATCH_MAX_PROBLEMS, MAX_STEPS_PER_REQUEST
 
 class VectorModel(BaseModel):
     x: float
@@ -85,6 +86,10 @@ class WorldStateModel(BaseModel):
 class SimulationRequest(BaseModel):
     problem_text: str
 
+class BatchSimulationRequest(BaseModel):
+    problems: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_PROBLEMS)
+    build_worlds: bool = False  # Also build each world and return its initial state
+
 class SimulationResponse(BaseModel):
     success: bool
     world_state: Optional[WorldStateModel] = None
@@ -96,8 +101,12 @@ class UpdateParameterRequest(BaseModel):
     parameter: str  # "velocity", "position", "mass", "radius", "collision_type", etc.
     value: Dict[str, float] | float | str
 
+DetailLevel = Literal["minimal", "render", "analysis", "full"]
+
 class StepRequest(BaseModel):
-    num_steps: int = 1
+    num_steps: int = Field(1, ge=1, le=MAX_STEPS_PER_REQUEST)
+    detail: DetailLevel = "full"
+    fields: Optional[List[str]] = None  # Explicit state fields, overrides detail
 
 class CreateObjectRequest(BaseModel):
     mass: float = 1.0
@@ -0,0 +1,321 @@
+# backend/app/nlp/backends.py
+import asyncio
+import hashlib
+import json
+import os
+import random
+from typing import AsyncIterator, Optional
+import httpx
+from .. import config
+
+# Where each backend kind listens when LLM_BASE_URL is not set
+DEFAULT_BASE_URLS = {
+    "ollama": "https://ollama.com/api",
+    "ollama-local": "http://localhost:11434/api",
+    "openai": "https://api.openai.com/v1",
+}
+
+def create_http_client(http2: bool = config.LLM_HTTP2) -> httpx.AsyncClient:
+    """A pooled keep-alive client for the model endpoint"""
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("LLM_HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+            http2 = False
+    
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=config.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=config.LLM_MAX_KEEPALIVE,
+            keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(
+            connect=config.LLM_CONNECT_TIMEOUT,
+            read=config.LLM_READ_TIMEOUT,
+            write=config.LLM_WRITE_TIMEOUT,
+            pool=config.LLM_POOL_TIMEOUT
+        )
+    )
+
+class LLMBackend:
+    """A model server that completes a prompt with a JSON object"""
+    
+    kind = "base"
+    
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+    
+    async def open(self):
+        """Acquire connections up front; optional"""
+    
+    async def aclose(self):
+        """Release connections"""
+    
+    async def generate(self, prompt: str, schema: Optional[dict] = None) -> str:
+        """The full completion for ``prompt``, conforming to the JSON ``schema`` if given"""
+        raise NotImplementedError
+    
+    async def generate_stream(self, prompt: str, schema: Optional[dict] = None) -> AsyncIterator[str]:
+        """The completion chunk by chunk; by default all in one chunk"""
+        yield await self.generate(prompt, schema)
+
+class HTTPBackend(LLMBackend):
+    """A model server reached over HTTP through a pooled client"""
+    
+    def __init__(
+        self,
+        model_name: str,
+        base_url: str,
+        api_key: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None
+    ):
+        super().__init__(model_name)
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        # An injected client (e.g. pointed at a local stand-in server) is
+        # owned by the caller and never closed here
+        self._client = client
+        self._owns_client = client is None
+    
+    async def open(self) -> httpx.AsyncClient:
+        """The pooled HTTP client, created on first use"""
+        if self._client is None or (self._owns_client and self._client.is_closed):
+            self._client = create_http_client()
+            self._owns_client = True
+        return self._client
+    
+    async def aclose(self):
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+    
+    def _headers(self) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+class OllamaBackend(HTTPBackend):
+    """Ollama's /generate API, on ollama.com or a local server"""
+    
+    kind = "ollama"
+    
+    def __init__(self, *args, require_key: bool = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.require_key = require_key
+    
+    def _request(self, prompt: str, stream: bool, schema: Optional[dict]) -> dict:
+        # A missing key is reported on use, so preset-only deployments can start
+        if self.require_key and not self.api_key:
+            raise ValueError("API_KEY not found in environment variables.")
+        
+        return {
+            "url": f"{self.base_url}/generate",
+            "headers": self._headers(),
+            "json": {
+                "model": self.model_name,
+                "prompt": prompt,
+                "stream": stream,
+                # Ollama constrains decoding to a JSON schema passed as the format
+                "format": schema if schema is not None else "json"
+            }
+        }
+    
+    async def generate(self, prompt: str, schema: Optional[dict] = None) -> str:
+        client = await self.open()
+        response = await client.post(**self._request(prompt, stream=False, schema=schema))
+        response.raise_for_status()
+        return response.json().get("response", "")
+    
+    async def generate_stream(self, prompt: str, schema: Optional[dict] = None) -> AsyncIterator[str]:
+        client = await self.open()
+        async with client.stream("POST", **self._request(prompt, stream=True, schema=schema)) as response:
+            response.raise_for_status()
+            # Ollama streams one JSON object per line
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+
+class OpenAIBackend(HTTPBackend):
+    """An OpenAI-compatible /chat/completions server (vLLM, llama.cpp, LM Studio, ...)"""
+    
+    kind = "openai"
+    
+    def _request(self, prompt: str, stream: bool, schema: Optional[dict]) -> dict:
+        response_format = {"type": "json_object"}
+        if schema is not None:
+            response_format = {"type": "json_schema", "json_schema": {"name": "simulation_scenario", "schema": schema}}
+        return {
+            "url": f"{self.base_url}/chat/completions",
+            "headers": self._headers(),
+            "json": {
+                "model": self.model_name,
+                "messages": [{"role": "user", "content": prompt}],
+                "stream": stream,
+                "response_format": response_format
+            }
+        }
+    
+    async def generate(self, prompt: str, schema: Optional[dict] = None) -> str:
+        client = await self.open()
+        response = await client.post(**self._request(prompt, stream=False, schema=schema))
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"].get("content") or ""
+    
+    async def generate_stream(self, prompt: str, schema: Optional[dict] = None) -> AsyncIterator[str]:
+        client = await self.open()
+        async with client.stream("POST", **self._request(prompt, stream=True, schema=schema)) as response:
+            response.raise_for_status()
+            # Server-sent events: "data: {...}" lines, then "data: [DONE]"
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    yield content
+
+class ReplayBackend(LLMBackend):
+    """Serve completions recorded on disk, for offline benchmarks and load tests
+    
+    Recordings are keyed by model and prompt. With an ``upstream`` backend,
+    prompts that have no recording yet are sent there and the completion is
+    saved (record mode); without one they raise LookupError.
+    
+    Responses are delayed by ``latency`` seconds (plus up to ``jitter``) and
+    streamed in ``chunk_size`` pieces ``chunk_delay`` apart. The delays are
+    derived from ``seed`` and the prompt, so runs are repeatable.
+    """
+    
+    kind = "replay"
+    
+    def __init__(
+        self,
+        model_name: str,
+        path: str = config.LLM_REPLAY_DIR,
+        upstream: Optional[LLMBackend] = None,
+        latency: float = config.LLM_REPLAY_LATENCY,
+        jitter: float = config.LLM_REPLAY_JITTER,
+        chunk_size: int = config.LLM_REPLAY_CHUNK_SIZE,
+        chunk_delay: float = config.LLM_REPLAY_CHUNK_DELAY,
+        seed: int = config.LLM_REPLAY_SEED
+    ):
+        super().__init__(model_name)
+        self.path = path
+        self.upstream = upstream
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_delay = chunk_delay
+        self.seed = seed
+    
+    def key(self, prompt: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{prompt}".encode()).hexdigest()
+    
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+    
+    def _load(self, key: str) -> Optional[str]:
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                return json.load(f)["response"]
+        except FileNotFoundError:
+            return None
+    
+    def _save(self, key: str, prompt: str, response: str):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self._file(key) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "prompt": prompt, "response": response}, f, indent=2)
+        os.replace(tmp, self._file(key))
+    
+    async def _lookup(self, prompt: str) -> Optional[str]:
+        key = self.key(prompt)
+        response = await asyncio.get_running_loop().run_in_executor(None, self._load, key)
+        if response is None and self.upstream is None:
+            raise LookupError(f"No recorded response for prompt {key[:12]} in {self.path}")
+        return response
+    
+    async def _record(self, prompt: str, response: str):
+        await asyncio.get_running_loop().run_in_executor(None, self._save, self.key(prompt), prompt, response)
+    
+    async def _delay(self, prompt: str):
+        rng = random.Random(f"{self.seed}\0{self.key(prompt)}")
+        delay = self.latency + rng.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    async def open(self):
+        if self.upstream is not None:
+            await self.upstream.open()
+    
+    async def aclose(self):
+        if self.upstream is not None:
+            await self.upstream.aclose()
+    
+    async def generate(self, prompt: str, schema: Optional[dict] = None) -> str:
+        response = await self._lookup(prompt)
+        if response is None:
+            response = await self.upstream.generate(prompt, schema)
+            await self._record(prompt, response)
+            return response
+        
+        await self._delay(prompt)
+        return response
+    
+    async def generate_stream(self, prompt: str, schema: Optional[dict] = None) -> AsyncIterator[str]:
+        response = await self._lookup(prompt)
+        if response is None:
+            chunks = []
+            async for chunk in self.upstream.generate_stream(prompt, schema):
+                chunks.append(chunk)
+                yield chunk
+            await self._record(prompt, "".join(chunks))
+            return
+        
+        await self._delay(prompt)
+        for start in range(0, len(response), self.chunk_size):
+            if start and self.chunk_delay > 0:
+                await asyncio.sleep(self.chunk_delay)
+            yield response[start:start + self.chunk_size]
+
+def create_backend(
+    kind: str = config.LLM_BACKEND,
+    model_name: str = config.LLM_MODEL,
+    base_url: str = config.LLM_BASE_URL,
+    api_key: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None
+) -> LLMBackend:
+    """The backend configured by ``LLM_BACKEND``
+    
+    ``ollama`` (ollama.com), ``ollama-local``, ``openai`` (any compatible
+    server), ``replay`` (recordings only) or ``record`` (replay, recording
+    misses from ``LLM_RECORD_BACKEND``).
+    """
+    api_key = api_key or os.getenv("API_KEY")
+    if kind in ("replay", "record"):
+        upstream = None
+        if kind == "record":
+            if config.LLM_RECORD_BACKEND in ("replay", "record"):
+                raise ValueError("LLM_RECORD_BACKEND must be a live backend")
+            upstream = create_backend(config.LLM_RECORD_BACKEND, model_name, base_url, api_key, client)
+        return ReplayBackend(model_name, upstream=upstream)
+    
+    base_url = base_url or DEFAULT_BASE_URLS.get(kind, "")
+    if kind == "ollama":
+        return OllamaBackend(model_name, base_url, api_key, client)
+    if kind == "ollama-local":
+        return OllamaBackend(model_name, base_url, api_key, client, require_key=False)
+    if kind == "openai":
+        return OpenAIBackend(model_name, base_url, api_key, client)
+    raise ValueError(f"Unknown LLM_BACKEND: {kind}")
@@ -0,0 +1,157 @@
+# backend/app/nlp/cache.py
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from .. import config
+from ..services.metrics import metrics
+from .schema import SimulationScenario
+
+_NON_WORD = re.compile(r"[^\w.°/%^+-]+")
+_STRAY_DOT = re.compile(r"(?<!\d)\.|\.(?!\d)")
+
+def normalize_text(text: str) -> str:
+    """Fold case, punctuation and whitespace so trivially different texts share a key
+    
+    Decimal points inside numbers are kept, so "2.5 m" and "25 m" stay distinct.
+    """
+    text = _NON_WORD.sub(" ", text.lower())
+    text = _STRAY_DOT.sub(" ", text)
+    return " ".join(text.split())
+
+def cache_key(model_name: str, prompt_version: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{prompt_version}\0{normalize_text(text)}".encode()).hexdigest()
+
+class ParseCache:
+    """Parsed scenarios by normalized problem text: an in-memory LRU in front of SQLite
+    
+    Entries expire after ``ttl`` seconds. The disk tier is shared by all
+    workers on the host and trimmed to the ``max_disk_entries`` most
+    recently written rows. ``path=None`` keeps the cache in memory only.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = config.PARSE_CACHE_SIZE,
+        ttl: float = config.PARSE_CACHE_TTL,
+        path: Optional[str] = config.PARSE_CACHE_PATH,
+        max_disk_entries: int = config.PARSE_CACHE_MAX_DISK_ENTRIES
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path or None
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._local = threading.local()
+        self._writes = 0
+    
+    # In-memory tier
+    
+    def _memory_get(self, key: str) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at < time.time():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return payload
+    
+    def _memory_put(self, key: str, payload: str, expires_at: float):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = (expires_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+        metrics.set_gauge("parse_cache_entries", len(self._memory))
+    
+    # Disk tier
+    
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections are not thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache ("
+                "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, written_at REAL NOT NULL, payload TEXT NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+    
+    def _disk_get(self, key: str) -> Optional[Tuple[float, str]]:
+        row = self._connect().execute(
+            "SELECT expires_at, payload FROM parse_cache WHERE key = ? AND expires_at >= ?",
+            (key, time.time())
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+    
+    def _disk_put(self, key: str, payload: str, expires_at: float):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO parse_cache (key, expires_at, written_at, payload) VALUES (?, ?, ?, ?)",
+                (key, expires_at, now, payload)
+            )
+            # Trimming scans the table, so only do it every so often
+            self._writes += 1
+            if self._writes % 100 == 1:
+                conn.execute("DELETE FROM parse_cache WHERE expires_at < ?", (now,))
+                conn.execute(
+                    "DELETE FROM parse_cache WHERE key NOT IN "
+                    "(SELECT key FROM parse_cache ORDER BY written_at DESC LIMIT ?)",
+                    (self.max_disk_entries,)
+                )
+    
+    async def _run_disk(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+    
+    # Public API
+    
+    async def get(self, key: str) -> Optional[SimulationScenario]:
+        """The cached scenario for ``key``, or None"""
+        payload = self._memory_get(key)
+        if payload is not None:
+            metrics.inc("parse_cache_hits_total", tier="memory")
+            return SimulationScenario.model_validate_json(payload)
+        
+        if self.path:
+            try:
+                entry = await self._run_disk(self._disk_get, key)
+            except sqlite3.Error as e:
+                print(f"Parse cache read failed: {e}")
+                entry = None
+            if entry is not None:
+                expires_at, payload = entry
+                self._memory_put(key, payload, expires_at)
+                metrics.inc("parse_cache_hits_total", tier="disk")
+                return SimulationScenario.model_validate_json(payload)
+        
+        metrics.inc("parse_cache_misses_total")
+        return None
+    
+    async def put(self, key: str, scenario: SimulationScenario):
+        """Cache a validated scenario under ``key``"""
+        payload = scenario.model_dump_json()
+        expires_at = time.time() + self.ttl
+        self._memory_put(key, payload, expires_at)
+        if self.path:
+            try:
+                await self._run_disk(self._disk_put, key, payload, expires_at)
+            except sqlite3.Error as e:
+                print(f"Parse cache write failed: {e}")
+    
+    def clear(self):
+        """Drop the in-memory tier"""
+        self._memory.clear()
@@ -0,0 +1,343 @@
+# backend/app/nlp/fallback_parser.py
+import math
+import re
+from typing import List, NamedTuple, Optional, Tuple
+from .schema import SimulationScenario
+
+# Rule-based parser for the scenario families the LLM prompt covers
+# (projectile, free fall, collisions, circular motion, springs). It runs
+# before the model: confident parses skip the LLM, and it is also the
+# last resort when the model fails.
+
+COLORS = ["#e74c3c", "#3498db", "#9b59b6", "#1abc9c", "#f39c12"]
+DEFAULT_G = 9.8
+
+_NUM = r"(\d+(?:\.\d+)?)"
+_METERS = r"\s*(?:m|meters?|metres?)(?![/\w])"
+_ANY_NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?")
+
+_FAMILY_KEYWORDS = {
+    "circular_motion": r"\b(circle|circular|orbit\w*|revolv\w*|rotat\w*)\b",
+    "oscillation": r"\b(spring|oscillat\w*|n/m)\b|\bk\s*=",
+    "collision": r"\b(collid\w*|collision|crash\w*|stick together|head[- ]on)\b",
+    "freefall": r"\b(drop\w*|dropped|falls?|falling|free[- ]?fall|released from rest)\b",
+    "projectile": r"\b(throw\w*|thrown|launch\w*|fired?|kick\w*|projectile|shot|shoot\w*|tossed|hurled)\b",
+}
+
+# Setups the engine or these rules don't model; leave them to the LLM
+_UNSUPPORTED = re.compile(
+    r"\b(incline\w*|ramp|slope|pulley|pendulum|tension|friction|torque|rope|string|"
+    r"block|lift\w*|elevator|bounce\w*|wall)\b"
+)
+
+class LocalParse(NamedTuple):
+    scenario: SimulationScenario
+    confidence: float
+    scenario_type: str
+
+class _Text:
+    """Lower-cased problem text that remembers which numbers were used"""
+    
+    def __init__(self, text: str):
+        self.text = text.lower().replace("²", "^2")
+        self.consumed: List[Tuple[int, int]] = []
+    
+    def find(self, pattern: str, group: int = 1) -> Optional[float]:
+        """The first match of ``pattern`` as a number, marking it used"""
+        match = re.search(pattern, self.text)
+        if not match:
+            return None
+        self.consumed.append(match.span(group))
+        return float(match.group(group))
+    
+    def find_all(self, pattern: str) -> List[re.Match]:
+        matches = list(re.finditer(pattern, self.text))
+        self.consumed.extend(match.span(1) for match in matches)
+        return matches
+    
+    def has(self, pattern: str) -> bool:
+        return re.search(pattern, self.text) is not None
+    
+    def unused_numbers(self) -> int:
+        return sum(
+            1 for match in _ANY_NUMBER.finditer(self.text)
+            if not any(start <= match.start() < end for start, end in self.consumed)
+        )
+
+def _entity(name: str, index: int, mass: float, position: Tuple[float, float], velocity: Tuple[float, float], radius: float = 0.5) -> dict:
+    return {
+        "name": name,
+        "type": "projectile",
+        "mass": mass,
+        "radius": radius,
+        "color": COLORS[index % len(COLORS)],
+        "initial_position": {"x": position[0], "y": position[1]},
+        "initial_velocity": {"x": velocity[0], "y": velocity[1]},
+    }
+
+def _gravity(text: _Text) -> float:
+    g = text.find(r"\bg\s*=\s*" + _NUM)
+    if g is None:
+        g = text.find(_NUM + r"\s*m/s\^?2")
+    return g or DEFAULT_G
+
+def _forces(text: _Text, gravity: bool) -> List[dict]:
+    forces = []
+    if gravity:
+        forces.append({"type": "gravity", "parameters": {"g": _gravity(text)}})
+    if text.has(r"\b(air resistance|drag|damp\w*)\b"):
+        coefficient = text.find(r"(?:coefficient|drag|resistance)\s*(?:of|=|is)?\s*" + _NUM)
+        forces.append({"type": "drag", "parameters": {"coefficient": coefficient or 0.1}})
+    return forces
+
+def _mass(text: _Text) -> float:
+    mass = text.find(_NUM + r"\s*(?:kg|kilograms?)\b")
+    if mass is not None:
+        return mass
+    grams = text.find(_NUM + r"\s*(?:g|grams?)\b")
+    return grams / 1000 if grams is not None else 1.0
+
+def _speed(text: _Text) -> Optional[float]:
+    speed = text.find(_NUM + r"\s*m/s(?![\^2])")
+    if speed is None:
+        kmh = text.find(_NUM + r"\s*km/h")
+        speed = kmh / 3.6 if kmh is not None else None
+    return speed
+
+def _duration(text: _Text) -> Optional[float]:
+    return text.find(r"\bfor\s+" + _NUM + r"\s*(?:s|sec\w*)\b")
+
+def _length(text: _Text, before: str) -> Optional[float]:
+    """A length in meters introduced by one of the ``before`` phrases"""
+    return text.find(r"(?:" + before + r")\s+(?:of\s+|a\s+|an\s+|the\s+|top of (?:a|an|the)\s+)*" + _NUM + _METERS)
+
+def _height(text: _Text) -> Optional[float]:
+    height = _length(text, r"from|height|above|atop")
+    if height is None:
+        height = text.find(_NUM + _METERS + r"[\s-]+(?:tall|high|cliff|building|tower)")
+    return height
+
+# Scenario families: each returns (scenario dict, confidence) or None
+
+def _projectile(text: _Text) -> Optional[Tuple[dict, float]]:
+    speed = _speed(text)
+    if speed is None:
+        return None
+    confidence = 0.95
+    
+    angle = text.find(_NUM + r"\s*(?:°|degrees?\b|deg\b)")
+    if angle is None:
+        if text.has(r"\b(straight up|vertically upward|vertically|upward|up)\b"):
+            angle = 90.0
+        elif text.has(r"\b(straight down|downward|down)\b"):
+            angle = -90.0
+        elif text.has(r"\bhorizontal\w*\b"):
+            angle = 0.0
+        else:
+            angle = 45.0
+            confidence -= 0.3  # Launch direction is a guess
+    
+    mass = _mass(text)
+    height = _height(text) or 0.0
+    g = _gravity(text)
+    forces = _forces(text, gravity=True)
+    
+    theta = math.radians(angle)
+    vx, vy = speed * math.cos(theta), speed * math.sin(theta)
+    if abs(vx) < 1e-9:
+        vx = 0.0
+    
+    # Size the world to the trajectory (drag only makes it shorter)
+    flight = (vy + math.sqrt(max(vy * vy + 2 * g * height, 0.0))) / g
+    x0 = 50.0 if vx == 0 else 10.0
+    peak = height + max(vy, 0.0) ** 2 / (2 * g)
+    width = max(100.0, math.ceil(x0 + vx * flight * 1.1 + 10))
+    world_height = max(40.0, math.ceil(peak * 1.2 + 5))
+    
+    data = {
+        "scenario_type": "projectile",
+        "entities": [_entity("projectile", 0, mass, (x0, height), (round(vx, 4), round(vy, 4)))],
+        "forces": forces,
+        "environment": {"width": width, "height": world_height, "ground_level": 0},
+        "duration": _duration(text) or round(flight + 1.0, 1),
+    }
+    return data, confidence
+
+def _freefall(text: _Text) -> Optional[Tuple[dict, float]]:
+    height = _height(text)
+    if height is None:
+        return None
+    
+    mass = _mass(text)
+    g = _gravity(text)
+    data = {
+        "scenario_type": "freefall",
+        "entities": [_entity("falling_ball", 1, mass, (50.0, height), (0.0, 0.0), radius=0.6)],
+        "forces": _forces(text, gravity=True),
+        "environment": {"width": 100, "height": max(40.0, math.ceil(height * 1.5)), "ground_level": 0},
+        "duration": _duration(text) or round(math.sqrt(2 * height / g) + 1.0, 1),
+    }
+    return data, 0.95
+
+def _collision(text: _Text) -> Optional[Tuple[dict, float]]:
+    masses = text.find_all(_NUM + r"\s*(?:kg|kilograms?)\b")
+    if len(masses) < 2:
+        return None
+    confidence = 0.95
+    
+    head_on = text.has(r"\b(toward each other|towards each other|head[- ]on)\b")
+    bodies = []
+    for i, match in enumerate(masses):
+        # A body's speed and direction are described between its mass and the next one
+        end = masses[i + 1].start() if i + 1 < len(masses) else len(text.text)
+        segment = text.text[match.end():end]
+        speed_match = re.search(_NUM + r"\s*m/s", segment)
+        if speed_match:
+            text.consumed.append((match.end() + speed_match.start(1), match.end() + speed_match.end(1)))
+            speed = float(speed_match.group(1))
+        elif re.search(r"\b(stationary|at rest|rest)\b", segment):
+            speed = 0.0
+        else:
+            return None
+        
+        if re.search(r"\bleft\w*\b", segment):
+            direction = -1
+        elif re.search(r"\bright\w*\b", segment):
+            direction = 1
+        else:
+            direction = 1 if i == 0 or not head_on else -1
+            if speed and i > 0 and not head_on:
+                confidence -= 0.2  # Direction is a guess
+        bodies.append((float(match.group(1)), speed * direction))
+    
+    # Neighbours 35 m apart, centered (at most 60 m for the whole row)
+    spacing = min(35.0, 60.0 / (len(bodies) - 1))
+    start = 50.0 - spacing * (len(bodies) - 1) / 2
+    entities = [
+        _entity(f"ball{i + 1}", i, mass, (round(start + i * spacing, 2), 20.0), (velocity, 0.0), radius=round(min(1.5, 0.5 + 0.1 * mass), 2))
+        for i, (mass, velocity) in enumerate(bodies)
+    ]
+    
+    # Run until a few seconds after the first pair meets
+    meetings = [
+        spacing / (left[1] - right[1])
+        for left, right in zip(bodies, bodies[1:]) if left[1] > right[1]
+    ]
+    duration = max(6.0, math.ceil(min(meetings) + 3.0)) if meetings else 6.0
+    data = {
+        "scenario_type": "collision",
+        "entities": entities,
+        "forces": _forces(text, gravity=False),
+        "environment": {"width": 100, "height": 40, "ground_level": 0},
+        "duration": _duration(text) or duration,
+    }
+    return data, confidence
+
+def _circular(text: _Text) -> Optional[Tuple[dict, float]]:
+    radius = text.find(r"radius\s*(?:of\s*|=\s*|is\s*)?" + _NUM + r"(?:" + _METERS + r")?")
+    speed = _speed(text)
+    if speed is None:
+        omega = text.find(_NUM + r"\s*rad/s")
+        speed = omega * radius if omega is not None and radius is not None else None
+    if radius is None or not speed:
+        return None
+    
+    mass = _mass(text)
+    size = max(100.0, math.ceil(2 * radius + 20))
+    center = {"x": size / 2, "y": size / 2}
+    entity = _entity("orbiting_mass", 2, mass, (center["x"] + radius, center["y"]), (0.0, speed))
+    entity["circular_motion"] = {"enabled": True, "center": center, "radius": radius, "linear_velocity": speed}
+    data = {
+        "scenario_type": "circular_motion",
+        "entities": [entity],
+        "forces": [],
+        "environment": {"width": size, "height": size, "ground_level": 0},
+        # At least two full revolutions
+        "duration": _duration(text) or round(max(15.0, 4 * math.pi * radius / speed), 1),
+    }
+    return data, 0.95
+
+def _spring(text: _Text) -> Optional[Tuple[dict, float]]:
+    k = text.find(r"\bk\s*=\s*" + _NUM)
+    if k is None:
+        k = text.find(_NUM + r"\s*n/m")
+    if k is None:
+        k = text.find(r"spring constant\s*(?:of\s*|is\s*)?" + _NUM)
+    if k is None:
+        return None
+    
+    mass = _mass(text)
+    displacement = _length(text, r"displaced|stretched|compressed|pulled|by") or 2.0
+    anchor = {"x": 40.0, "y": 25.0}
+    rest_length = 10.0
+    if text.has(r"\bcompress\w*\b"):
+        displacement = -displacement
+    
+    data = {
+        "scenario_type": "oscillation",
+        "entities": [_entity("oscillating_mass", 3, mass, (anchor["x"] + rest_length + displacement, anchor["y"]), (0.0, 0.0))],
+        "forces": [{"type": "spring", "parameters": {"k": k, "anchor": anchor, "rest_length": rest_length}}] + _forces(text, gravity=False),
+        "environment": {"width": 100, "height": 50, "ground_level": 0},
+        "duration": _duration(text) or 12.0,
+    }
+    return data, 0.95
+
+_FAMILIES = {
+    "circular_motion": _circular,
+    "oscillation": _spring,
+    "collision": _collision,
+    "freefall": _freefall,
+    "projectile": _projectile,
+}
+
+def parse_local(problem_text: str) -> Optional[LocalParse]:
+    """Parse a problem with regex rules, with a confidence in [0, 1]
+    
+    Every family whose keywords appear is tried and the most confident
+    parse wins. Confidence drops when another family fits almost as well,
+    when the text mentions setups the rules don't model, and for every
+    number the rules didn't use.
+    """
+    probe = problem_text.lower()
+    candidates = []
+    for family, pattern in _FAMILY_KEYWORDS.items():
+        if not re.search(pattern, probe):
+            continue
+        text = _Text(problem_text)
+        result = _FAMILIES[family](text)
+        if result is None:
+            continue
+        
+        data, confidence = result
+        if _UNSUPPORTED.search(text.text):
+            confidence -= 0.5
+        confidence -= 0.35 * text.unused_numbers()
+        candidates.append((confidence, family, data))
+    
+    if not candidates:
+        return None
+    
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    confidence, family, data = candidates[0]
+    if len(candidates) > 1 and candidates[1][0] > confidence - 0.1:
+        confidence -= 0.2
+    
+    data["description"] = problem_text.strip()
+    return LocalParse(SimulationScenario(**data), max(0.0, min(1.0, confidence)), family)
+
+def parse_simple_projectile(problem_text: str) -> SimulationScenario:
+    """Best-effort scenario when nothing better is available
+    
+    Uses the rule-based parse whatever its confidence, or a generic projectile
+    launched with whatever speed and angle the text mentions.
+    """
+    local = parse_local(problem_text)
+    if local is not None:
+        return local.scenario
+    
+    text = _Text(problem_text)
+    if _speed(text) is None:
+        text.text += " 15 m/s"
+    data, _ = _projectile(text)
+    data["description"] = problem_text.strip()
+    return SimulationScenario(**data)
@@ -0,0 +1,118 @@
+# backend/app/nlp/json_extract.py
+import json
+from typing import Callable, Iterator, List, Optional, Tuple
+
+# Python literals models sometimes write instead of JSON's
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+def iter_json_objects(text: str) -> Iterator[str]:
+    """Balanced ``{...}`` spans in ``text`` by where they start
+    
+    A span comes before the ones nested in it, so a wrapper such as
+    ``{"result": {...}}`` is followed by the object it wraps. One pass with
+    a stack of open braces, so it stays linear however many braces, fences
+    or stray quotes surround the JSON. Braces inside double-quoted strings
+    don't count. An unclosed brace (stray prose, or a truncated response)
+    doesn't hide the objects after it.
+    """
+    spans: List[Tuple[int, int]] = []
+    opened: List[int] = []
+    in_string = False
+    escape = False
+    
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            # Quotes only matter inside a candidate object
+            in_string = bool(opened)
+        elif ch == "{":
+            opened.append(i)
+        elif ch == "}" and opened:
+            spans.append((opened.pop(), i + 1))
+    
+    # Spans close inner-first; order them container-first
+    spans.sort()
+    for start, end in spans:
+        yield text[start:end]
+
+def repair_json(text: str) -> str:
+    """Cheap fixes for near-JSON: trailing commas, single-quoted strings and
+    Python literals, in one pass that leaves string contents alone"""
+    out = []
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch in "\"'":
+            # Copy a string, re-quoting single-quoted ones
+            quote = ch
+            out.append('"')
+            i += 1
+            while i < n and text[i] != quote:
+                if text[i] == "\\" and i + 1 < n:
+                    if quote == "'" and text[i + 1] == "'":
+                        out.append("'")
+                    else:
+                        out.append(text[i:i + 2])
+                    i += 2
+                    continue
+                out.append('\\"' if text[i] == '"' else text[i])
+                i += 1
+            out.append('"')
+            i += 1
+        elif ch == ",":
+            # Drop a comma that only has whitespace before a closing bracket
+            j = i + 1
+            while j < n and text[j] in " \t\r\n":
+                j += 1
+            if j >= n or text[j] not in "}]":
+                out.append(ch)
+            i += 1
+        elif ch.isalpha() or ch == "_":
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            out.append(_LITERALS.get(word, word))
+            i = j
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+def _load(candidate: str) -> Optional[dict]:
+    try:
+        data = json.loads(candidate)
+    except ValueError:
+        try:
+            data = json.loads(repair_json(candidate))
+        except ValueError:
+            return None
+    return data if isinstance(data, dict) else None
+
+def extract_json(text: str, prefer: Optional[Callable[[dict], bool]] = None) -> Optional[dict]:
+    """The JSON object in a model response
+    
+    Returns the first candidate object that ``prefer`` accepts, or else the
+    first one that parses at all (after repairs), or None.
+    """
+    data = _load(text.strip())
+    if data is not None and (prefer is None or prefer(data)):
+        return data
+    
+    first = None
+    for candidate in iter_json_objects(text):
+        data = _load(candidate)
+        if data is None:
+            continue
+        if prefer is None or prefer(data):
+            return data
+        if first is None:
+            first = data
+    return first
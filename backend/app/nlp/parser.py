@@ -1,192 +1,312 @@
 # backend/app/nlp/parser.py
+import asyncio
 import json
-import os
-import re
+import logging
 import math
+import time
 from dotenv import load_dotenv
-from typing import Optional
+from typing import AsyncIterator, Optional, Tuple
 import httpx
 from pydantic import ValidationError
-from .schema import ParsedProblem, SimulationScenario
-from .prompt_templates import get_parser_prompt
+from .. import config
+from .schema import ParsedProblem, SimulationScenario, scenario_json_schema
+from .prompt_templates import get_parser_prompt, get_repair_prompt, PROMPT_VERSION
+from .cache import ParseCache, cache_key
+from .templates import TemplateCache
+from .fallback_parser import parse_local, parse_simple_projectile
+from .stream_json import IncrementalScenarioParser
+from .json_extract import extract_json
+from .singleflight import SingleFlight
+from ..services.metrics import metrics
+from .backends import LLMBackend, create_backend
+from .resilience import CircuitOpenError, ResilientBackend
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class PhysicsProblemParser:
-    """Parse natural language physics problems using Ollama Cloud"""
+    """Parse natural language physics problems with an LLM backend"""
     
     def __init__(
         self,
-        model_name: str = "kimi-k2.5:cloud",
+        model_name: str = config.LLM_MODEL,
         api_key: str = None,
-        base_url: str = "https://ollama.com/api"
+        base_url: str = config.LLM_BASE_URL,
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[ParseCache] = None,
+        templates: Optional[TemplateCache] = None,
+        backend: Optional[LLMBackend] = None
     ):
-        self.model_name = model_name
-        self.api_key = api_key or os.getenv("API_KEY")
-        self.base_url = base_url
-
-        if not self.api_key:
-            raise ValueError("API_KEY not found in environment variables.")
+        # LLM_BACKEND picks the model server unless one is passed in; a
+        # missing API_KEY is reported when a model call is made, so
+        # preset-only deployments can still start
+        backend = backend or create_backend(
+            model_name=model_name,
+            base_url=base_url,
+            api_key=api_key,
+            client=client
+        )
+        hedge = None
+        if config.LLM_HEDGE_BACKEND:
+            hedge = create_backend(
+                config.LLM_HEDGE_BACKEND,
+                model_name=config.LLM_HEDGE_MODEL or backend.model_name,
+                base_url=config.LLM_HEDGE_BASE_URL,
+                api_key=api_key
+            )
+        # Deadline, hedged requests and circuit breaker around the model calls
+        self.backend = ResilientBackend(backend, hedge=hedge, accept=lambda text: self._extract_json(text) is not None)
+        self.model_name = self.backend.model_name
+        self.cache = cache if cache is not None else ParseCache()
+        self.templates = templates if templates is not None else TemplateCache()
+        self.flights = SingleFlight()
+        # Servers that support it only generate JSON matching the scenario schema
+        self.schema = scenario_json_schema() if config.LLM_STRUCTURED_OUTPUT else None
+    
+    async def open(self):
+        """Open the backend's connections"""
+        await self.backend.open()
+    
+    async def aclose(self):
+        """Close the backend's connections"""
+        await self.backend.aclose()
     
-    async def parse(self, problem_text: str) -> ParsedProblem:
-        try:
-            prompt = get_parser_prompt(problem_text)
-
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/generate",
-                    headers=headers,
-                    json={
-                        "model": self.model_name,
-                        "prompt": prompt,
-                        "stream": False,
-                        "format": "json"
-                    }
-                )
-
-                response.raise_for_status()
-                result = response.json()
-
-                response_text = result.get("response", "")
-                print(f"Raw LLM Response: {response_text}")
-
-                scenario_data = self._extract_json(response_text)
-
-                if not scenario_data:
-                    print("Failed to extract JSON, using fallback parser")
-                    from .fallback_parser import parse_simple_projectile
-                    scenario = parse_simple_projectile(problem_text)
-                    return ParsedProblem(success=True, scenario=scenario)
-
-                # ✅ Post-process circular motion
-                scenario_data = self._parse_circular_motion(scenario_data)
-
-                print(f"Extracted JSON: {json.dumps(scenario_data, indent=2)}")
-
-                scenario = SimulationScenario(**scenario_data)
-                return ParsedProblem(success=True, scenario=scenario)
-
-        except Exception as e:
-            import traceback
-            print(f"Parser Exception: {traceback.format_exc()}")
-
-            try:
-                from .fallback_parser import parse_simple_projectile
-                scenario = parse_simple_projectile(problem_text)
-                return ParsedProblem(success=True, scenario=scenario)
-            except:
-                return ParsedProblem(
-                    success=False,
-                    error_message=f"Error parsing problem: {str(e)}"
-                )
-
-
     def _extract_json(self, text: str) -> Optional[dict]:
         """Extract JSON object from text"""
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            # Try to find JSON in code blocks
-            json_match = re.search(r'```json\s*(\{.*?\})\s*```', text, re.DOTALL)
-            if json_match:
-                try:
-                    return json.loads(json_match.group(1))
-                except json.JSONDecodeError:
-                    pass
-            
-            # Try to find any JSON object
-            json_match = re.search(r'\{.*\}', text, re.DOTALL)
-            if json_match:
-                try:
-                    return json.loads(json_match.group())
-                except json.JSONDecodeError:
-                    pass
-        return None
+        # The first object that looks like a scenario, so an echoed example
+        # or a stray {...} in prose isn't picked instead
+        return extract_json(text, prefer=lambda data: "entities" in data)
+    
     def _parse_circular_motion(self, scenario_data: dict) -> dict:
         """Post-process circular motion scenarios"""
         if scenario_data.get("scenario_type") == "circular_motion":
             for entity in scenario_data.get("entities", []):
+                # Keep the model's own circle when it gave one
+                if isinstance(entity.get("circular_motion"), dict) and entity["circular_motion"].get("radius"):
+                    continue
+                
                 # Calculate circular motion parameters from velocity
                 vel = entity.get("initial_velocity", {})
                 speed = math.sqrt(vel.get("x", 0)**2 + vel.get("y", 0)**2)
                 
-                # Estimate center and radius if not specified
+                # Estimate the radius from the distance to the center
                 pos = entity.get("initial_position", {"x": 50, "y": 50})
+                radius = math.hypot(pos.get("x", 50) - 50, pos.get("y", 50) - 50)
                 
                 # Add circular motion metadata
                 entity["circular_motion"] = {
                     "enabled": True,
                     "center": {"x": 50, "y": 50},  # Center of canvas
-                    "radius": entity.get("radius", 15),
+                    "radius": radius or 15,
                     "linear_velocity": speed
                 }
         
         return scenario_data
     
-    async def parse(self, problem_text: str) -> ParsedProblem:
-        """Parse a physics problem into structured format"""
-        try:
-            prompt = get_parser_prompt(problem_text)
-
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/generate",
-                    headers=headers,
-                    json={
-                        "model": self.model_name,
-                        "prompt": prompt,
-                        "stream": False,
-                        "format": "json"
-                    }
-                )
+    async def _parse_fast(self, problem_text: str, key: str, template_key: str) -> Optional[SimulationScenario]:
+        """A scenario from the caches or local rules, without calling the model"""
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # Same problem with different numbers: reuse an earlier parse
+        scenario = self.templates.get(template_key, problem_text)
+        if scenario is not None:
+            await self.cache.put(key, scenario)
+            return scenario
+        
+        # Common textbook setups are handled by local rules
+        local = parse_local(problem_text)
+        if local is not None and local.confidence >= config.LOCAL_PARSER_THRESHOLD:
+            metrics.inc("local_parser_total", outcome="hit", scenario_type=local.scenario_type)
+            return local.scenario
+        metrics.inc("local_parser_total", outcome="miss")
+        return None
+    
+    def _keys(self, problem_text: str) -> Tuple[str, str]:
+        return (
+            cache_key(self.model_name, PROMPT_VERSION, problem_text),
+            TemplateCache.key(self.model_name, PROMPT_VERSION, problem_text)
+        )
+    
+    async def _generate(self, problem_text: str, deadline: float) -> str:
+        """The model's full completion"""
+        return await self.backend.generate(get_parser_prompt(problem_text), self.schema, deadline=deadline)
+    
+    def _generate_stream(self, problem_text: str, deadline: float) -> AsyncIterator[str]:
+        """The model's completion, chunk by chunk as it is generated"""
+        return self.backend.generate_stream(get_parser_prompt(problem_text), self.schema, deadline=deadline)
+    
+    async def _finish(
+        self,
+        problem_text: str,
+        key: str,
+        template_key: str,
+        response_text: str,
+        deadline: float
+    ) -> ParsedProblem:
+        """Validate and cache a completion, repairing it while ``deadline`` allows"""
+        logger.debug("Raw LLM response: %s", response_text)
 
-                response.raise_for_status()
-                result = response.json()
+        scenario_data = self._extract_json(response_text)
 
-                response_text = result.get("response", "")
-                print(f"Raw LLM Response: {response_text}")
+        if not scenario_data:
+            logger.warning("Failed to extract JSON, using fallback parser")
+            scenario = parse_simple_projectile(problem_text)
+            return ParsedProblem(success=True, scenario=scenario)
 
-                scenario_data = self._extract_json(response_text)
+        # Post-process circular motion
+        scenario_data = self._parse_circular_motion(scenario_data)
+        
+        logger.debug("Extracted JSON: %s", scenario_data)
 
-                if not scenario_data:
-                    print("Failed to extract JSON, using fallback parser")
-                    from .fallback_parser import parse_simple_projectile
+        repairs = 0
+        while True:
+            try:
+                scenario = SimulationScenario(**scenario_data)
+                break
+            except ValidationError as ve:
+                out_of_time = time.monotonic() >= deadline
+                if repairs >= config.LLM_REPAIR_ATTEMPTS or out_of_time:
+                    logger.warning("Validation error, using fallback parser: %s", ve)
+                    metrics.inc("llm_repairs_total", outcome="skipped" if out_of_time else "failed")
                     scenario = parse_simple_projectile(problem_text)
                     return ParsedProblem(success=True, scenario=scenario)
-
-                # Post-process circular motion
-                scenario_data = self._parse_circular_motion(scenario_data)
-                
-                print(f"Extracted JSON: {json.dumps(scenario_data, indent=2)}")
-
-                try:
-                    scenario = SimulationScenario(**scenario_data)
-                    return ParsedProblem(success=True, scenario=scenario)
-                except ValidationError as ve:
-                    print(f"Validation Error: {ve}, using fallback parser")
-                    from .fallback_parser import parse_simple_projectile
+                repairs += 1
+                scenario_data = await self._repair(problem_text, scenario_data, ve, deadline)
+                if not scenario_data:
+                    logger.warning("Failed to extract repaired JSON, using fallback parser")
+                    metrics.inc("llm_repairs_total", outcome="failed")
                     scenario = parse_simple_projectile(problem_text)
                     return ParsedProblem(success=True, scenario=scenario)
+        if repairs:
+            metrics.inc("llm_repairs_total", outcome="fixed")
+        
+        # Only model output is cached; fallback guesses are not
+        await self.cache.put(key, scenario)
+        self.templates.learn(template_key, problem_text, scenario)
+        return ParsedProblem(success=True, scenario=scenario)
+    
+    async def _repair(
+        self,
+        problem_text: str,
+        scenario_data: dict,
+        error: ValidationError,
+        deadline: float
+    ) -> Optional[dict]:
+        """Send the fields that failed validation back to the model to fix"""
+        errors = [
+            f"{'.'.join(str(part) for part in e['loc']) or '(root)'}: {e['msg']}"
+            for e in error.errors()
+        ]
+        logger.info("Asking the model to repair: %s", errors)
+        prompt = get_repair_prompt(problem_text, json.dumps(scenario_data, indent=2), errors)
+        response_text = await self.backend.generate(prompt, self.schema, deadline=deadline, kind="repair")
+        scenario_data = self._extract_json(response_text)
+        return self._parse_circular_motion(scenario_data) if scenario_data else None
+    
+    def _fallback(self, problem_text: str, error: Exception) -> ParsedProblem:
+        if isinstance(error, CircuitOpenError):
+            metrics.inc("local_parser_total", outcome="circuit_open")
+        else:
+            logger.warning("Parser exception, using fallback parser", exc_info=error)
+        try:
+            scenario = parse_simple_projectile(problem_text)
+            return ParsedProblem(success=True, scenario=scenario)
+        except:
+            return ParsedProblem(
+                success=False,
+                error_message=f"Error parsing problem: {str(error)}"
+            )
+    
+    async def parse_cached(self, problem_text: str) -> Optional[ParsedProblem]:
+        """The parse of a problem if it needs no model call, otherwise None"""
+        key, template_key = self._keys(problem_text)
+        scenario = await self._parse_fast(problem_text, key, template_key)
+        if scenario is None:
+            return None
+        return ParsedProblem(success=True, scenario=scenario)
+    
+    async def parse(self, problem_text: str, fast: bool = True) -> ParsedProblem:
+        """Parse a physics problem into structured format
 
+        Concurrent calls for the same (normalized) problem share one parse;
+        each caller gets its own copy of the result. Callers that already
+        missed with ``parse_cached`` pass ``fast=False`` to go straight to
+        the model.
+        """
+        key, template_key = self._keys(problem_text)
+        parsed = await self.flights.do(key, lambda: self._parse(problem_text, key, template_key, fast))
+        return parsed.model_copy(deep=True)
+    
+    async def _parse(self, problem_text: str, key: str, template_key: str, fast: bool = True) -> ParsedProblem:
+        if fast:
+            scenario = await self._parse_fast(problem_text, key, template_key)
+            if scenario is not None:
+                return ParsedProblem(success=True, scenario=scenario)
+        
+        try:
+            # One deadline for the whole request, however many calls it takes
+            deadline = time.monotonic() + config.LLM_DEADLINE
+            response_text = await self._generate(problem_text, deadline)
+            return await self._finish(problem_text, key, template_key, response_text, deadline)
         except Exception as e:
-            import traceback
-            print(f"Parser Exception: {traceback.format_exc()}")
+            return self._fallback(problem_text, e)
+    
+    async def parse_stream(self, problem_text: str) -> AsyncIterator[dict]:
+        """Parse a problem, yielding parts of the scenario as the model writes them
+
+        Yields ``{"type": "field", "key", "value"}`` for each completed
+        top-level field and ``{"type": "entity", "index", "value"}`` for each
+        completed entity, then ``{"type": "done", "parsed": ParsedProblem}``.
+        Cached and locally parsed problems go straight to "done". The parse
+        is registered like any other, so concurrent parses of the same problem
+        (streamed or not) share one model call; only the caller that started
+        it sees the partial events.
+        """
+        key, template_key = self._keys(problem_text)
+        events: asyncio.Queue = asyncio.Queue()
+        
+        async def stream() -> ParsedProblem:
             try:
-                from .fallback_parser import parse_simple_projectile
-                scenario = parse_simple_projectile(problem_text)
-                return ParsedProblem(success=True, scenario=scenario)
-            except:
-                return ParsedProblem(
-                    success=False,
-                    error_message=f"Error parsing problem: {str(e)}"
-                )
\ No newline at end of file
+                scenario = await self._parse_fast(problem_text, key, template_key)
+                if scenario is not None:
+                    return ParsedProblem(success=True, scenario=scenario)
+                
+                try:
+                    chunks = []
+                    incremental = IncrementalScenarioParser()
+                    deadline = time.monotonic() + config.LLM_DEADLINE
+                    async for chunk in self._generate_stream(problem_text, deadline):
+                        chunks.append(chunk)
+                        for event in incremental.feed(chunk):
+                            events.put_nowait(event)
+                    return await self._finish(problem_text, key, template_key, "".join(chunks), deadline)
+                except Exception as e:
+                    return self._fallback(problem_text, e)
+            finally:
+                events.put_nowait(None)
+        
+        # If someone else is already parsing this problem, ``stream`` never
+        # runs and only their result arrives
+        flight = asyncio.ensure_future(self.flights.do(key, stream))
+        getter = None
+        try:
+            while not flight.done():
+                getter = asyncio.ensure_future(events.get())
+                await asyncio.wait({getter, flight}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done() or getter.result() is None:
+                    break
+                yield getter.result()
+            while not events.empty():
+                event = events.get_nowait()
+                if event is not None:
+                    yield event
+            parsed = await flight
+        finally:
+            if getter is not None and not getter.done():
+                getter.cancel()
+            if not flight.done():
+                flight.cancel()
+        yield {"type": "done", "parsed": parsed.model_copy(deep=True)}
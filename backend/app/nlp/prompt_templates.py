@@ -1,6 +1,12 @@
 # backend/app/nlp/prompt_templates.py (ENHANCED COMPLETE UPDATE)
+import hashlib
+import re
+from typing import Dict, List, Tuple
+from .. import config
 
-PHYSICS_PARSER_PROMPT = """You are an expert physics simulation parser. Your task is to convert natural language physics problems into precise, structured JSON that drives a real-time physics simulation engine.
+# Sent first with every problem and never varies, so model servers that
+# cache prompt prefixes only process it once
+PROMPT_PREFIX = """You are an expert physics simulation parser. Your task is to convert natural language physics problems into precise, structured JSON that drives a real-time physics simulation engine.
 
 ## Core Extraction Requirements
 
@@ -56,7 +62,84 @@ For angled launches at angle θ and speed v:
 | `oscillation` | Pendulum or spring-mass system | Spring force or constraint |
 | `newton_laws` | Demonstrating force principles | Clear force application |
 
-## Collision Physics (PRECISE)
+## Force Specifications
+
+### Gravity
+```json
+{"type": "gravity", "parameters": {"g": 9.8}}
+```
+Use for: projectiles, free fall, pendulums
+
+## Object Spacing Strategy
+
+### Collisions
+- Head-on: Objects 30-40m apart horizontally, same y
+- Angle collision: Offset by 5-10m vertically
+- Multi-object: Evenly space across width
+
+### Single Object
+- Start at x=10 for rightward motion
+- Start at x=50 for vertical motion
+- Sufficient space for trajectory
+
+### Environment Sizing
+- Width: Max trajectory distance × 1.2
+- Height: Max altitude × 1.5
+- Minimum: 100×80 for projectiles
+- Circular motion: 100×100 square
+
+## Color Palette (MANDATORY)
+
+Assign distinct colors to different objects:
+1. "#e74c3c" - Red (high energy, primary object)
+2. "#3498db" - Blue (secondary object, water)
+3. "#9b59b6" - Purple (tertiary object, circular motion)
+4. "#1abc9c" - Teal (spring/oscillation)
+5. "#f39c12" - Orange (friction/drag scenarios)
+6. "#e67e22" - Deep orange (heavy objects)
+7. "#16a085" - Dark teal (projectiles with drag)
+8. "#27ae60" - Green (static reference points)
+
+## Duration Estimation
+
+| Scenario | Duration |
+|----------|----------|
+| Quick collision | 3-5s |
+| Projectile motion | 4-6s |
+| Free fall from height | Calculate: t = √(2h/g) × 2 |
+| Oscillation | 10-15s |
+| Circular motion | 12-20s |
+| Multiple collisions | 8-10s |
+
+## Common Pitfalls (AVOID THESE)
+
+❌ Using degrees instead of calculating velocity components
+❌ Forgetting to include "circular_motion" metadata for circular scenarios
+❌ Adding gravity to circular motion (causes spiral, not circle)
+❌ Negative y-position for objects starting on ground
+❌ Objects too close together for collisions (< 15m spacing)
+❌ Insufficient environment size for trajectory
+❌ Wrong velocity direction (confusing upward/downward signs)
+❌ Forgetting force parameters (e.g., gravity without "g" value)
+❌ Inconsistent units (mixing km/h with m/s)
+
+## Final Checklist Before Responding
+
+✓ Scenario type correctly identified
+✓ All velocities properly decomposed (angles → x,y components)
+✓ Circular motion has metadata block
+✓ Object spacing appropriate for scenario
+✓ Forces list matches scenario type
+✓ Environment dimensions accommodate full motion
+✓ Duration realistic for scenario
+✓ Colors distinct for multiple objects
+✓ Units all in SI (m, m/s, kg, rad/s)
+✓ Y-coordinates: ground=0, sky=positive
+"""
+
+# Rules that only matter for some scenarios, by tag, in prompt order
+RULE_SECTIONS: Dict[str, str] = {
+    "collision": """## Collision Physics (PRECISE)
 
 ### Restitution Coefficient (e)
 - **e = 1.0**: Perfectly elastic - Total KE conserved, maximum bounce
@@ -69,8 +152,8 @@ For angled launches at angle θ and speed v:
 - Space objects 20-40 meters apart horizontally
 - Same y-position for head-on collisions
 - Provide sufficient relative velocity for visible collision
-
-## Circular Motion (CRITICAL - RECENTLY FIXED)
+""",
+    "circular_motion": """## Circular Motion (CRITICAL - RECENTLY FIXED)
 
 For problems with keywords: "circle", "circular", "orbit", "revolve", "rotate"
 
@@ -106,22 +189,14 @@ Calculate: ω = v / R (angular velocity in rad/s)
 3. Include "circular_motion" metadata in entity
 4. DO NOT include gravity force
 5. Center typically at (50, 50) for 100×100 environment
-
-## Force Specifications
-
-### Gravity
-```json
-{"type": "gravity", "parameters": {"g": 9.8}}
-```
-Use for: projectiles, free fall, pendulums
-
-### Drag (Air Resistance)
+""",
+    "drag": """## Drag (Air Resistance)
 ```json
 {"type": "drag", "parameters": {"coefficient": 0.1}}
 ```
 Coefficient range: 0.05 (minimal) to 0.5 (high)
-
-### Friction
+""",
+    "friction": """## Friction
 ```json
 {"type": "friction", "parameters": {"mu_k": 0.3, "mu_s": 0.5}}
 ```
@@ -129,8 +204,8 @@ Coefficient range: 0.05 (minimal) to 0.5 (high)
 - Wood on wood: 0.4/0.3
 - Ice: 0.1/0.05
 - Rubber: 0.8/0.7
-
-### Spring Force
+""",
+    "spring": """## Spring Force
 ```json
 {"type": "spring", "parameters": {
   "k": 10,
@@ -139,52 +214,12 @@ Coefficient range: 0.05 (minimal) to 0.5 (high)
 }}
 ```
 For oscillations, pendulums (approximation)
+""",
+}
 
-## Object Spacing Strategy
-
-### Collisions
-- Head-on: Objects 30-40m apart horizontally, same y
-- Angle collision: Offset by 5-10m vertically
-- Multi-object: Evenly space across width
-
-### Single Object
-- Start at x=10 for rightward motion
-- Start at x=50 for vertical motion
-- Sufficient space for trajectory
-
-### Environment Sizing
-- Width: Max trajectory distance × 1.2
-- Height: Max altitude × 1.5
-- Minimum: 100×80 for projectiles
-- Circular motion: 100×100 square
-
-## Color Palette (MANDATORY)
-
-Assign distinct colors to different objects:
-1. "#e74c3c" - Red (high energy, primary object)
-2. "#3498db" - Blue (secondary object, water)
-3. "#9b59b6" - Purple (tertiary object, circular motion)
-4. "#1abc9c" - Teal (spring/oscillation)
-5. "#f39c12" - Orange (friction/drag scenarios)
-6. "#e67e22" - Deep orange (heavy objects)
-7. "#16a085" - Dark teal (projectiles with drag)
-8. "#27ae60" - Green (static reference points)
-
-## Duration Estimation
-
-| Scenario | Duration |
-|----------|----------|
-| Quick collision | 3-5s |
-| Projectile motion | 4-6s |
-| Free fall from height | Calculate: t = √(2h/g) × 2 |
-| Oscillation | 10-15s |
-| Circular motion | 12-20s |
-| Multiple collisions | 8-10s |
-
-## Examples (STUDY THESE CAREFULLY)
-
-### Example 1: Vertical Projectile
-```
+# Worked examples as (title, tags, body)
+EXAMPLES: List[Tuple[str, Tuple[str, ...], str]] = [
+    ("Vertical Projectile", ("projectile", "vertical"), """```
 Problem: "A ball is thrown straight up with a speed of 10 m/s"
 ```
 ```json
@@ -205,9 +240,8 @@ Problem: "A ball is thrown straight up with a speed of 10 m/s"
   "duration": 5.0
 }
 ```
-
-### Example 2: Angled Projectile
-```
+"""),
+    ("Angled Projectile", ("projectile", "angle"), """```
 Problem: "Launch projectile at 45 degrees with velocity 20 m/s"
 ```
 Calculation: θ = 45° = 0.785 rad
@@ -231,9 +265,8 @@ Calculation: θ = 45° = 0.785 rad
   "duration": 5.0
 }
 ```
-
-### Example 3: Elastic Collision
-```
+"""),
+    ("Elastic Collision", ("collision", "elastic"), """```
 Problem: "Two balls collide elastically. First ball (3 kg) moves right at 6 m/s, second ball (2 kg) is stationary"
 ```
 ```json
@@ -265,9 +298,8 @@ Problem: "Two balls collide elastically. First ball (3 kg) moves right at 6 m/s,
   "duration": 5.0
 }
 ```
-
-### Example 4: Circular Motion (CRITICAL)
-```
+"""),
+    ("Circular Motion (CRITICAL)", ("circular_motion",), """```
 Problem: "A 1.5 kg object moves in a circle of radius 8 m at 5 m/s"
 ```
 Calculation: ω = v/R = 5/8 = 0.625 rad/s
@@ -295,9 +327,8 @@ Calculation: ω = v/R = 5/8 = 0.625 rad/s
   "duration": 15.0
 }
 ```
-
-### Example 5: Perfectly Inelastic Collision
-```
+"""),
+    ("Perfectly Inelastic Collision", ("collision", "inelastic"), """```
 Problem: "Two objects collide and stick together. Object A (5 kg) at 8 m/s right, Object B (3 kg) at 4 m/s left"
 ```
 ```json
@@ -329,9 +360,8 @@ Problem: "Two objects collide and stick together. Object A (5 kg) at 8 m/s right
   "duration": 6.0
 }
 ```
-
-### Example 6: Free Fall from Height
-```
+"""),
+    ("Free Fall from Height", ("freefall",), """```
 Problem: "Drop a 2.5 kg ball from 25 meters"
 ```
 ```json
@@ -352,9 +382,8 @@ Problem: "Drop a 2.5 kg ball from 25 meters"
   "duration": 4.0
 }
 ```
-
-### Example 7: Projectile with Drag
-```
+"""),
+    ("Projectile with Drag", ("projectile", "drag", "angle"), """```
 Problem: "Launch at 30° with 18 m/s, air resistance coefficient 0.15"
 ```
 Calculation: 30° = 0.524 rad
@@ -381,9 +410,8 @@ Calculation: 30° = 0.524 rad
   "duration": 5.0
 }
 ```
-
-### Example 8: Spring Oscillation
-```
+"""),
+    ("Spring Oscillation", ("oscillation", "spring", "drag"), """```
 Problem: "Mass on spring, k=20 N/m, mass 0.8 kg, displaced 4 meters from rest"
 ```
 ```json
@@ -407,9 +435,8 @@ Problem: "Mass on spring, k=20 N/m, mass 0.8 kg, displaced 4 meters from rest"
   "duration": 12.0
 }
 ```
-
-### Example 9: Three-Body Collision
-```
+"""),
+    ("Three-Body Collision", ("collision", "inelastic", "multi"), """```
 Problem: "Three balls: 2kg at 5 m/s right, 1.5kg stationary, 1kg at 3 m/s left, all collide inelastically"
 ```
 ```json
@@ -450,9 +477,8 @@ Problem: "Three balls: 2kg at 5 m/s right, 1.5kg stationary, 1kg at 3 m/s left,
   "duration": 7.0
 }
 ```
-
-### Example 10: Newton's Third Law Demo
-```
+"""),
+    ("Newton's Third Law Demo", ("newton_laws", "multi"), """```
 Problem: "Two objects push apart. 6 kg object and 3 kg object, demonstrate action-reaction"
 ```
 ```json
@@ -484,42 +510,115 @@ Problem: "Two objects push apart. 6 kg object and 3 kg object, demonstrate actio
   "duration": 5.0
 }
 ```
+"""),
+]
 
-## Common Pitfalls (AVOID THESE)
+PROMPT_SUFFIX = """---
 
-❌ Using degrees instead of calculating velocity components
-❌ Forgetting to include "circular_motion" metadata for circular scenarios
-❌ Adding gravity to circular motion (causes spiral, not circle)
-❌ Negative y-position for objects starting on ground
-❌ Objects too close together for collisions (< 15m spacing)
-❌ Insufficient environment size for trajectory
-❌ Wrong velocity direction (confusing upward/downward signs)
-❌ Forgetting force parameters (e.g., gravity without "g" value)
-❌ Inconsistent units (mixing km/h with m/s)
-
-## Final Checklist Before Responding
+Now parse the following problem:
 
-✓ Scenario type correctly identified
-✓ All velocities properly decomposed (angles → x,y components)
-✓ Circular motion has metadata block
-✓ Object spacing appropriate for scenario
-✓ Forces list matches scenario type
-✓ Environment dimensions accommodate full motion
-✓ Duration realistic for scenario
-✓ Colors distinct for multiple objects
-✓ Units all in SI (m, m/s, kg, rad/s)
-✓ Y-coordinates: ground=0, sky=positive
+Problem: "__PROBLEM_TEXT__"
 
----
+Respond ONLY with the JSON object. No additional text, explanations, or markdown formatting.
+"""
 
-Now parse the following problem:
+# Sent after a response fails validation; short, since the model only has
+# to fix the listed fields
+REPAIR_PROMPT = """The JSON you produced for this physics problem failed validation.
 
 Problem: "__PROBLEM_TEXT__"
 
-Respond ONLY with the JSON object. No additional text, explanations, or markdown formatting.
+Your JSON:
+__RESPONSE__
+
+Errors:
+__ERRORS__
+
+Fix only the fields listed above and keep everything else unchanged.
+Respond ONLY with the corrected JSON object. No additional text, explanations, or markdown formatting.
 """
 
+# Cheap keyword classifier: a tag matches when its pattern occurs in the problem
+TAG_PATTERNS: Dict[str, re.Pattern] = {
+    "projectile": re.compile(r"projectile|launch|thrown|throw|kick|fired|cannon|horizontal|trajector"),
+    "vertical": re.compile(r"straight up|vertical|upward"),
+    "angle": re.compile(r"°|degree|angle|\bdeg\b"),
+    "freefall": re.compile(r"drop|falls?\b|falling|free.?fall|released from|from (a|the) (height|cliff|building|tower|roof)"),
+    "collision": re.compile(r"collid|collision|hits?\b|strikes?|crash|impact|head.?on|bounce"),
+    "elastic": re.compile(r"(?<!in)elastic|bounce"),
+    "inelastic": re.compile(r"inelastic|stick together|sticks?\b|coupl"),
+    "multi": re.compile(r"\b(three|four|five|several|multiple)\b|each other|cradle"),
+    "circular_motion": re.compile(r"circular|circle|orbit|revolv|rotat|centripetal|angular|rad/s|carousel|merry.?go"),
+    "oscillation": re.compile(r"oscillat|pendulum|harmonic|vibrat|bob\b"),
+    "spring": re.compile(r"spring|hooke|n/m"),
+    "drag": re.compile(r"drag|air resistance|wind"),
+    "friction": re.compile(r"friction|rough|slid|μ|\bmu\b"),
+    "newton_laws": re.compile(r"newton.?s third|action.{0,5}reaction|push(es)? (off|apart|away)|recoil"),
+}
 
-def get_parser_prompt(problem_text: str) -> str:
-    """Generate the prompt for parsing a physics problem"""
-    return PHYSICS_PARSER_PROMPT.replace("__PROBLEM_TEXT__", problem_text)
\ No newline at end of file
+# Scenario families outweigh modifiers like "angle" when ranking examples
+FAMILY_TAGS = {"projectile", "freefall", "collision", "circular_motion", "oscillation", "newton_laws"}
+
+# Angled Projectile and Elastic Collision, for problems nothing matched
+DEFAULT_EXAMPLES = (1, 2)
+
+def classify(problem_text: str) -> List[str]:
+    """Tags whose keywords occur in the problem"""
+    text = problem_text.lower()
+    return [tag for tag, pattern in TAG_PATTERNS.items() if pattern.search(text)]
+
+def select_examples(tags: List[str], max_examples: int) -> List[int]:
+    """Indexes of the examples most relevant to ``tags``, in prompt order"""
+    if max_examples <= 0:
+        return list(range(len(EXAMPLES)))
+    
+    scores = [
+        sum(2 if tag in FAMILY_TAGS else 1 for tag in example_tags if tag in tags)
+        for _, example_tags, _ in EXAMPLES
+    ]
+    ranked = sorted((i for i, score in enumerate(scores) if score > 0), key=lambda i: -scores[i])
+    chosen = ranked[:max_examples] or list(DEFAULT_EXAMPLES[:max_examples])
+    return sorted(chosen)
+
+def build_prompt(sections: List[str], examples: List[int]) -> str:
+    """The prompt template with the given rule sections and examples"""
+    parts = [PROMPT_PREFIX]
+    parts.extend(body for tag, body in RULE_SECTIONS.items() if tag in sections)
+    parts.append("## Examples (STUDY THESE CAREFULLY)\n")
+    for n, i in enumerate(examples, 1):
+        title, _, body = EXAMPLES[i]
+        parts.append(f"### Example {n}: {title}\n{body}")
+    parts.append(PROMPT_SUFFIX)
+    return "\n".join(parts)
+
+# Everything, for reference and for PROMPT_MAX_EXAMPLES=0
+PHYSICS_PARSER_PROMPT = build_prompt(list(RULE_SECTIONS), list(range(len(EXAMPLES))))
+
+def get_parser_prompt(problem_text: str, max_examples: int = config.PROMPT_MAX_EXAMPLES) -> str:
+    """Generate the prompt for parsing a physics problem
+    
+    Only the examples and rule sections relevant to the problem are
+    included; the shared prefix comes first and never changes.
+    """
+    if max_examples <= 0:
+        return PHYSICS_PARSER_PROMPT.replace("__PROBLEM_TEXT__", problem_text)
+    
+    tags = set(classify(problem_text))
+    examples = select_examples(list(tags), max_examples)
+    for i in examples:
+        tags.update(EXAMPLES[i][1])
+    if "oscillation" in tags:
+        tags.add("spring")
+    return build_prompt(sorted(tags), examples).replace("__PROBLEM_TEXT__", problem_text)
+
+def get_repair_prompt(problem_text: str, response_text: str, errors: List[str]) -> str:
+    """Ask the model to fix the fields of its response that failed validation"""
+    return (
+        REPAIR_PROMPT
+        .replace("__PROBLEM_TEXT__", problem_text)
+        .replace("__RESPONSE__", response_text.strip())
+        .replace("__ERRORS__", "\n".join(f"- {error}" for error in errors))
+    )
+
+# Changes whenever any part of the prompt does, so cached parses from an older prompt are not reused
+PROMPT_VERSION = hashlib.sha256(PHYSICS_PARSER_PROMPT.encode()).hexdigest()[:12]
@@ -0,0 +1,250 @@
+# backend/app/nlp/resilience.py
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+from .. import config
+from ..services.metrics import metrics
+from .backends import LLMBackend
+
+class CircuitOpenError(RuntimeError):
+    """The model server is considered down; use the local parser"""
+
+class UnusableResponseError(ValueError):
+    """The model answered, but not with anything the caller can use"""
+
+class LatencyTracker:
+    """Latencies of recent successful model calls"""
+    
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+    
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+    
+    def percentile(self, p: float) -> Optional[float]:
+        """The ``p``-th percentile, or None until there are enough samples"""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+class CircuitBreaker:
+    """Stop calling an upstream after repeated failures
+    
+    After ``failure_threshold`` failures in a row the circuit opens and
+    calls are refused for ``reset_timeout`` seconds. Then a single trial
+    call is let through (half-open): success closes the circuit, failure
+    opens it again.
+    """
+    
+    def __init__(
+        self,
+        failure_threshold: int = config.LLM_BREAKER_FAILURES,
+        reset_timeout: float = config.LLM_BREAKER_RESET
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+    
+    def allow(self) -> Tuple[bool, bool]:
+        """Whether a call may go upstream now, and whether it is the half-open trial"""
+        state = self.state
+        if state == "closed":
+            return True, False
+        if state == "half_open" and not self.trial_running:
+            self.trial_running = True
+            return True, True
+        return False, False
+    
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+    
+    def release(self):
+        """End the half-open trial; only the call that allow() made the trial calls this"""
+        self.trial_running = False
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                metrics.inc("llm_circuit_opened_total")
+            self.opened_at = time.monotonic()
+
+class ResilientBackend(LLMBackend):
+    """Bound how long a parse waits on the model
+    
+    Every call has a ``deadline``; callers can pass an earlier absolute one
+    (``time.monotonic()``) so several calls share one request's budget. If
+    the primary hasn't answered within the ``hedge_percentile`` of recent
+    latencies of the same ``kind`` of call, the same prompt is also sent to
+    ``hedge`` (or the primary again) and the first acceptable completion
+    wins. While the circuit breaker is open calls fail immediately with
+    CircuitOpenError, so the parser falls back to its local rules.
+    """
+    
+    def __init__(
+        self,
+        primary: LLMBackend,
+        hedge: Optional[LLMBackend] = None,
+        accept: Optional[Callable[[str], bool]] = None,
+        deadline: float = config.LLM_DEADLINE,
+        hedging: bool = config.LLM_HEDGE,
+        hedge_percentile: float = config.LLM_HEDGE_PERCENTILE,
+        hedge_delay: float = config.LLM_HEDGE_DELAY,
+        min_hedge_delay: float = config.LLM_HEDGE_MIN_DELAY,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        super().__init__(primary.model_name)
+        self.primary = primary
+        self.hedge = hedge or primary
+        self.accept = accept or (lambda text: bool(text.strip()))
+        self.deadline = deadline
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.breaker = breaker or CircuitBreaker()
+        # Per kind of call, so short repair prompts don't lower the hedge delay of parses
+        self.latencies: Dict[str, LatencyTracker] = defaultdict(LatencyTracker)
+    
+    async def open(self):
+        await self.primary.open()
+        if self.hedge is not self.primary:
+            await self.hedge.open()
+    
+    async def aclose(self):
+        await self.primary.aclose()
+        if self.hedge is not self.primary:
+            await self.hedge.aclose()
+    
+    def hedge_after(self, kind: str = "parse") -> float:
+        """Seconds to wait on the primary before hedging"""
+        observed = self.latencies[kind].percentile(self.hedge_percentile)
+        delay = observed if observed is not None else self.hedge_delay
+        return min(max(delay, self.min_hedge_delay), self.deadline)
+    
+    def _admit(self) -> bool:
+        """Let a call through the breaker; True if it is the half-open trial"""
+        allowed, trial = self.breaker.allow()
+        if not allowed:
+            metrics.inc("llm_calls_total", outcome="circuit_open")
+            raise CircuitOpenError("Model server unavailable (circuit open)")
+        return trial
+    
+    def _record(self, outcome: str, started: float, kind: str = "parse"):
+        metrics.inc("llm_calls_total", outcome=outcome)
+        if outcome in ("ok", "hedged"):
+            self.latencies[kind].record(time.monotonic() - started)
+            self.breaker.record_success()
+        elif outcome not in ("budget", "unusable"):
+            # Running out of the caller's budget, or a bad answer from a server
+            # that did answer, says nothing about whether the server is up
+            self.breaker.record_failure()
+    
+    def _end(self, started: float, deadline: Optional[float]) -> Tuple[float, str]:
+        """When a call started at ``started`` must finish, and the outcome if it doesn't"""
+        own = started + self.deadline
+        if deadline is not None and deadline < own:
+            return deadline, "budget"
+        return own, "deadline"
+    
+    async def _attempt(self, backend: LLMBackend, prompt: str, schema: Optional[dict]) -> str:
+        text = await backend.generate(prompt, schema)
+        if not self.accept(text):
+            raise UnusableResponseError("Model response has no usable JSON")
+        return text
+    
+    async def generate(
+        self,
+        prompt: str,
+        schema: Optional[dict] = None,
+        deadline: Optional[float] = None,
+        kind: str = "parse"
+    ) -> str:
+        trial = self._admit()
+        started = time.monotonic()
+        end, expired = self._end(started, deadline)
+        hedge_at = started + self.hedge_after(kind) if self.hedging else None
+        attempts = {asyncio.ensure_future(self._attempt(self.primary, prompt, schema)): "ok"}
+        error: Optional[BaseException] = None
+        answered = False
+        
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= end:
+                    self._record(expired, started, kind)
+                    raise asyncio.TimeoutError(f"No model response within {end - started:g}s")
+                if hedge_at is not None and (now >= hedge_at or not attempts):
+                    # The primary is slow (or already failed): race a second call
+                    hedge_at = None
+                    metrics.inc("llm_hedges_total")
+                    attempts[asyncio.ensure_future(self._attempt(self.hedge, prompt, schema))] = "hedged"
+                if not attempts:
+                    self._record("unusable" if answered else "error", started, kind)
+                    raise error
+                
+                wake = min(end, hedge_at) if hedge_at is not None else end
+                done, _ = await asyncio.wait(attempts, timeout=wake - now, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    outcome = attempts.pop(task)
+                    if task.exception() is None:
+                        self._record(outcome, started, kind)
+                        return task.result()
+                    error = task.exception()
+                    answered = answered or isinstance(error, UnusableResponseError)
+        finally:
+            for task in attempts:
+                task.cancel()
+            if trial:
+                self.breaker.release()
+    
+    async def generate_stream(
+        self,
+        prompt: str,
+        schema: Optional[dict] = None,
+        deadline: Optional[float] = None,
+        kind: str = "parse"
+    ) -> AsyncIterator[str]:
+        # Streams are not hedged (the client is already watching this one),
+        # but they get the same deadline and breaker
+        trial = self._admit()
+        started = time.monotonic()
+        end, expired = self._end(started, deadline)
+        chunks = self.primary.generate_stream(prompt, schema).__aiter__()
+        try:
+            while True:
+                remaining = end - time.monotonic()
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, remaining))
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    self._record(expired, started, kind)
+                    raise
+                except Exception:
+                    self._record("error", started, kind)
+                    raise
+                yield chunk
+            self._record("ok", started, kind)
+        finally:
+            await chunks.aclose()
+            if trial:
+                self.breaker.release()
+    
+    def collect(self, registry):
+        """Gauges for this backend; the owner registers it with the metrics registry"""
+        registry.set_gauge("llm_circuit_open", int(self.breaker.state != "closed"))
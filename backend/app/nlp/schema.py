@@ -1,4 +1,5 @@
 # backend/app/nlp/schema.py
+from functools import lru_cache
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 
@@ -11,6 +12,9 @@ class PhysicsEntity(BaseModel):
     color: str = "#3498db"
     initial_position: Dict[str, float] = Field(default_factory=lambda: {"x": 50.0, "y": 0.0})
     initial_velocity: Dict[str, float] = Field(default_factory=lambda: {"x": 0.0, "y": 0.0})
+    # {"enabled", "center": {"x", "y"}, "radius", "linear_velocity"} for
+    # entities moving on a circle
+    circular_motion: Optional[Dict[str, Any]] = None
 
 class PhysicsForce(BaseModel):
     """Represents a force in the simulation"""
@@ -35,3 +39,8 @@ class ParsedProblem(BaseModel):
     success: bool
     scenario: Optional[SimulationScenario] = None
     error_message: Optional[str] = None
+
+@lru_cache(maxsize=None)
+def scenario_json_schema() -> Dict[str, Any]:
+    """JSON schema of SimulationScenario, for schema-constrained generation"""
+    return SimulationScenario.model_json_schema()
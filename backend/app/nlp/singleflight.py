@@ -0,0 +1,51 @@
+# backend/app/nlp/singleflight.py
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+from ..services.metrics import metrics
+
+T = TypeVar("T")
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Run one call per key at a time, sharing its result with every concurrent caller
+
+    The call runs in its own task. A caller that is cancelled just stops
+    waiting; the call itself is only cancelled once no callers are left.
+    Results and exceptions (including the call's own cancellation) reach
+    all waiters. Finished calls are forgotten, so later callers start fresh.
+    """
+    
+    def __init__(self, name: str = "parse"):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+    
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            metrics.inc("singleflight_calls_total", flight=self.name)
+        else:
+            metrics.inc("singleflight_shared_total", flight=self.name)
+        
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+    
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
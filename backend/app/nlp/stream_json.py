@@ -0,0 +1,125 @@
+# backend/app/nlp/stream_json.py
+import json
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+class IncrementalScenarioParser:
+    """Pick completed parts out of a scenario JSON object as it streams in
+    
+    Tracks string/nesting state across chunks, so every character is scanned
+    once and only the chunks a pending value started in are kept. A top-level
+    field is emitted when its value is complete, and each item of the
+    ``entities`` array as soon as its closing brace arrives, long before the
+    whole object is.
+    """
+    
+    def __init__(self, item_key: str = "entities"):
+        self.item_key = item_key
+        # Chunks still needed for values being collected, as (offset, chunk);
+        # positions below are offsets into the whole stream
+        self.chunks: Deque[Tuple[int, str]] = deque()
+        self.pos = 0
+        self.depth = 0
+        self.started = False
+        self.done = False
+        self.in_string = False
+        self.escape = False
+        self.expect_key = False
+        self.key: Optional[str] = None
+        self.key_start = 0
+        self.value_start: Optional[int] = None
+        self.item_start: Optional[int] = None
+        self.items = 0
+    
+    def feed(self, chunk: str) -> List[dict]:
+        """Consume a chunk and return the events it completed"""
+        events = []
+        if self.done or not chunk:
+            return events
+        
+        offset = self.pos
+        self.chunks.append((offset, chunk))
+        for j, ch in enumerate(chunk):
+            i = offset + j
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.expect_key:
+                        self.key = json.loads(self._slice(self.key_start, i + 1))
+                        self.expect_key = False
+            elif not self.started:
+                # Skip anything before the object, e.g. a ```json fence
+                if ch == "{":
+                    self.started = True
+                    self.depth = 1
+                    self.expect_key = True
+            elif ch == '"':
+                self.in_string = True
+                if self.depth == 1 and self.expect_key:
+                    self.key_start = i
+            elif ch == ":" and self.depth == 1:
+                self.value_start = i + 1
+            elif ch in "{[":
+                self.depth += 1
+                if self.depth == 3 and ch == "{" and self.key == self.item_key:
+                    self.item_start = i
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 2 and ch == "}" and self.item_start is not None:
+                    self._emit_item(self._slice(self.item_start, i + 1), events)
+                    self.item_start = None
+                elif self.depth == 0:
+                    self._emit_field(i, events)
+                    self.done = True
+                    break
+            elif ch == "," and self.depth == 1:
+                self._emit_field(i, events)
+                self.expect_key = True
+        
+        self.pos = offset + len(chunk)
+        self._trim()
+        return events
+    
+    def _slice(self, start: int, end: int) -> str:
+        """Stream text from ``start`` to ``end``, read from the newest chunks back"""
+        parts = []
+        for offset, chunk in reversed(self.chunks):
+            if offset + len(chunk) <= start:
+                break
+            if offset < end:
+                parts.append(chunk[max(0, start - offset):end - offset])
+        return "".join(reversed(parts))
+    
+    def _trim(self):
+        """Drop chunks that no value being collected reaches back into"""
+        needed = [self.pos]
+        if self.value_start is not None:
+            needed.append(self.value_start)
+        if self.item_start is not None:
+            needed.append(self.item_start)
+        if self.in_string and self.expect_key:
+            needed.append(self.key_start)
+        keep = min(needed)
+        while self.chunks and self.chunks[0][0] + len(self.chunks[0][1]) <= keep:
+            self.chunks.popleft()
+    
+    def _emit_item(self, raw: str, events: List[dict]):
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return
+        events.append({"type": "entity", "index": self.items, "value": value})
+        self.items += 1
+    
+    def _emit_field(self, end: int, events: List[dict]):
+        if self.key is not None and self.value_start is not None:
+            try:
+                events.append({"type": "field", "key": self.key, "value": json.loads(self._slice(self.value_start, end))})
+            except ValueError:
+                pass
+        self.key = None
+        self.value_start = None
@@ -0,0 +1,339 @@
+# backend/app/nlp/templates.py
+import copy
+import hashlib
+import math
+import re
+from collections import OrderedDict
+from typing import Any, List, NamedTuple, Optional, Tuple
+from .. import config
+from ..services.metrics import metrics
+from .cache import normalize_text
+from .schema import SimulationScenario
+
+# A number, optionally followed by a unit. Units are only used to convert
+# to SI when binding; the skeleton keeps them, so "20 m" and "20 cm" differ.
+_NUMBER = re.compile(
+    r"(?<![\w.])(?P<value>[-+]?\d+(?:\.\d+)?)(?![\w.]*\d)\s*"
+    r"(?P<unit>km/h|m/s²|m/s\^?2|m/s|rad/s|n/m|cm|mm|km|kg|grams?|°|degrees?|deg|m|s|n)?(?![a-z])",
+    re.IGNORECASE
+)
+
+_UNIT_FACTORS = {
+    "km/h": 1 / 3.6,
+    "cm": 0.01,
+    "mm": 0.001,
+    "km": 1000.0,
+    "g": 0.001,
+    "gram": 0.001,
+    "grams": 0.001,
+}
+_ANGLE_UNITS = {"°", "degree", "degrees", "deg"}
+
+# Field names a number with this unit may be bound to, so "1 kg" never
+# binds an unrelated field that happens to be 1.0. Unitless numbers can
+# bind any field.
+_LENGTH_HINTS = ("position", "radius", "height", "width", "length", "distance", "center", "ground", "x", "y")
+_UNIT_HINTS = {
+    "kg": ("mass",),
+    "g": ("mass",),
+    "gram": ("mass",),
+    "grams": ("mass",),
+    "m/s": ("velocity", "speed"),
+    "km/h": ("velocity", "speed"),
+    "m/s²": ("gravity", "accel", "strength"),
+    "m/s^2": ("gravity", "accel", "strength"),
+    "m/s2": ("gravity", "accel", "strength"),
+    "rad/s": ("angular", "omega"),
+    "n/m": ("k", "stiffness", "spring", "constant"),
+    "n": ("force", "magnitude", "tension"),
+    "s": ("duration", "time", "period"),
+    "m": _LENGTH_HINTS,
+    "cm": _LENGTH_HINTS,
+    "mm": _LENGTH_HINTS,
+    "km": _LENGTH_HINTS,
+}
+for _unit in _ANGLE_UNITS:
+    _UNIT_HINTS[_unit] = ("angle", "theta")
+
+REL_TOL = 5e-3
+
+Path = Tuple[Any, ...]
+
+class Number(NamedTuple):
+    value: float
+    unit: str
+    literal: str
+    
+    @property
+    def is_angle(self) -> bool:
+        return self.unit in _ANGLE_UNITS
+    
+    @property
+    def si_value(self) -> float:
+        return self.value * _UNIT_FACTORS.get(self.unit, 1.0)
+    
+    def fits(self, path: Path) -> bool:
+        """Whether a field at ``path`` can hold a quantity in this unit"""
+        hints = _UNIT_HINTS.get(self.unit)
+        if not hints:
+            return True
+        keys = [key.lower() for key in path if isinstance(key, str)]
+        return any(hint == key or (len(hint) > 2 and hint in key) for hint in hints for key in keys)
+    
+    def factors(self) -> List[float]:
+        """Multipliers a scenario field may apply to this number"""
+        factors = [1.0]
+        if self.unit in _UNIT_FACTORS:
+            factors.insert(0, _UNIT_FACTORS[self.unit])
+        if self.is_angle:
+            factors.append(math.pi / 180)
+        return factors
+
+def extract_numbers(text: str) -> List[Number]:
+    """Numeric literals in ``text`` with their (lower-cased) units"""
+    return [
+        Number(float(m.group("value")), (m.group("unit") or "").lower(), m.group("value"))
+        for m in _NUMBER.finditer(text)
+    ]
+
+def skeleton(text: str) -> str:
+    """The text with every number replaced by a placeholder"""
+    text = _NUMBER.sub(lambda m: f"# {m.group('unit') or ''} ", normalize_text(text))
+    return " ".join(text.split())
+
+def _close(a: float, b: float) -> bool:
+    return math.isclose(a, b, rel_tol=REL_TOL, abs_tol=1e-9)
+
+def _numeric_leaves(data: Any, path: Path = ()) -> List[Tuple[Path, float]]:
+    if isinstance(data, dict):
+        return [leaf for key, value in data.items() for leaf in _numeric_leaves(value, path + (key,))]
+    if isinstance(data, list):
+        return [leaf for i, value in enumerate(data) for leaf in _numeric_leaves(value, path + (i,))]
+    if isinstance(data, (int, float)) and not isinstance(data, bool):
+        return [(path, float(data))]
+    return []
+
+def _vector_dicts(data: Any, path: Path = ()) -> List[Path]:
+    found = []
+    if isinstance(data, dict):
+        if set(data) == {"x", "y"}:
+            found.append(path)
+        for key, value in data.items():
+            found.extend(_vector_dicts(value, path + (key,)))
+    elif isinstance(data, list):
+        for i, value in enumerate(data):
+            found.extend(_vector_dicts(value, path + (i,)))
+    return found
+
+def _get(data: Any, path: Path) -> Any:
+    for key in path:
+        data = data[key]
+    return data
+
+def _set(data: Any, path: Path, value: Any):
+    for key in path[:-1]:
+        data = data[key]
+    data[path[-1]] = value
+
+def _envelope(data: dict) -> Tuple[float, float, float]:
+    """How far right and how high the entities get, and how long until the
+    last one lands, assuming ballistic motion under the scenario's gravity"""
+    g = 0.0
+    for force in data.get("forces", []):
+        if force.get("type") == "gravity":
+            g = float(force.get("parameters", {}).get("g", 9.8))
+    ground = float(data.get("environment", {}).get("ground_level", 0) or 0)
+    
+    right = top = landing = 0.0
+    for entity in data.get("entities", []):
+        position, velocity = entity.get("initial_position", {}), entity.get("initial_velocity", {})
+        x, y = position.get("x", 0.0), position.get("y", 0.0)
+        vx, vy = velocity.get("x", 0.0), velocity.get("y", 0.0)
+        radius = entity.get("radius", 0)
+        end_x, apex = x, y
+        if g > 0:
+            flight = (vy + math.sqrt(max(0.0, vy * vy + 2 * g * (y - ground)))) / g
+            end_x = x + vx * flight
+            apex = y + max(vy, 0.0) ** 2 / (2 * g)
+            landing = max(landing, flight)
+        right = max(right, x + radius, end_x + radius)
+        top = max(top, apex + radius)
+    return right, top, landing
+
+def _axis(key: Any) -> Optional[int]:
+    """Which envelope measure an environment field scales with: 0 for
+    horizontal extents, 1 for vertical ones, None for neither"""
+    key = str(key).lower()
+    if "width" in key or key == "x" or key.startswith("x_") or key.endswith("_x"):
+        return 0
+    if "height" in key or key == "y" or key.startswith("y_") or key.endswith("_y"):
+        return 1
+    return None
+
+class ScenarioTemplate:
+    """A parsed scenario with its fields bound to the numbers of the problem text
+    
+    ``scale`` bindings are (path, number index, factor): field = number * factor.
+    ``polar`` bindings are (path, speed index, angle index, sign x, sign y) for
+    vectors the model decomposed from a speed and an angle.
+    
+    Fields the model sized to the motion rather than took from the text
+    (world width and height, other environment extents, duration) are
+    rescaled by how much the motion's envelope changes.
+    """
+    
+    def __init__(self, data: dict, numbers: List[Number], scale: list, polar: list):
+        self.data = data
+        self.numbers = numbers
+        self.scale = scale
+        self.polar = polar
+        self.bound_paths = {path for path, _, _ in scale}
+        for path, *_ in polar:
+            self.bound_paths.update((path + ("x",), path + ("y",)))
+        self.envelope = _envelope(data)
+    
+    @classmethod
+    def learn(cls, text: str, scenario: SimulationScenario) -> Optional["ScenarioTemplate"]:
+        """Bind every number in ``text`` to scenario fields, or None if that's not possible"""
+        numbers = extract_numbers(text)
+        if not numbers:
+            return None
+        
+        data = scenario.model_dump()
+        bound = set()
+        claimed = set()
+        polar = []
+        
+        # Speed/angle decompositions first, so the angle gets bound
+        angles = [i for i, n in enumerate(numbers) if n.is_angle]
+        for path in _vector_dicts(data):
+            vec = _get(data, path)
+            x, y = float(vec["x"]), float(vec["y"])
+            matches = [
+                (s, a) for a in angles for s, speed in enumerate(numbers)
+                if s != a and not speed.is_angle and speed.fits(path)
+                and _close(abs(x), speed.si_value * abs(math.cos(math.radians(numbers[a].value))))
+                and _close(abs(y), speed.si_value * abs(math.sin(math.radians(numbers[a].value))))
+            ]
+            if len(matches) == 1:
+                s, a = matches[0]
+                polar.append((path, s, a, math.copysign(1, x), math.copysign(1, y)))
+                bound.update((s, a))
+                claimed.update((path + ("x",), path + ("y",)))
+        
+        scale = []
+        for path, value in _numeric_leaves(data):
+            if path in claimed or value == 0:
+                continue
+            matches = {
+                (i, factor) for i, number in enumerate(numbers)
+                for factor in number.factors()
+                if number.value != 0 and number.fits(path) and _close(value, number.value * factor)
+            }
+            indexes = {i for i, _ in matches}
+            if len(indexes) > 1:
+                return None  # Can't tell which number this field came from
+            if matches:
+                i, factor = min(matches, key=lambda m: abs(m[1] - 1.0))
+                scale.append((path, i, factor))
+                bound.add(i)
+        
+        # A number that no field depends on may still matter (e.g. a time
+        # asked about), so the template would silently ignore changes to it
+        if len(bound) != len(numbers):
+            return None
+        return cls(data, numbers, scale, polar)
+    
+    def instantiate(self, text: str) -> Optional[SimulationScenario]:
+        """The scenario for ``text``, a problem with the same skeleton"""
+        numbers = extract_numbers(text)
+        if len(numbers) != len(self.numbers) or any(n.unit != o.unit for n, o in zip(numbers, self.numbers)):
+            return None
+        
+        data = copy.deepcopy(self.data)
+        for path, i, factor in self.scale:
+            _set(data, path, numbers[i].value * factor)
+        for path, s, a, sign_x, sign_y in self.polar:
+            speed, angle = numbers[s].si_value, math.radians(numbers[a].value)
+            vec = _get(data, path)
+            vec["x"] = sign_x * abs(speed * math.cos(angle))
+            vec["y"] = sign_y * abs(speed * math.sin(angle))
+        self._fit_derived(data)
+        
+        data["description"] = self._rewrite_description(data.get("description", ""), numbers)
+        return SimulationScenario(**data)
+    
+    def _fit_derived(self, data: dict):
+        """Rescale the unbound extents and duration to the new motion"""
+        envelope = _envelope(data)
+        ratios = [new / old if old > 0 else 1.0 for new, old in zip(envelope, self.envelope)]
+        right, top, landing = envelope
+        
+        environment = data.get("environment", {})
+        for path, value in _numeric_leaves(environment, ("environment",)):
+            axis = _axis(path[-1])
+            if axis is None or path in self.bound_paths:
+                continue
+            _set(data, path, round(value * ratios[axis], 3))
+        # The world must at least contain the motion
+        for key, extent in (("width", right), ("height", top)):
+            if ("environment", key) not in self.bound_paths and isinstance(environment.get(key), (int, float)):
+                environment[key] = max(environment[key], math.ceil(extent))
+        
+        if ("duration",) not in self.bound_paths and isinstance(data.get("duration"), (int, float)):
+            data["duration"] = max(round(data["duration"] * ratios[2], 2), round(landing, 2))
+    
+    def _rewrite_description(self, description: str, numbers: List[Number]) -> str:
+        replacements = {old.literal: new.literal for old, new in zip(self.numbers, numbers)}
+        return re.sub(
+            r"(?<![\w.])[-+]?\d+(?:\.\d+)?(?![\w.]*\d)",
+            lambda m: replacements.get(m.group(0), m.group(0)),
+            description
+        )
+
+class TemplateCache:
+    """Scenario templates by text skeleton, so problems that differ only in
+    their numbers reuse one model parse"""
+    
+    def __init__(self, max_entries: int = config.TEMPLATE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._templates: "OrderedDict[str, ScenarioTemplate]" = OrderedDict()
+    
+    @staticmethod
+    def key(model_name: str, prompt_version: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{prompt_version}\0{skeleton(text)}".encode()).hexdigest()
+    
+    def get(self, key: str, text: str) -> Optional[SimulationScenario]:
+        """Instantiate the template for ``key`` with the numbers of ``text``"""
+        template = self._templates.get(key)
+        if template is None:
+            metrics.inc("template_cache_misses_total")
+            return None
+        
+        try:
+            scenario = template.instantiate(text)
+        except Exception as e:
+            print(f"Template instantiation failed: {e}")
+            scenario = None
+        if scenario is None:
+            metrics.inc("template_cache_misses_total")
+            return None
+        
+        self._templates.move_to_end(key)
+        metrics.inc("template_cache_hits_total")
+        return scenario
+    
+    def learn(self, key: str, text: str, scenario: SimulationScenario) -> bool:
+        """Remember a model parse as a template if its numbers can be bound"""
+        if self.max_entries <= 0:
+            return False
+        template = ScenarioTemplate.learn(text, scenario)
+        if template is None:
+            return False
+        
+        self._templates[key] = template
+        self._templates.move_to_end(key)
+        while len(self._templates) > self.max_entries:
+            self._templates.popitem(last=False)
+        metrics.inc("template_cache_learned_total")
+        return True
@@ -1,5 +1,5 @@
 # backend/app/physics/object.py (UPDATE)
-from typing import List, Optional, Dict
+from typing import Any, Callable, List, Optional, Dict, Sequence
 from .vector import Vector
 from .forces import Force
 from .circular_motion import CircularMotion
@@ -157,48 +157,77 @@ class PhysicsObject:
         if self.circular_motion:
             self.circular_motion.angle = 0
     
-    def to_dict(self) -> dict:
-        """Convert to dictionary for JSON serialization"""
-        data = {
-            "id": self.object_id,
-            "mass": self.mass,
-            "position": self.position.to_dict(),
-            "velocity": self.velocity.to_dict(),
-            "acceleration": self.acceleration.to_dict(),
-            "radius": self.radius,
-            "label": self.label,
-            "color": self.color,
-            "is_static": self.is_static,
-            "shape": self.shape,
-            "width": self.width,
-            "height": self.height,
-            
-            # Energy and momentum
-            "kinetic_energy": self.kinetic_energy,
-            "potential_energy": self.potential_energy,
-            "mechanical_energy": self.kinetic_energy + self.potential_energy,
-            "momentum": self.momentum.to_dict(),
-            "momentum_magnitude": self.momentum.magnitude(),
-            
-            # Initial state
-            "initial_position": self.initial_position.to_dict(),
-            "initial_velocity": self.initial_velocity.to_dict(),
-            "displacement": self.get_displacement().to_dict(),
-            "displacement_magnitude": self.get_displacement().magnitude(),
-            "distance_traveled": self.get_distance_traveled(),
-            
-            # Display options
-            "show_velocity_vector": self.show_velocity_vector,
-            "show_force_vectors": self.show_force_vectors,
-            "show_trajectory": self.show_trajectory,
-            
-            # Collision properties
-            "collision_type": self.collision_type,
-            "restitution": self.restitution,
-        }
-        
-        # Add circular motion info if enabled
-        if self.circular_motion and self.circular_motion.enabled:
-            data["circular_motion"] = self.circular_motion.to_dict()
-        
+    def to_dict(self, fields: Optional[Sequence[str]] = None) -> dict:
+        """Convert to dictionary for JSON serialization
+
+        Only the requested fields are computed; ``None`` means every field.
+        """
+        data = {}
+        for name in (fields if fields is not None else OBJECT_FIELDS):
+            if name == "circular_motion":
+                # Add circular motion info if enabled
+                if self.circular_motion and self.circular_motion.enabled:
+                    data["circular_motion"] = self.circular_motion.to_dict()
+                continue
+            data[name] = _OBJECT_FIELD_GETTERS[name](self)
         return data
+
+
+# Field getters used by PhysicsObject.to_dict, in payload order
+_OBJECT_FIELD_GETTERS: Dict[str, Callable[[PhysicsObject], Any]] = {
+    "id": lambda o: o.object_id,
+    "mass": lambda o: o.mass,
+    "position": lambda o: o.position.to_dict(),
+    "velocity": lambda o: o.velocity.to_dict(),
+    "acceleration": lambda o: o.acceleration.to_dict(),
+    "radius": lambda o: o.radius,
+    "label": lambda o: o.label,
+    "color": lambda o: o.color,
+    "is_static": lambda o: o.is_static,
+    "shape": lambda o: o.shape,
+    "width": lambda o: o.width,
+    "height": lambda o: o.height,
+
+    # Energy and momentum
+    "kinetic_energy": lambda o: o.kinetic_energy,
+    "potential_energy": lambda o: o.potential_energy,
+    "mechanical_energy": lambda o: o.kinetic_energy + o.potential_energy,
+    "momentum": lambda o: o.momentum.to_dict(),
+    "momentum_magnitude": lambda o: o.momentum.magnitude(),
+
+    # Initial state
+    "initial_position": lambda o: o.initial_position.to_dict(),
+    "initial_velocity": lambda o: o.initial_velocity.to_dict(),
+    "displacement": lambda o: o.get_displacement().to_dict(),
+    "displacement_magnitude": lambda o: o.get_displacement().magnitude(),
+    "distance_traveled": lambda o: o.get_distance_traveled(),
+
+    # Display options
+    "show_velocity_vector": lambda o: o.show_velocity_vector,
+    "show_force_vectors": lambda o: o.show_force_vectors,
+    "show_trajectory": lambda o: o.show_trajectory,
+
+    # Collision properties
+    "collision_type": lambda o: o.collision_type,
+    "restitution": lambda o: o.restitution,
+}
+
+OBJECT_FIELDS = tuple(_OBJECT_FIELD_GETTERS) + ("circular_motion",)
+
+# Object fields included at each detail level ("full" means all of them)
+OBJECT_DETAIL_FIELDS: Dict[str, tuple] = {
+    "minimal": ("id", "position", "velocity"),
+    "render": (
+        "id", "position", "velocity", "acceleration", "radius", "label", "color",
+        "is_static", "shape", "width", "height",
+        "show_velocity_vector", "show_force_vectors", "show_trajectory",
+    ),
+    "analysis": (
+        "id", "mass", "position", "velocity", "acceleration",
+        "kinetic_energy", "potential_energy", "mechanical_energy",
+        "momentum", "momentum_magnitude",
+        "initial_position", "initial_velocity", "displacement",
+        "displacement_magnitude", "distance_traveled", "circular_motion",
+    ),
+    "full": OBJECT_FIELDS,
+}
@@ -1,4 +1,5 @@
 # backend/app/physics/simulator.py (UPDATE)
+from typing import Optional, Sequence
 from .world import World
 from .object import PhysicsObject
 
@@ -31,6 +32,7 @@ class Simulator:
         
         # Update world time
         self.world.time += self.dt
+        self.world.touch()
         
         # Track energy
         energy = self.world.calculate_total_energy()
@@ -44,17 +46,17 @@ class Simulator:
         # Reset step mode
         self.step_mode = False
     
-    def run_steps(self, num_steps: int = 1) -> dict:
+    def run_steps(self, num_steps: int = 1, detail: str = "full", fields: Optional[Sequence[str]] = None) -> dict:
         """Run multiple simulation steps and return world state"""
         for _ in range(num_steps):
             self.step()
-        return self.world.to_dict()
+        return self.world.to_dict(detail, fields)
     
-    def step_once(self) -> dict:
+    def step_once(self, detail: str = "full", fields: Optional[Sequence[str]] = None) -> dict:
         """Execute a single step (for step-by-step mode)"""
         self.step_mode = True
         self.step()
-        return self.world.to_dict()
+        return self.world.to_dict(detail, fields)
     
     def reset(self):
         """Reset simulation"""
@@ -63,6 +65,7 @@ class Simulator:
         self.world.energy_tracker.clear()
         for obj in self.world.objects:
             obj.reset_to_initial()
+        self.world.touch()
     
     def start(self):
         """Start simulation"""
@@ -86,3 +89,4 @@ class Simulator:
             # Add new gravity force if enabled
             if enabled:
                 obj.apply_force(Gravity(strength))
+        self.world.touch()
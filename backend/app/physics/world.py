@@ -1,6 +1,7 @@
 # backend/app/physics/world.py (UPDATE)
-from typing import List, Dict, Optional
-from .object import PhysicsObject
+from typing import List, Dict, Optional, Sequence, Tuple
+import uuid
+from .object import PhysicsObject, OBJECT_FIELDS, OBJECT_DETAIL_FIELDS
 from .vector import Vector
 from .collision import CollisionDetector, CollisionResolver
 from .energy import EnergyCalculator, EnergyTracker
@@ -32,13 +33,24 @@ class World:
         self.gravity_enabled = True
         self.gravity_strength = 9.8
         
+        # State versioning: uid identifies this world, version changes on
+        # every step or mutation so serialized state can be cached
+        self.uid = uuid.uuid4().hex[:12]
+        self.version = 0
+        
+    def touch(self):
+        """Mark the world state as changed"""
+        self.version += 1
+    
     def add_object(self, obj: PhysicsObject):
         """Add an object to the world"""
         self.objects.append(obj)
+        self.touch()
     
     def remove_object(self, object_id: str):
         """Remove an object by ID"""
         self.objects = [obj for obj in self.objects if obj.object_id != object_id]
+        self.touch()
     
     def get_object(self, object_id: str) -> Optional[PhysicsObject]:
         """Get object by ID"""
@@ -52,6 +64,7 @@ class World:
         self.objects.clear()
         self.time = 0.0
         self.energy_tracker.clear()
+        self.touch()
     
     def check_ground_collision(self, obj: PhysicsObject) -> bool:
         """Check if object hits the ground"""
@@ -127,28 +140,100 @@ class World:
         from .collision import MomentumCalculator
         return MomentumCalculator.total_momentum(self.objects)
     
-    def to_dict(self) -> dict:
-        """Convert to dictionary for JSON serialization"""
-        energy = self.calculate_total_energy()
-        momentum = self.get_total_momentum()
-        
-        return {
-            "width": self.width,
-            "height": self.height,
-            "ground_level": self.ground_level,
-            "objects": [obj.to_dict() for obj in self.objects],
-            "time": self.time,
-            "gravity_enabled": self.gravity_enabled,
-            "gravity_strength": self.gravity_strength,
-            "collision_enabled": self.collision_enabled,
-            
-            # System properties
-            "total_kinetic_energy": energy["kinetic"],
-            "total_potential_energy": energy["potential"],
-            "total_mechanical_energy": energy["mechanical"],
-            "total_momentum": momentum.to_dict(),
-            "total_momentum_magnitude": momentum.magnitude(),
-            
-            # Energy tracking
-            "energy_history": self.energy_tracker.to_dict()
-        }
+    def to_dict(self, detail: str = "full", fields: Optional[Sequence[str]] = None) -> dict:
+        """Convert to dictionary for JSON serialization
+
+        ``detail`` selects a preset field set and ``fields`` replaces it with
+        explicit names; fields that are not requested are never computed.
+        """
+        world_fields, object_fields = resolve_projection(detail, fields)
+        return self.project(world_fields, object_fields)
+
+    def project(self, world_fields: Sequence[str], object_fields: Sequence[str]) -> dict:
+        """Build a state dictionary from already resolved field lists"""
+        data = {}
+        energy = None
+        momentum = None
+        for name in world_fields:
+            if name == "objects":
+                data["objects"] = [obj.to_dict(object_fields) for obj in self.objects]
+            elif name in _ENERGY_FIELDS:
+                if energy is None:
+                    energy = self.calculate_total_energy()
+                data[name] = energy[_ENERGY_FIELDS[name]]
+            elif name in ("total_momentum", "total_momentum_magnitude"):
+                if momentum is None:
+                    momentum = self.get_total_momentum()
+                data[name] = momentum.to_dict() if name == "total_momentum" else momentum.magnitude()
+            elif name == "energy_history":
+                # Energy tracking
+                data["energy_history"] = self.energy_tracker.to_dict()
+            else:
+                data[name] = getattr(self, name)
+        return data
+
+
+_ENERGY_FIELDS = {
+    "total_kinetic_energy": "kinetic",
+    "total_potential_energy": "potential",
+    "total_mechanical_energy": "mechanical",
+}
+
+WORLD_FIELDS = (
+    "width",
+    "height",
+    "ground_level",
+    "objects",
+    "time",
+    "gravity_enabled",
+    "gravity_strength",
+    "collision_enabled",
+
+    # System properties
+    "total_kinetic_energy",
+    "total_potential_energy",
+    "total_mechanical_energy",
+    "total_momentum",
+    "total_momentum_magnitude",
+
+    # Energy tracking
+    "energy_history",
+)
+
+# World fields included at each detail level ("full" means all of them)
+WORLD_DETAIL_FIELDS: Dict[str, tuple] = {
+    "minimal": ("objects", "time"),
+    "render": ("width", "height", "ground_level", "objects", "time"),
+    "analysis": (
+        "objects", "time", "gravity_enabled", "gravity_strength", "collision_enabled",
+        "total_kinetic_energy", "total_potential_energy", "total_mechanical_energy",
+        "total_momentum", "total_momentum_magnitude", "energy_history",
+    ),
+    "full": WORLD_FIELDS,
+}
+
+DETAIL_LEVELS = tuple(WORLD_DETAIL_FIELDS)
+
+
+def resolve_projection(detail: str = "full", fields: Optional[Sequence[str]] = None) -> Tuple[tuple, tuple]:
+    """Resolve a detail level and optional field list into world/object field tuples
+
+    Raises ValueError for unknown detail levels or field names.
+    """
+    if detail not in WORLD_DETAIL_FIELDS:
+        raise ValueError(f"Unknown detail level '{detail}', expected one of {', '.join(DETAIL_LEVELS)}")
+
+    world_fields = WORLD_DETAIL_FIELDS[detail]
+    object_fields = OBJECT_DETAIL_FIELDS[detail]
+    if not fields:
+        return world_fields, object_fields
+
+    unknown = [f for f in fields if f not in WORLD_FIELDS and f not in OBJECT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown state fields: {', '.join(unknown)}")
+
+    # Explicit fields override the detail level; objects and time are always kept
+    requested = set(fields)
+    world_fields = tuple(f for f in WORLD_FIELDS if f in requested or f in ("objects", "time"))
+    object_fields = tuple(f for f in OBJECT_FIELDS if f in requested or f == "id")
+    return world_fields, object_fields
@@ -0,0 +1,74 @@
+# backend/app/services/batch_service.py
+import asyncio
+import traceback
+import uuid
+from typing import AsyncIterator, Dict, List
+from .. import config
+from ..nlp.cache import normalize_text
+from .executor import simulation_executor
+from .metrics import metrics
+from .resources import resources
+from .simulation_service import SimulationService
+
+async def parse_batch(
+    problems: List[str],
+    build_worlds: bool = False,
+    concurrency: int = config.BATCH_CONCURRENCY
+) -> AsyncIterator[dict]:
+    """Parse many problems concurrently, yielding each result as it is ready
+    
+    Problems with the same normalized text are parsed once. Cached and
+    locally parsed problems are answered without waiting; ``concurrency``
+    bounds the model calls in flight. Yields an ``item`` event per problem,
+    in completion order and tagged with its ``index``, then ``done``.
+    """
+    parser = resources.parser
+    groups: Dict[str, List[int]] = {}
+    for i, text in enumerate(problems):
+        groups.setdefault(normalize_text(text), []).append(i)
+    
+    batch_id = uuid.uuid4().hex
+    limit = asyncio.Semaphore(max(1, concurrency))
+    
+    async def run(indexes: List[int]) -> tuple:
+        text = problems[indexes[0]]
+        try:
+            parsed = await parser.parse_cached(text)
+            source = "cache"
+            if parsed is None:
+                async with limit:
+                    parsed = await parser.parse(text, fast=False)
+                source = "model"
+            metrics.inc("batch_items_total", source=source)
+            
+            if not parsed.success:
+                return indexes, {"success": False, "source": source, "error_message": parsed.error_message}
+            result = {"success": True, "source": source, "scenario": parsed.scenario.model_dump()}
+            
+            if build_worlds:
+                # A throwaway service per problem, so worlds build on all lanes
+                service = SimulationService(parser=parser, session_id=f"batch:{batch_id}:{indexes[0]}")
+                built = await simulation_executor.run(service.session_id, service.create_from_scenario, parsed.scenario)
+                if built.get("success"):
+                    result["world_state"] = built["world_state"]
+                else:
+                    result.update(success=False, error_message=built.get("error_message"))
+            return indexes, result
+        except Exception as e:
+            print(f"Batch item failed: {traceback.format_exc()}")
+            return indexes, {"success": False, "error_message": str(e)}
+    
+    tasks = [asyncio.ensure_future(run(indexes)) for indexes in groups.values()]
+    succeeded = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            indexes, result = await next_done
+            for i in indexes:
+                succeeded += result["success"]
+                yield {"type": "item", "index": i, "problem_text": problems[i], **result}
+    finally:
+        # The client went away; stop parses that haven't finished
+        for task in tasks:
+            task.cancel()
+    
+    yield {"type": "done", "count": len(problems), "distinct": len(groups), "succeeded": succeeded}
@@ -0,0 +1,72 @@
+# backend/app/services/command_queue.py
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, List, Tuple
+from .executor import simulation_executor
+
+class CommandQueue:
+    """Per-session queue of world mutations
+
+    Mutations are queued from request handlers and applied on the session's
+    simulation lane, between steps. Everything queued by the time a drain
+    runs is applied as one batch and the batch shares a single serialized
+    world state. Only the deque itself is locked, and only briefly.
+    """
+    
+    def __init__(self, service):
+        self.service = service
+        self._pending: Deque[Tuple[Callable[..., dict], tuple, dict, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+        self._drain_scheduled = False
+        self.batching = False
+    
+    async def submit(self, fn: Callable[..., dict], *args, **kwargs) -> dict:
+        """Queue a service mutation and wait for the batch it lands in"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            self._pending.append((fn, args, kwargs, future))
+            schedule = not self._drain_scheduled
+            self._drain_scheduled = True
+        
+        if schedule:
+            # The drain itself is not awaited: the future resolves when it runs
+            loop.run_in_executor(simulation_executor.lane_for(self.service.session_id), self.drain)
+        return await future
+    
+    def drain(self):
+        """Apply all queued mutations (runs on the session's lane)"""
+        with self._lock:
+            batch = list(self._pending)
+            self._pending.clear()
+            self._drain_scheduled = False
+        if not batch:
+            return
+        
+        results: List[Any] = []
+        self.batching = True
+        try:
+            for fn, args, kwargs, future in batch:
+                if future.cancelled():
+                    results.append(None)
+                    continue
+                try:
+                    results.append(fn(*args, **kwargs))
+                except Exception as e:
+                    results.append({"error": str(e)})
+        finally:
+            self.batching = False
+        
+        world = self.service.world
+        state = world.to_dict() if world is not None and any(r and r.get("success") for r in results) else None
+        for (_, _, _, future), result in zip(batch, results):
+            if result is None:
+                continue
+            if result.get("success") and "world_state" not in result:
+                result["world_state"] = state
+            future.get_loop().call_soon_threadsafe(_resolve, future, result)
+
+def _resolve(future: asyncio.Future, result: dict):
+    if not future.done():
+        future.set_result(result)
@@ -0,0 +1,67 @@
+# backend/app/services/executor.py
+import asyncio
+import functools
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+from .. import config
+
+class SimulationExecutor:
+    """Run CPU-bound simulation work off the event loop
+
+    Work is spread over single-threaded lanes and every session is pinned
+    to one lane, so a session's calls run one at a time and in order while
+    different sessions step in parallel with the event loop.
+    """
+    
+    def __init__(self, workers: int = config.SIM_WORKERS):
+        self.workers = max(1, workers)
+        self.lanes: List[ThreadPoolExecutor] = []
+    
+    def _ensure_lanes(self):
+        if not self.lanes:
+            self.lanes = [
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sim-lane-{i}")
+                for i in range(self.workers)
+            ]
+    
+    def lane_for(self, session_id: str) -> ThreadPoolExecutor:
+        """The lane a session is pinned to"""
+        self._ensure_lanes()
+        return self.lanes[zlib.crc32(session_id.encode()) % len(self.lanes)]
+    
+    async def run(
+        self,
+        session_id: str,
+        fn: Callable[..., Any],
+        *args,
+        cancel_event: Optional[threading.Event] = None,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Any:
+        """Run ``fn`` on the session's lane and await its result
+
+        If the awaiting request is cancelled or times out, work that has not
+        started is dropped. ``cancel_event``, when given, is passed on to
+        ``fn`` and set on cancellation so running work can stop at its next
+        check.
+        """
+        if cancel_event is not None:
+            kwargs["cancel_event"] = cancel_event
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.lane_for(session_id), functools.partial(fn, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if cancel_event is not None:
+                cancel_event.set()
+            raise
+    
+    def shutdown(self, wait: bool = True):
+        """Stop all lanes"""
+        for lane in self.lanes:
+            lane.shutdown(wait=wait, cancel_futures=not wait)
+        self.lanes = []
+
+simulation_executor = SimulationExecutor()
@@ -0,0 +1,70 @@
+# backend/app/services/metrics.py
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def _key(name: str, labels: Dict[str, str]) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+class Metrics:
+    """In-process counters and gauges, exported as JSON or Prometheus text"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[LabelKey, float] = defaultdict(float)
+        self._gauges: Dict[LabelKey, float] = {}
+        self._collectors: List[Callable[["Metrics"], None]] = []
+    
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increase a counter"""
+        with self._lock:
+            self._counters[_key(name, labels)] += value
+    
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to its current value"""
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+    
+    def add_collector(self, collector: Callable[["Metrics"], None]):
+        """Register a callback that refreshes gauges right before export"""
+        self._collectors.append(collector)
+    
+    def counter(self, name: str, **labels) -> float:
+        return self._counters.get(_key(name, labels), 0)
+    
+    def _collect(self) -> Tuple[Dict[LabelKey, float], Dict[LabelKey, float]]:
+        for collector in self._collectors:
+            collector(self)
+        with self._lock:
+            return dict(self._counters), dict(self._gauges)
+    
+    def to_dict(self) -> dict:
+        """Metrics as {"counters": {...}, "gauges": {...}} keyed by name{labels}"""
+        counters, gauges = self._collect()
+        return {
+            "counters": {_format(k): v for k, v in sorted(counters.items())},
+            "gauges": {_format(k): v for k, v in sorted(gauges.items())},
+        }
+    
+    def to_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        counters, gauges = self._collect()
+        lines = []
+        for kind, values in (("counter", counters), ("gauge", gauges)):
+            seen = set()
+            for key, value in sorted(values.items()):
+                if key[0] not in seen:
+                    seen.add(key[0])
+                    lines.append(f"# TYPE {key[0]} {kind}")
+                lines.append(f"{_format(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+def _format(key: LabelKey) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+metrics = Metrics()
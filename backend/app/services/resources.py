@@ -0,0 +1,56 @@
+# backend/app/services/resources.py
+from typing import Optional, TYPE_CHECKING
+from .. import config
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    from ..nlp.parser import PhysicsProblemParser
+
+class Resources:
+    """Process-wide resources shared by all sessions
+
+    Opened and closed by the app lifespan. The NLP stack (HTTP client,
+    prompt templates) is only imported when first needed, or at startup
+    when ``NLP_WARMUP`` is on, so physics-only workers never load it.
+    """
+    
+    def __init__(self):
+        self._parser: Optional["PhysicsProblemParser"] = None
+        self.ready = False
+        self.draining = False
+    
+    @property
+    def parser(self) -> "PhysicsProblemParser":
+        """The shared LLM parser; it holds no per-session state"""
+        if self._parser is None:
+            from ..nlp.parser import PhysicsProblemParser
+            self._parser = PhysicsProblemParser()
+        return self._parser
+    
+    async def startup(self, warm_nlp: bool = config.NLP_WARMUP):
+        """Create shared resources before the app starts taking traffic"""
+        self.draining = False
+        if warm_nlp:
+            # Import the parser and open its connection pool up front so the
+            # first /simulate doesn't pay for it
+            await self.parser.open()
+    
+    async def shutdown(self):
+        """Release shared resources"""
+        self.ready = False
+        if self._parser is not None:
+            await self._parser.aclose()
+    
+    def status(self) -> str:
+        if self.draining:
+            return "draining"
+        return "ready" if self.ready else "starting"
+
+resources = Resources()
+
+def _collect_llm(registry):
+    # Only once the parser exists, so scraping /metrics doesn't load the NLP stack
+    if resources._parser is not None:
+        resources._parser.backend.collect(registry)
+
+metrics.add_collector(_collect_llm)
@@ -0,0 +1,223 @@
+# backend/app/services/scenario_compiler.py
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from .. import config
+from ..physics.simulator import Simulator
+from ..physics.vector import Vector
+from ..physics.world import World
+from .metrics import metrics
+
+# Bump when the builders change what they produce, so stale templates
+# from before the change are never keyed the same
+COMPILER_VERSION = 1
+
+_SCALARS = (int, float, str, bool, type(None))
+
+def _hash(data: Any) -> str:
+    payload = json.dumps([COMPILER_VERSION, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def scenario_key(scenario) -> str:
+    """Content hash of a SimulationScenario"""
+    return _hash({"scenario": scenario.model_dump()})
+
+def preset_key(preset_name: str, parameters: Dict[str, Any]) -> str:
+    """Content hash of a preset and its parameters"""
+    return _hash({"preset": preset_name, "parameters": parameters})
+
+class _Capture:
+    """Turns a built world into specs that _build can replay
+    
+    Specs are tuples: ("c", value) for immutable values, ("v", i) for row i
+    of the vector table, ("r", i) for the i-th world object, ("l", specs)
+    and ("d", items) for containers, and ("o", cls, consts, vectors, dynamic)
+    for instances: immutable attributes in one dict, vector attributes as
+    (name, row) pairs, and specs for the rest.
+    """
+    
+    def __init__(self, objects: list):
+        self.vectors: List[Tuple[float, float]] = []
+        self._vector_rows: Dict[int, int] = {}
+        self._object_index = {id(obj): i for i, obj in enumerate(objects)}
+    
+    def spec(self, value: Any) -> tuple:
+        if isinstance(value, _SCALARS):
+            return ("c", value)
+        if isinstance(value, Vector):
+            # One row per Vector object, so vectors shared in the original
+            # (a center used by two objects) stay shared in every clone
+            row = self._vector_rows.get(id(value))
+            if row is None:
+                row = self._vector_rows[id(value)] = len(self.vectors)
+                self.vectors.append((value.x, value.y))
+            return ("v", row)
+        if id(value) in self._object_index:
+            return ("r", self._object_index[id(value)])
+        if isinstance(value, list):
+            return ("l", tuple(self.spec(item) for item in value))
+        if isinstance(value, dict):
+            return ("d", tuple((key, self.spec(item)) for key, item in value.items()))
+        if hasattr(value, "__dict__"):
+            return ("o",) + self.instance(value)
+        raise TypeError(f"Cannot compile a {type(value).__name__}")
+    
+    def instance(self, value: Any) -> Tuple[type, dict, tuple, tuple]:
+        consts, vectors, dynamic = {}, [], []
+        for attr, item in vars(value).items():
+            spec = self.spec(item)
+            if spec[0] == "c":
+                consts[attr] = item
+            elif spec[0] == "v":
+                vectors.append((attr, spec[1]))
+            else:
+                dynamic.append((attr, spec))
+        return type(value), consts, tuple(vectors), tuple(dynamic)
+
+def _build(spec: tuple, vectors: List[Vector], objects: list) -> Any:
+    kind = spec[0]
+    if kind == "c":
+        return spec[1]
+    if kind == "v":
+        return vectors[spec[1]]
+    if kind == "r":
+        return objects[spec[1]]
+    if kind == "l":
+        return [_build(item, vectors, objects) for item in spec[1]]
+    if kind == "d":
+        return {key: _build(item, vectors, objects) for key, item in spec[1]}
+    _, cls, consts, vector_attrs, dynamic = spec
+    return _fill(cls.__new__(cls), consts, vector_attrs, dynamic, vectors, objects)
+
+def _fill(
+    instance: Any,
+    consts: dict,
+    vector_attrs: tuple,
+    dynamic: tuple,
+    vectors: List[Vector],
+    objects: list
+) -> Any:
+    state = instance.__dict__
+    state.update(consts)
+    for attr, row in vector_attrs:
+        state[attr] = vectors[row]
+    for attr, spec in dynamic:
+        state[attr] = _build(spec, vectors, objects)
+    return instance
+
+def _vectors(rows: Tuple[Tuple[float, float], ...]) -> List[Vector]:
+    # The coordinates are floats already, so skip Vector.__init__
+    new = Vector.__new__
+    vectors = []
+    for x, y in rows:
+        vector = new(Vector)
+        vector.x = x
+        vector.y = y
+        vectors.append(vector)
+    return vectors
+
+class CompiledWorld:
+    """A freshly built world and simulator, reduced to flat state
+    
+    ``instantiate`` clones it without running the builder again: every
+    Vector is re-created from one table of coordinates, and objects,
+    forces and circular motions get their immutable attributes in a single
+    dict update. The initial full-detail state is serialized once, here.
+    Only worlds that haven't been stepped should be compiled.
+    """
+    
+    def __init__(self, world: World, simulator: Simulator, world_state: Optional[Dict[str, Any]] = None):
+        capture = _Capture(world.objects)
+        self.objects = tuple(capture.instance(obj) for obj in world.objects)
+        self.vectors = tuple(capture.vectors)
+        # A fresh World() supplies the collision helpers, energy tracker and
+        # a new uid; the rest of its settings are plain values
+        self.world_settings = {
+            attr: value for attr, value in vars(world).items()
+            if isinstance(value, _SCALARS) and attr != "uid"
+        }
+        self.simulator_settings = {
+            attr: value for attr, value in vars(simulator).items()
+            if isinstance(value, _SCALARS)
+        }
+        # Serialized once (or taken from a builder that already did); each
+        # clone's response gets its own copy from state()
+        self.world_state = world_state if world_state is not None else world.to_dict()
+    
+    def instantiate(self) -> Tuple[World, Simulator]:
+        """A new, independent world and simulator in the compiled state"""
+        vectors = _vectors(self.vectors)
+        objects = [cls.__new__(cls) for cls, _, _, _ in self.objects]
+        for obj, (_, consts, vector_attrs, dynamic) in zip(objects, self.objects):
+            _fill(obj, consts, vector_attrs, dynamic, vectors, objects)
+        
+        world = World()
+        world.__dict__.update(self.world_settings)
+        world.objects = objects
+        simulator = Simulator(world)
+        simulator.__dict__.update(self.simulator_settings)
+        return world, simulator
+    
+    def state(self) -> Dict[str, Any]:
+        """A copy of the initial full-detail state that the caller may modify"""
+        return _copy_state(self.world_state)
+
+def _copy_state(value: Any) -> Any:
+    """Deep-copy JSON-like data (dicts, lists and scalars)"""
+    if isinstance(value, dict):
+        return {key: _copy_state(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_state(item) for item in value]
+    return value
+
+class CompiledWorldCache:
+    """Compiled worlds by content hash, shared by all sessions on a worker"""
+    
+    def __init__(self, max_entries: int = config.COMPILED_WORLD_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._worlds: "OrderedDict[str, CompiledWorld]" = OrderedDict()
+        # Worlds are built on the simulation lanes, several threads at once
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[CompiledWorld]:
+        with self._lock:
+            compiled = self._worlds.get(key)
+            if compiled is not None:
+                self._worlds.move_to_end(key)
+        metrics.inc("compiled_world_hits_total" if compiled is not None else "compiled_world_misses_total")
+        return compiled
+    
+    def put(
+        self,
+        key: str,
+        world: World,
+        simulator: Simulator,
+        world_state: Optional[Dict[str, Any]] = None
+    ) -> Optional[CompiledWorld]:
+        """Compile a just-built world; worlds holding unknown types are skipped
+        
+        ``world_state`` is the world's ``to_dict()`` if the caller already has
+        it; the entry keeps it, so the caller should answer from ``state()``.
+        """
+        if self.max_entries <= 0:
+            return None
+        try:
+            compiled = CompiledWorld(world, simulator, world_state)
+        except TypeError as e:
+            print(f"World not compiled: {e}")
+            return None
+        
+        with self._lock:
+            self._worlds[key] = compiled
+            self._worlds.move_to_end(key)
+            while len(self._worlds) > self.max_entries:
+                self._worlds.popitem(last=False)
+        return compiled
+    
+    def clear(self):
+        with self._lock:
+            self._worlds.clear()
+
+compiled_worlds = CompiledWorldCache()
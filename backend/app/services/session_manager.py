@@ -0,0 +1,344 @@
+# backend/app/services/session_manager.py
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from .. import config
+from .executor import simulation_executor
+from .metrics import metrics
+from .simulation_service import SimulationService
+from .snapshot import (
+    FileSnapshotStore, SnapshotStore, create_snapshot_store, decode_snapshot, encode_snapshot,
+    restore_service, snapshot_service
+)
+
+class Session:
+    """A simulation session owned by one client"""
+    
+    def __init__(self, session_id: str, service: SimulationService):
+        self.session_id = session_id
+        self.service = service
+        self.created_at = time.monotonic()
+        self.last_access = self.created_at
+        
+        # Store revision this copy was loaded from or last saved as, and the
+        # world state it corresponds to
+        self.revision: Optional[int] = None
+        self.saved_stamp: Optional[tuple] = None
+    
+    @property
+    def stamp(self) -> Optional[tuple]:
+        """Everything a snapshot holds that can change between saves
+
+        Starting or stopping the simulator doesn't touch the world, so its
+        flags and the scenario are part of the stamp too.
+        """
+        world = self.service.world
+        if world is None:
+            return None
+        simulator = self.service.simulator
+        running = (simulator.is_running, simulator.step_mode) if simulator else None
+        return (world.uid, world.version, running, self.service.current_scenario)
+
+class SessionManager:
+    """Registry of SimulationService instances keyed by session ID
+
+    Sessions are kept in least-recently-used order. Sessions idle for
+    longer than ``idle_ttl`` are dropped, and once ``max_sessions`` is
+    reached the least recently used session is evicted to make room.
+    Sessions pinned by a request in progress, a WebSocket viewer or a
+    stepper are never evicted or hibernated.
+
+    With a snapshot store, every changed session is saved after each
+    request and any worker can restore it, so requests for one session
+    need not stick to one process.
+
+    With a hibernation store, sessions idle for ``hibernate_after`` seconds
+    are written there and dropped from memory, then restored transparently
+    on their next request. Evicted sessions are hibernated too instead of
+    being lost.
+    """
+    
+    def __init__(
+        self,
+        max_sessions: int = config.SESSION_MAX_SESSIONS,
+        idle_ttl: float = config.SESSION_IDLE_TTL,
+        max_memory_bytes: int = config.SESSION_MAX_MEMORY_BYTES,
+        service_factory: Optional[Callable[[], SimulationService]] = None,
+        store: Optional[SnapshotStore] = None,
+        hibernation_store: Optional[SnapshotStore] = None,
+        hibernate_after: float = config.HIBERNATE_AFTER
+    ):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.service_factory = service_factory
+        self.store = store
+        self.hibernation_store = hibernation_store or store
+        self.hibernate_after = hibernate_after
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        # Session ID -> number of requests, sockets and steppers using it.
+        # Kept by ID so a session restored from the store stays pinned
+        self.pins: Dict[str, int] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self.evicted = 0
+        self.restored = 0
+        self.hibernated = 0
+    
+    @staticmethod
+    def new_session_id() -> str:
+        return uuid.uuid4().hex
+    
+    def _create_service(self, session_id: str) -> SimulationService:
+        if self.service_factory:
+            service = self.service_factory()
+            service.session_id = session_id
+            return service
+        
+        return SimulationService(
+            max_memory_bytes=self.max_memory_bytes,
+            session_id=session_id
+        )
+    
+    async def acquire(self, session_id: str) -> SimulationService:
+        """Get a session's service, restoring it from the snapshot store when
+        this worker has no copy or an older one"""
+        await self._persist_all(self.evict_expired())
+        
+        session = self.sessions.get(session_id)
+        if self.store is not None:
+            revision = await simulation_executor.run(session_id, self.store.revision, session_id)
+            if revision is not None and (session is None or revision != session.revision):
+                session = await self._restore(session_id, self.store)
+        
+        if session is None and self.hibernation_store is not None and self.hibernation_store is not self.store:
+            # A hibernated local snapshot is consumed on wake-up
+            session = await self._restore(session_id, self.hibernation_store, consume=True)
+        
+        if session is None:
+            session = self._add(session_id, self._create_service(session_id))
+            await self._persist_all(self._enforce_capacity())
+        
+        self.touch(session_id)
+        return session.service
+    
+    async def release(self, session_id: str):
+        """Save a session to the snapshot store if its world changed"""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            await self._persist(session)
+    
+    async def _restore(self, session_id: str, store: SnapshotStore, consume: bool = False) -> Optional[Session]:
+        def load():
+            loaded = store.load(session_id)
+            if loaded is None:
+                return None
+            revision, payload = loaded
+            service = restore_service(self._create_service(session_id), decode_snapshot(payload))
+            if consume:
+                store.delete(session_id)
+                revision = None
+            return revision, service
+        
+        result = await simulation_executor.run(session_id, load)
+        if result is None:
+            return self.sessions.get(session_id)
+        
+        revision, service = result
+        old = self.sessions.pop(session_id, None)
+        if old is not None:
+            old.service.stop()
+        session = self._add(session_id, service)
+        session.revision = revision
+        session.saved_stamp = session.stamp
+        self.restored += 1
+        return session
+    
+    async def _persist(self, session: Session, store: Optional[SnapshotStore] = None):
+        store = store or self.store
+        if store is None or session.stamp is None:
+            return
+        if store is self.store and session.stamp == session.saved_stamp:
+            return
+        
+        def save():
+            stamp = session.stamp
+            payload = encode_snapshot(snapshot_service(session.service))
+            return stamp, store.save(session.session_id, payload)
+        
+        # On the session's lane, so the snapshot never sees a half-applied step
+        stamp, revision = await simulation_executor.run(session.session_id, save)
+        if store is self.store:
+            session.saved_stamp, session.revision = stamp, revision
+    
+    async def _persist_all(self, sessions: List[Session]):
+        """Save sessions that are leaving memory wherever they can be restored from"""
+        for session in sessions:
+            await self._persist(session, self.hibernation_store)
+    
+    async def hibernate_idle(self) -> int:
+        """Move sessions idle for ``hibernate_after`` seconds out of memory"""
+        if self.hibernation_store is None or self.hibernate_after <= 0:
+            return 0
+        
+        cutoff = time.monotonic() - self.hibernate_after
+        idle = []
+        # Sessions are in LRU order, so idle ones are at the front
+        for session in self.sessions.values():
+            if session.last_access > cutoff:
+                break
+            simulator = session.service.simulator
+            if not (simulator and simulator.is_running) and not self.in_use(session.session_id):
+                idle.append(session)
+        
+        for session in idle:
+            # Skip sessions that were used while earlier ones were being saved
+            if (
+                session.last_access > cutoff
+                or self.in_use(session.session_id)
+                or self.sessions.get(session.session_id) is not session
+            ):
+                continue
+            self.remove(session.session_id)
+            await self._persist(session, self.hibernation_store)
+            self.hibernated += 1
+        return len(idle)
+    
+    async def sweep(self):
+        """Expire and hibernate idle sessions, and purge old hibernated snapshots"""
+        await self._persist_all(self.evict_expired())
+        await self.hibernate_idle()
+        if isinstance(self.hibernation_store, FileSnapshotStore) and self.hibernation_store is not self.store:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.hibernation_store.purge, config.HIBERNATE_RETENTION
+            )
+    
+    def start_sweeper(self, interval: float = config.SESSION_SWEEP_INTERVAL):
+        """Run sweep() periodically in the background"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._run_sweeper(interval))
+    
+    async def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+    
+    async def drain(self):
+        """Stop background work and save every in-memory session, for shutdown"""
+        await self.stop_sweeper()
+        for session in list(self.sessions.values()):
+            session.service.stop()
+            try:
+                await self._persist(session, self.hibernation_store)
+            except Exception as e:
+                print(f"Failed to save session {session.session_id}: {e}")
+    
+    async def _run_sweeper(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"Session sweep failed: {e}")
+    
+    def _add(self, session_id: str, service: SimulationService) -> Session:
+        session = Session(session_id, service)
+        self.sessions[session_id] = session
+        return session
+    
+    def pin(self, session_id: str):
+        """Keep a session in memory until the matching unpin()"""
+        self.pins[session_id] = self.pins.get(session_id, 0) + 1
+    
+    def unpin(self, session_id: str):
+        count = self.pins.get(session_id, 0) - 1
+        if count > 0:
+            self.pins[session_id] = count
+        else:
+            self.pins.pop(session_id, None)
+        # The idle TTL counts from the end of the last use
+        self.touch(session_id)
+    
+    def in_use(self, session_id: str) -> bool:
+        return session_id in self.pins
+    
+    def touch(self, session_id: str):
+        """Mark a session as recently used"""
+        session = self.sessions.get(session_id)
+        if session:
+            session.last_access = time.monotonic()
+            self.sessions.move_to_end(session_id)
+    
+    def remove(self, session_id: str) -> Optional[Session]:
+        """Drop a session and stop its simulation"""
+        session = self.sessions.pop(session_id, None)
+        if session:
+            session.service.stop()
+        return session
+    
+    def evict_expired(self) -> List[Session]:
+        """Drop sessions that have been idle longer than the TTL"""
+        expired = []
+        if self.idle_ttl <= 0:
+            return expired
+        
+        cutoff = time.monotonic() - self.idle_ttl
+        # Sessions are in LRU order, so idle ones are at the front
+        for session_id, session in list(self.sessions.items()):
+            if session.last_access > cutoff:
+                break
+            if not self.in_use(session_id):
+                expired.append(self.remove(session_id))
+        self.evicted += len(expired)
+        return expired
+    
+    def _enforce_capacity(self) -> List[Session]:
+        """Evict the least recently used idle sessions down to ``max_sessions``
+        
+        Sessions in use are skipped, so the count can stay above the limit
+        while they are.
+        """
+        evicted = []
+        if self.max_sessions <= 0:
+            return evicted
+        
+        excess = len(self.sessions) - self.max_sessions
+        for session_id in list(self.sessions):
+            if excess <= 0:
+                break
+            if not self.in_use(session_id):
+                evicted.append(self.remove(session_id))
+                excess -= 1
+        self.evicted += len(evicted)
+        return evicted
+    
+    def stats(self) -> Dict[str, int]:
+        """Session counts and estimated memory"""
+        return {
+            "sessions": len(self.sessions),
+            "evicted": self.evicted,
+            "restored": self.restored,
+            "hibernated": self.hibernated,
+            "pinned": len(self.pins),
+            "memory_bytes": sum(s.service.estimate_memory() for s in self.sessions.values()),
+        }
+
+_shared_store = create_snapshot_store(config.SNAPSHOT_STORE, config.SNAPSHOT_PATH)
+session_manager = SessionManager(
+    store=_shared_store,
+    hibernation_store=_shared_store or (
+        FileSnapshotStore(config.HIBERNATE_PATH, compress_level=config.HIBERNATE_COMPRESSION_LEVEL)
+        if config.HIBERNATE_AFTER > 0 else None
+    )
+)
+
+def _collect_sessions(registry):
+    for name, value in session_manager.stats().items():
+        registry.set_gauge(f"sessions_{name}" if name != "sessions" else "sessions_active", value)
+
+metrics.add_collector(_collect_sessions)
@@ -1,22 +1,66 @@
 # backend/app/services/simulation_service.py (UPDATE)
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Sequence, Tuple, TYPE_CHECKING
 from ..physics.simulator import Simulator
-from ..physics.world import World
+from ..physics.world import World, resolve_projection
 from ..physics.object import PhysicsObject
 from ..physics.vector import Vector
 from ..physics.forces import Gravity, Drag, Friction, Spring, ConstantForce, CentripetalForce
-from ..nlp.parser import PhysicsProblemParser
+from ..physics.circular_motion import CircularMotion
 from ..nlp.schema import SimulationScenario
+from .state_cache import StateCache
+from .executor import simulation_executor
+from .command_queue import CommandQueue
+from .resources import resources
+from .scenario_compiler import compiled_worlds, preset_key, scenario_key
 import math
+import threading
+import time
+
+if TYPE_CHECKING:
+    from ..nlp.parser import PhysicsProblemParser
+
+# Steps between deadline/cancellation checks in SimulationService.step
+BUDGET_CHECK_INTERVAL = 16
+
+# Scenario force type -> force built from its parameters
+SCENARIO_FORCES = {
+    "gravity": lambda params: Gravity(params.get("g", 9.8)),
+    "drag": lambda params: Drag(params.get("coefficient", 0.1)),
+    "friction": lambda params: Friction(params.get("mu_k", 0.3), params.get("mu_s", 0.5)),
+    "spring": lambda params: Spring(
+        params.get("k", 10.0),
+        Vector(params.get("anchor", {}).get("x", 50.0), params.get("anchor", {}).get("y", 50.0)),
+        params.get("rest_length", 0.0)
+    ),
+}
+
+# Rough per-item sizes used to estimate a session's resident memory
+TRAJECTORY_POINT_BYTES = 256
+ENERGY_RECORD_BYTES = 320
+OBJECT_BYTES = 4096
 
 class SimulationService:
     """Service for managing physics simulations"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        parser: Optional["PhysicsProblemParser"] = None,
+        max_memory_bytes: int = 0,
+        session_id: str = "default"
+    ):
+        self.session_id = session_id
         self.simulator: Optional[Simulator] = None
         self.world: Optional[World] = None
-        self.parser = PhysicsProblemParser()
+        self._parser = parser
         self.current_scenario: Optional[SimulationScenario] = None
+        self.state_cache = StateCache()
+        self.max_memory_bytes = max_memory_bytes  # 0 means unlimited
+        self.commands = CommandQueue(self)
+    
+    @property
+    def parser(self) -> "PhysicsProblemParser":
+        """The injected parser, or the shared one (imported on first use)"""
+        return self._parser or resources.parser
     
     async def create_from_text(self, problem_text: str) -> dict:
         """Create simulation from natural language text"""
@@ -29,8 +73,61 @@ class SimulationService:
                 "error_message": parsed.error_message
             }
         
-        # Create simulation from scenario
-        return self.create_from_scenario(parsed.scenario)
+        # Create simulation from scenario (CPU-bound, so off the event loop)
+        return await simulation_executor.run(self.session_id, self.create_from_scenario, parsed.scenario)
+    
+    async def create_from_text_stream(self, problem_text: str) -> AsyncIterator[dict]:
+        """Create a simulation from text, building the world as the parse streams in
+
+        Yields a ``partial`` world state each time the model finishes an
+        entity or a field that changes the world, then the ``complete``
+        result (or an ``error``).
+        """
+        partial: Dict[str, Any] = {"description": problem_text, "entities": []}
+        # Partial worlds replace the current one as they come in; if the
+        # stream ends without a complete world, the previous one comes back
+        previous = (self.world, self.simulator, self.current_scenario)
+        completed = False
+        
+        try:
+            async for event in self.parser.parse_stream(problem_text):
+                if event["type"] == "done":
+                    parsed = event["parsed"]
+                    if not parsed.success:
+                        yield {"type": "error", "error_message": parsed.error_message}
+                        return
+                    result = await simulation_executor.run(self.session_id, self.create_from_scenario, parsed.scenario)
+                    completed = bool(result.get("success"))
+                    yield {"type": "complete" if completed else "error", **result}
+                    return
+                
+                if event["type"] == "entity":
+                    partial["entities"].append(event["value"])
+                elif event["type"] == "field" and event["key"] in ("scenario_type", "forces", "environment"):
+                    partial[event["key"]] = event["value"]
+                else:
+                    continue
+                if not partial["entities"]:
+                    continue
+                
+                try:
+                    scenario = SimulationScenario(**partial)
+                except ValueError:
+                    continue  # Not valid yet; the finished parse gets another try
+                result = await simulation_executor.run(self.session_id, self._build_partial, scenario)
+                if result.get("success"):
+                    yield {"type": "partial", "world_state": result["world_state"]}
+        finally:
+            if not completed:
+                self.world, self.simulator, self.current_scenario = previous
+    
+    def _build_partial(self, scenario: SimulationScenario) -> dict:
+        """Build the world for a partial scenario, without compiling or caching it"""
+        try:
+            self._build_scenario(scenario)
+        except Exception as e:
+            return {"success": False, "error_message": f"Error creating simulation: {str(e)}"}
+        return {"success": True, "world_state": self.world.to_dict()}
     
     # backend/app/services/simulation_service.py (UPDATE create_from_scenario)
     def create_from_scenario(self, scenario: SimulationScenario) -> dict:
@@ -38,95 +135,22 @@ class SimulationService:
         try:
             self.current_scenario = scenario
             
-            # Create world
-            env = scenario.environment
-            self.world = World(
-                width=env.get("width", 100),
-                height=env.get("height", 100),
-                ground_level=env.get("ground_level", 0)
-            )
-            
-            # Add entities
-            for entity in scenario.entities:
-                pos = Vector(
-                    entity.initial_position["x"],
-                    entity.initial_position["y"]
-                )
-                vel = Vector(
-                    entity.initial_velocity["x"],
-                    entity.initial_velocity["y"]
-                )
-                
-                obj = PhysicsObject(
-                    mass=entity.mass,
-                    position=pos,
-                    velocity=vel,
-                    radius=entity.radius,
-                    label=entity.name,
-                    color=entity.color,
-                    object_id=entity.name,
-                    shape="circle"
-                )
-                
-                # Check if this entity should have circular motion
-                if hasattr(entity, 'circular_motion') and entity.circular_motion:
-                    cm = entity.circular_motion
-                    center = Vector(cm.get("center", {}).get("x", 50), cm.get("center", {}).get("y", 50))
-                    radius = cm.get("radius", entity.radius * 20)  # Scale up radius
-                    linear_vel = cm.get("linear_velocity", vel.magnitude())
-                    
-                    # Enable circular motion
-                    from .physics.circular_motion import CircularMotion
-                    obj.circular_motion = CircularMotion.from_linear_velocity(center, radius, linear_vel, 0)
-                    obj.circular_motion.enabled = True
-                    
-                    # Position object at start of circle
-                    obj.position.x = center.x + radius
-                    obj.position.y = center.y
-                    obj.velocity.x = 0
-                    obj.velocity.y = linear_vel
-                
-                # Apply forces (only if not in circular motion)
-                if not (obj.circular_motion and obj.circular_motion.enabled):
-                    for force_config in scenario.forces:
-                        if force_config.type == "gravity":
-                            g = force_config.parameters.get("g", 9.8)
-                            obj.apply_force(Gravity(g))
-                        elif force_config.type == "drag":
-                            coeff = force_config.parameters.get("coefficient", 0.1)
-                            obj.apply_force(Drag(coeff))
-                        elif force_config.type == "friction":
-                            mu_k = force_config.parameters.get("mu_k", 0.3)
-                            mu_s = force_config.parameters.get("mu_s", 0.5)
-                            obj.apply_force(Friction(mu_k, mu_s))
-                
-                self.world.add_object(obj)
-            
-            # Add center marker for circular motion
-            if scenario.scenario_type == "circular_motion":
-                for entity in scenario.entities:
-                    if hasattr(entity, 'circular_motion') and entity.circular_motion:
-                        cm = entity.circular_motion
-                        center = Vector(cm.get("center", {}).get("x", 50), cm.get("center", {}).get("y", 50))
-                        
-                        center_obj = PhysicsObject(
-                            mass=0.1,
-                            position=center,
-                            velocity=Vector(0, 0),
-                            radius=0.3,
-                            label="Center",
-                            color="#34495e",
-                            object_id="center_point"
-                        )
-                        center_obj.is_static = True
-                        self.world.add_object(center_obj)
-            
-            # Create simulator
-            self.simulator = Simulator(self.world, dt=0.016)
+            # Scenarios seen before (cached parses, replays) are cloned from
+            # their compiled world instead of being built again
+            key = scenario_key(scenario)
+            compiled = compiled_worlds.get(key)
+            if compiled is not None:
+                self.world, self.simulator = compiled.instantiate()
+                world_state = compiled.state()
+            else:
+                self._build_scenario(scenario)
+                # The entry serializes the world; answer from it rather than twice
+                compiled = compiled_worlds.put(key, self.world, self.simulator)
+                world_state = compiled.state() if compiled is not None else self.world.to_dict()
             
             return {
                 "success": True,
-                "world_state": self.world.to_dict(),
+                "world_state": world_state,
                 "scenario_description": scenario.description
             }
             
@@ -139,8 +163,103 @@ class SimulationService:
             }
 
     
+    def _build_scenario(self, scenario: SimulationScenario):
+        """Build the world and simulator for a scenario"""
+        # Create world
+        env = scenario.environment
+        self.world = World(
+            width=env.get("width", 100),
+            height=env.get("height", 100),
+            ground_level=env.get("ground_level", 0)
+        )
+        
+        # Add entities
+        for entity in scenario.entities:
+            pos = Vector(
+                entity.initial_position["x"],
+                entity.initial_position["y"]
+            )
+            vel = Vector(
+                entity.initial_velocity["x"],
+                entity.initial_velocity["y"]
+            )
+            
+            obj = PhysicsObject(
+                mass=entity.mass,
+                position=pos,
+                velocity=vel,
+                radius=entity.radius,
+                label=entity.name,
+                color=entity.color,
+                object_id=entity.name,
+                shape="circle"
+            )
+            
+            # Check if this entity should have circular motion
+            if hasattr(entity, 'circular_motion') and entity.circular_motion:
+                cm = entity.circular_motion
+                center = Vector(cm.get("center", {}).get("x", 50), cm.get("center", {}).get("y", 50))
+                radius = cm.get("radius", entity.radius * 20)  # Scale up radius
+                linear_vel = cm.get("linear_velocity", vel.magnitude())
+                
+                # Enable circular motion
+                obj.circular_motion = CircularMotion.from_linear_velocity(center, radius, linear_vel, 0)
+                obj.circular_motion.enabled = True
+                
+                # Position object at start of circle
+                obj.position.x = center.x + radius
+                obj.position.y = center.y
+                obj.velocity.x = 0
+                obj.velocity.y = linear_vel
+            
+            # Apply forces (only if not in circular motion)
+            if not (obj.circular_motion and obj.circular_motion.enabled):
+                for force_config in scenario.forces:
+                    make_force = SCENARIO_FORCES.get(force_config.type)
+                    if make_force is not None:
+                        obj.apply_force(make_force(force_config.parameters))
+            
+            self.world.add_object(obj)
+        
+        # Add center marker for circular motion
+        if scenario.scenario_type == "circular_motion":
+            for entity in scenario.entities:
+                if hasattr(entity, 'circular_motion') and entity.circular_motion:
+                    cm = entity.circular_motion
+                    center = Vector(cm.get("center", {}).get("x", 50), cm.get("center", {}).get("y", 50))
+                    
+                    center_obj = PhysicsObject(
+                        mass=0.1,
+                        position=center,
+                        velocity=Vector(0, 0),
+                        radius=0.3,
+                        label="Center",
+                        color="#34495e",
+                        object_id="center_point"
+                    )
+                    center_obj.is_static = True
+                    self.world.add_object(center_obj)
+        
+        # Create simulator
+        self.simulator = Simulator(self.world, dt=0.016)
+    
     def create_preset(self, preset_name: str, parameters: Dict[str, Any]) -> dict:
         """Create simulation from preset"""
+        key = preset_key(preset_name, parameters)
+        compiled = compiled_worlds.get(key)
+        if compiled is not None:
+            self.world, self.simulator = compiled.instantiate()
+            return {"success": True, "world_state": compiled.state()}
+        
+        result = self._build_preset(preset_name, parameters)
+        if result.get("success"):
+            # Reuse the state the builder serialized; the entry now owns it
+            compiled = compiled_worlds.put(key, self.world, self.simulator, result["world_state"])
+            if compiled is not None:
+                result["world_state"] = compiled.state()
+        return result
+    
+    def _build_preset(self, preset_name: str, parameters: Dict[str, Any]) -> dict:
         try:
             if preset_name == "projectile_motion":
                 return self._create_projectile_preset(parameters)
@@ -427,19 +546,124 @@ class SimulationService:
         self.simulator = Simulator(self.world)
         return {"success": True, "world_state": self.world.to_dict()}
     
-    def step(self, num_steps: int = 1) -> dict:
-        """Advance simulation"""
+    def step(
+        self,
+        num_steps: int = 1,
+        detail: str = "full",
+        fields: Optional[Sequence[str]] = None,
+        deadline: Optional[float] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> dict:
+        """Advance simulation
+        
+        Stepping stops early once ``deadline`` (a time.monotonic() value)
+        passes or ``cancel_event`` is set; the state then also carries
+        ``steps_completed`` and ``truncated``.
+        """
         if not self.simulator:
             return {"error": "No active simulation"}
         
-        return self.simulator.run_steps(num_steps)
+        error = self._check_projection(detail, fields)
+        if error:
+            return error
+        
+        # Queued mutations land between steps, never in the middle of one
+        self.commands.drain()
+        
+        completed = 0
+        while completed < num_steps:
+            if completed % BUDGET_CHECK_INTERVAL == 0 and self._out_of_budget(deadline, cancel_event):
+                break
+            self.simulator.step()
+            completed += 1
+        self.enforce_memory_cap()
+        
+        state = self.world.to_dict(detail, fields)
+        if completed < num_steps:
+            state["steps_completed"] = completed
+            state["truncated"] = True
+        return state
     
-    def step_once(self) -> dict:
+    @staticmethod
+    def _out_of_budget(deadline: Optional[float], cancel_event: Optional[threading.Event]) -> bool:
+        if cancel_event is not None and cancel_event.is_set():
+            return True
+        return deadline is not None and time.monotonic() >= deadline
+    
+    def advance(self, num_steps: int = 1) -> bool:
+        """Advance simulation without serializing state; returns False if there is none"""
+        if not self.simulator:
+            return False
+        
+        self.commands.drain()
+        for _ in range(num_steps):
+            self.simulator.step()
+        self.enforce_memory_cap()
+        return True
+    
+    def step_once(self, detail: str = "full", fields: Optional[Sequence[str]] = None) -> dict:
         """Execute single step for step-by-step mode"""
         if not self.simulator:
             return {"error": "No active simulation"}
         
-        return self.simulator.step_once()
+        error = self._check_projection(detail, fields)
+        if error:
+            return error
+        
+        self.commands.drain()
+        return self.simulator.step_once(detail, fields)
+    
+    def get_state(self, detail: str = "full", fields: Optional[Sequence[str]] = None) -> dict:
+        """Get current world state at the requested detail level"""
+        if not self.world:
+            return {"error": "No active simulation"}
+        
+        error = self._check_projection(detail, fields)
+        if error:
+            return error
+        
+        return self.world.to_dict(detail, fields)
+    
+    def get_state_payload(self, detail: str = "full", fields: Optional[Sequence[str]] = None) -> Tuple[str, bytes]:
+        """Get (etag, encoded JSON) for the current state, reusing it while the world is unchanged
+        
+        Raises ValueError for unknown detail levels or fields.
+        """
+        return self.state_cache.get(self.world, detail, fields)
+    
+    def estimate_memory(self) -> int:
+        """Rough resident size of this session's world in bytes"""
+        if not self.world:
+            return 0
+        
+        points = sum(len(obj.trajectory) for obj in self.world.objects)
+        return (
+            len(self.world.objects) * OBJECT_BYTES
+            + points * TRAJECTORY_POINT_BYTES
+            + len(self.world.energy_tracker.history) * ENERGY_RECORD_BYTES
+        )
+    
+    def enforce_memory_cap(self):
+        """Trim the oldest energy history once the session exceeds its memory cap"""
+        if not self.max_memory_bytes or not self.world:
+            return
+        
+        excess = self.estimate_memory() - self.max_memory_bytes
+        if excess <= 0:
+            return
+        
+        # Energy history is the only unbounded buffer (trajectories stop at 1000 points)
+        history = self.world.energy_tracker.history
+        drop = min(len(history), math.ceil(excess / ENERGY_RECORD_BYTES))
+        del history[:drop]
+    
+    def _check_projection(self, detail: str, fields: Optional[Sequence[str]]) -> Optional[dict]:
+        """Validate a state projection before doing any simulation work"""
+        try:
+            resolve_projection(detail, fields)
+        except ValueError as e:
+            return {"error": str(e)}
+        return None
     
     def add_object(self, obj_data: dict) -> dict:
         """Add a new object to the simulation"""
@@ -465,7 +689,7 @@ class SimulationService:
             
             self.world.add_object(obj)
             
-            return {"success": True, "world_state": self.world.to_dict()}
+            return self._mutation_result()
         except Exception as e:
             return {"error": str(e)}
     
@@ -505,7 +729,7 @@ class SimulationService:
             # Reset simulation
             self.simulator.reset()
             
-            return {"success": True, "world_state": self.world.to_dict()}
+            return self._mutation_result()
         except Exception as e:
             return {"error": str(e)}
     
@@ -523,6 +747,7 @@ class SimulationService:
             
             if "collision_enabled" in updates:
                 self.world.collision_enabled = updates["collision_enabled"]
+                self.world.touch()
             
             # Update gravity forces on all objects
             if "gravity_enabled" in updates or "gravity_strength" in updates:
@@ -531,7 +756,7 @@ class SimulationService:
                     self.world.gravity_strength
                 )
             
-            return {"success": True, "world_state": self.world.to_dict()}
+            return self._mutation_result()
         except Exception as e:
             return {"error": str(e)}
     
@@ -550,8 +775,9 @@ class SimulationService:
                 obj.enable_circular_motion(center, radius, angular_velocity, initial_angle)
             else:
                 obj.disable_circular_motion()
+            self.world.touch()
             
-            return {"success": True, "world_state": self.world.to_dict()}
+            return self._mutation_result()
         except Exception as e:
             return {"error": str(e)}
     
@@ -567,18 +793,41 @@ class SimulationService:
         try:
             obj.collision_type = collision_type
             obj.restitution = restitution
+            self.world.touch()
             
-            return {"success": True, "world_state": self.world.to_dict()}
+            return self._mutation_result()
         except Exception as e:
             return {"error": str(e)}
     
+    def set_circular_motion_radius(self, object_id: str, radius: float) -> dict:
+        """Change the radius of an object's circular motion"""
+        if not self.world:
+            return {"error": "No active simulation"}
+        
+        obj = self.world.get_object(object_id)
+        if not obj:
+            return {"error": "Object not found", "status_code": 404}
+        
+        if not obj.circular_motion or not obj.circular_motion.enabled:
+            return {"error": "Object is not in circular motion"}
+        
+        obj.circular_motion.set_radius(radius)
+        self.world.touch()
+        return self._mutation_result()
+    
+    def _mutation_result(self) -> dict:
+        """Success result of a mutation; batched commands share one state built afterwards"""
+        if self.commands.batching:
+            return {"success": True}
+        return {"success": True, "world_state": self.world.to_dict()}
+    
     def reset(self) -> dict:
         """Reset simulation to initial state"""
         if not self.simulator or not self.current_scenario:
             return {"error": "No active simulation"}
         
         self.simulator.reset()
-        return {"success": True, "world_state": self.world.to_dict()}
+        return self._mutation_result()
     
     def start(self):
         """Start simulation"""
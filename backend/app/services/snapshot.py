@@ -0,0 +1,408 @@
+# backend/app/services/snapshot.py
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+from ..encoding import dumps
+from ..physics.circular_motion import CircularMotion
+from ..physics.forces import (
+    Force, Gravity, Drag, Friction, Spring, ConstantForce, CentripetalForce, InteractionForce
+)
+from ..physics.object import PhysicsObject
+from ..physics.simulator import Simulator
+from ..physics.vector import Vector
+from ..physics.world import World
+
+# Bump when the layout below changes; restore refuses unknown versions
+SNAPSHOT_VERSION = 1
+
+class SnapshotError(Exception):
+    """Raised when a snapshot cannot be restored"""
+
+# Force type name -> (class, parameter attributes). Vector parameters are
+# stored as [x, y]; InteractionForce stores the other object's ID.
+FORCE_TYPES: Dict[str, Tuple[type, Tuple[str, ...]]] = {
+    "gravity": (Gravity, ("g",)),
+    "drag": (Drag, ("coefficient",)),
+    "friction": (Friction, ("mu_k", "mu_s")),
+    "spring": (Spring, ("k", "anchor", "rest_length")),
+    "constant": (ConstantForce, ("force_vector",)),
+    "centripetal": (CentripetalForce, ("center", "radius", "angular_velocity")),
+    "interaction": (InteractionForce, ("other_obj", "strength")),
+}
+_FORCE_NAMES = {cls: name for name, (cls, _) in FORCE_TYPES.items()}
+
+def _vec(v: Vector) -> List[float]:
+    return [v.x, v.y]
+
+def _unvec(data) -> Vector:
+    return Vector(data[0], data[1])
+
+def _force_to_dict(force: Force) -> dict:
+    name = _FORCE_NAMES.get(type(force))
+    if name is None:
+        raise SnapshotError(f"Cannot snapshot force type {type(force).__name__}")
+    
+    params = {}
+    for attr in FORCE_TYPES[name][1]:
+        value = getattr(force, attr)
+        if isinstance(value, Vector):
+            value = _vec(value)
+        elif isinstance(value, PhysicsObject):
+            value = value.object_id
+        params[attr] = value
+    return {"type": name, "enabled": force.enabled, "params": params}
+
+def _force_from_dict(data: dict, objects: Dict[str, PhysicsObject]) -> Force:
+    if data["type"] not in FORCE_TYPES:
+        raise SnapshotError(f"Unknown force type '{data['type']}'")
+    
+    cls, attrs = FORCE_TYPES[data["type"]]
+    args = []
+    for attr in attrs:
+        value = data["params"][attr]
+        if attr == "other_obj":
+            value = objects[value]
+        elif isinstance(value, list):
+            value = _unvec(value)
+        args.append(value)
+    force = cls(*args)
+    force.enabled = data.get("enabled", True)
+    return force
+
+def _object_to_dict(obj: PhysicsObject) -> dict:
+    cm = obj.circular_motion
+    trajectory = obj.trajectory
+    return {
+        "id": obj.object_id,
+        "label": obj.label,
+        "mass": obj.mass,
+        "radius": obj.radius,
+        "color": obj.color,
+        "shape": obj.shape,
+        "width": obj.width,
+        "height": obj.height,
+        "position": _vec(obj.position),
+        "velocity": _vec(obj.velocity),
+        "acceleration": _vec(obj.acceleration),
+        "initial_position": _vec(obj.initial_position),
+        "initial_velocity": _vec(obj.initial_velocity),
+        "momentum": _vec(obj.momentum),
+        "kinetic_energy": obj.kinetic_energy,
+        "potential_energy": obj.potential_energy,
+        "is_static": obj.is_static,
+        "collision_type": obj.collision_type,
+        "restitution": obj.restitution,
+        "display": [obj.show_velocity_vector, obj.show_force_vectors, obj.show_trajectory],
+        # Columnar buffers are far smaller than one dict per point
+        "trajectory": [
+            [p["x"] for p in trajectory],
+            [p["y"] for p in trajectory],
+            [p["time"] for p in trajectory],
+        ],
+        "forces": [_force_to_dict(f) for f in obj.forces],
+        "circular_motion": None if cm is None else {
+            "center": _vec(cm.center),
+            "radius": cm.radius,
+            "angular_velocity": cm.angular_velocity,
+            "angle": cm.angle,
+            "enabled": cm.enabled,
+            "clockwise": cm.clockwise,
+        },
+    }
+
+def _object_from_dict(data: dict) -> PhysicsObject:
+    obj = PhysicsObject(
+        mass=data["mass"],
+        position=_unvec(data["position"]),
+        velocity=_unvec(data["velocity"]),
+        radius=data["radius"],
+        label=data["label"],
+        color=data["color"],
+        object_id=data["id"],
+        shape=data["shape"],
+        width=data["width"],
+        height=data["height"]
+    )
+    obj.acceleration = _unvec(data["acceleration"])
+    obj.initial_position = _unvec(data["initial_position"])
+    obj.initial_velocity = _unvec(data["initial_velocity"])
+    obj.momentum = _unvec(data["momentum"])
+    obj.kinetic_energy = data["kinetic_energy"]
+    obj.potential_energy = data["potential_energy"]
+    obj.is_static = data["is_static"]
+    obj.collision_type = data["collision_type"]
+    obj.restitution = data["restitution"]
+    obj.show_velocity_vector, obj.show_force_vectors, obj.show_trajectory = data["display"]
+    xs, ys, ts = data["trajectory"]
+    obj.trajectory = [{"x": x, "y": y, "time": t} for x, y, t in zip(xs, ys, ts)]
+    
+    cm = data.get("circular_motion")
+    if cm:
+        obj.circular_motion = CircularMotion(_unvec(cm["center"]), cm["radius"], cm["angular_velocity"], cm["angle"])
+        obj.circular_motion.enabled = cm["enabled"]
+        obj.circular_motion.clockwise = cm["clockwise"]
+    return obj
+
+def snapshot_service(service) -> dict:
+    """Capture a SimulationService's full session state as plain data"""
+    world = service.world
+    simulator = service.simulator
+    snapshot: Dict[str, Any] = {
+        "version": SNAPSHOT_VERSION,
+        "session_id": service.session_id,
+        "scenario": service.current_scenario.model_dump() if service.current_scenario else None,
+        "world": None,
+        "simulator": None,
+    }
+    if world is None:
+        return snapshot
+    
+    history = world.energy_tracker.history
+    snapshot["world"] = {
+        "uid": world.uid,
+        "version": world.version,
+        "width": world.width,
+        "height": world.height,
+        "ground_level": world.ground_level,
+        "time": world.time,
+        "gravity_enabled": world.gravity_enabled,
+        "gravity_strength": world.gravity_strength,
+        "collision_enabled": world.collision_enabled,
+        "objects": [_object_to_dict(obj) for obj in world.objects],
+        "energy": {
+            "initial_energy": world.energy_tracker.initial_energy,
+            "history": {key: [h[key] for h in history] for key in ("time", "kinetic", "potential", "mechanical")},
+        },
+    }
+    if simulator is not None:
+        snapshot["simulator"] = {
+            "dt": simulator.dt,
+            "max_time": simulator.max_time,
+            "is_running": simulator.is_running,
+            "step_mode": simulator.step_mode,
+        }
+    return snapshot
+
+def restore_service(service, snapshot: dict):
+    """Load a snapshot produced by snapshot_service into a fresh SimulationService"""
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {snapshot.get('version')}")
+    
+    if snapshot.get("scenario"):
+        from ..nlp.schema import SimulationScenario
+        service.current_scenario = SimulationScenario(**snapshot["scenario"])
+    
+    data = snapshot.get("world")
+    if data is None:
+        return service
+    
+    world = World(width=data["width"], height=data["height"], ground_level=data["ground_level"])
+    world.time = data["time"]
+    world.gravity_enabled = data["gravity_enabled"]
+    world.gravity_strength = data["gravity_strength"]
+    world.collision_enabled = data["collision_enabled"]
+    
+    objects = [_object_from_dict(o) for o in data["objects"]]
+    by_id = {obj.object_id: obj for obj in objects}
+    for obj, obj_data in zip(objects, data["objects"]):
+        obj.forces = [_force_from_dict(f, by_id) for f in obj_data["forces"]]
+    world.objects = objects
+    
+    energy = data["energy"]
+    columns = energy["history"]
+    world.energy_tracker.history = [
+        {"time": t, "kinetic": k, "potential": p, "mechanical": m}
+        for t, k, p, m in zip(columns["time"], columns["kinetic"], columns["potential"], columns["mechanical"])
+    ]
+    world.energy_tracker.initial_energy = energy["initial_energy"]
+    
+    # Keep the identity and version so cached ETags stay valid across workers
+    world.uid = data["uid"]
+    world.version = data["version"]
+    
+    service.world = world
+    sim = snapshot.get("simulator")
+    if sim is not None:
+        service.simulator = Simulator(world, dt=sim["dt"])
+        service.simulator.max_time = sim["max_time"]
+        service.simulator.is_running = sim["is_running"]
+        service.simulator.step_mode = sim["step_mode"]
+    return service
+
+def encode_snapshot(snapshot: dict) -> bytes:
+    return dumps(snapshot)
+
+def decode_snapshot(payload: bytes) -> dict:
+    return json.loads(payload)
+
+class SnapshotStore(ABC):
+    """Where session snapshots live; shared by all worker processes"""
+    
+    @abstractmethod
+    def save(self, session_id: str, payload: bytes) -> int:
+        """Store a snapshot and return its new revision"""
+    
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Tuple[int, bytes]]:
+        """Return (revision, payload) or None if the session is unknown"""
+    
+    @abstractmethod
+    def revision(self, session_id: str) -> Optional[int]:
+        """Current revision of a stored session, without reading the payload"""
+    
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Forget a session; unknown sessions are ignored"""
+
+class FileSnapshotStore(SnapshotStore):
+    """One file per session in a local directory, optionally gzip-compressed
+    
+    Each file starts with a fixed header holding the revision, a hash of
+    the snapshot, so revision() reads a few bytes instead of the payload
+    and two saves in quick succession never look alike the way file
+    timestamps can.
+    """
+    
+    MAGIC = b"SNAP"
+    HEADER_SIZE = len(MAGIC) + 8
+    
+    def __init__(self, directory: str, compress_level: int = 0):
+        self.directory = directory
+        self.compress_level = compress_level
+        self.suffix = ".snapshot.json.gz" if compress_level > 0 else ".snapshot.json"
+    
+    def _path(self, session_id: str) -> str:
+        # Session IDs come from clients: hash them, so no ID can escape the
+        # directory and distinct IDs never share a file
+        name = hashlib.sha256(session_id.encode()).hexdigest()
+        return os.path.join(self.directory, name + self.suffix)
+    
+    @staticmethod
+    def _revision_of(payload: bytes) -> int:
+        # 63 bits, so revisions fit a signed 64-bit integer like SQLite's
+        digest = hashlib.blake2b(payload, digest_size=8).digest()
+        return int.from_bytes(digest, "big") >> 1
+    
+    def _read_header(self, f) -> int:
+        header = f.read(self.HEADER_SIZE)
+        if len(header) != self.HEADER_SIZE or not header.startswith(self.MAGIC):
+            raise SnapshotError(f"Unrecognized snapshot file {f.name}")
+        return int.from_bytes(header[len(self.MAGIC):], "big")
+    
+    def save(self, session_id: str, payload: bytes) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(session_id)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        revision = self._revision_of(payload)
+        if self.compress_level > 0:
+            payload = gzip.compress(payload, compresslevel=self.compress_level)
+        with open(tmp, "wb") as f:
+            f.write(self.MAGIC + revision.to_bytes(8, "big"))
+            f.write(payload)
+        os.replace(tmp, path)  # Atomic, so readers never see a partial file
+        return revision
+    
+    def load(self, session_id: str) -> Optional[Tuple[int, bytes]]:
+        try:
+            with open(self._path(session_id), "rb") as f:
+                revision = self._read_header(f)
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+        if self.compress_level > 0:
+            payload = gzip.decompress(payload)
+        return revision, payload
+    
+    def revision(self, session_id: str) -> Optional[int]:
+        try:
+            with open(self._path(session_id), "rb") as f:
+                return self._read_header(f)
+        except FileNotFoundError:
+            return None
+    
+    def delete(self, session_id: str):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+    
+    def purge(self, max_age: float) -> int:
+        """Delete snapshots not written for ``max_age`` seconds; returns how many"""
+        cutoff = time.time() - max_age
+        purged = 0
+        if not os.path.isdir(self.directory):
+            return purged
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(self.suffix):
+                continue
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+                    purged += 1
+            except FileNotFoundError:
+                pass
+        return purged
+
+class SQLiteSnapshotStore(SnapshotStore):
+    """All sessions in one SQLite database"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "session_id TEXT PRIMARY KEY, revision INTEGER NOT NULL, payload BLOB NOT NULL)"
+            )
+    
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections are not thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+    
+    def save(self, session_id: str, payload: bytes) -> int:
+        with self._connect() as conn:
+            row = conn.execute(
+                "INSERT INTO snapshots (session_id, revision, payload) VALUES (?, 1, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET revision = revision + 1, payload = excluded.payload "
+                "RETURNING revision",
+                (session_id, payload)
+            ).fetchone()
+        return row[0]
+    
+    def load(self, session_id: str) -> Optional[Tuple[int, bytes]]:
+        row = self._connect().execute(
+            "SELECT revision, payload FROM snapshots WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+    
+    def revision(self, session_id: str) -> Optional[int]:
+        row = self._connect().execute(
+            "SELECT revision FROM snapshots WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def delete(self, session_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM snapshots WHERE session_id = ?", (session_id,))
+
+def create_snapshot_store(kind: str, path: str) -> Optional[SnapshotStore]:
+    """Build the configured store ("file", "sqlite" or "" for none)"""
+    if not kind:
+        return None
+    if kind == "file":
+        return FileSnapshotStore(path)
+    if kind == "sqlite":
+        return SQLiteSnapshotStore(path)
+    raise ValueError(f"Unknown snapshot store '{kind}'")
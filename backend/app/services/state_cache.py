@@ -0,0 +1,49 @@
+# backend/app/services/state_cache.py
+import zlib
+from typing import Dict, Optional, Sequence, Tuple
+from ..encoding import dumps
+from ..physics.world import World
+
+class StateCache:
+    """Serialized world state cached per projection against the world version
+
+    Entries are only valid for the (world uid, version) they were built
+    from; the first lookup after a step or mutation drops them all.
+    """
+    
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self.stamp: Optional[Tuple[str, int]] = None
+        self.entries: Dict[tuple, Tuple[str, bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, world: World, detail: str = "full", fields: Optional[Sequence[str]] = None) -> Tuple[str, bytes]:
+        """Return (etag, JSON body) for the world state at the requested detail
+
+        Raises ValueError for unknown detail levels or fields.
+        """
+        stamp = (world.uid, world.version)
+        if stamp != self.stamp:
+            self.entries.clear()
+            self.stamp = stamp
+        
+        key = (detail, tuple(fields) if fields else None)
+        cached = self.entries.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        
+        self.misses += 1
+        body = dumps(world.to_dict(detail, fields))
+        # Weak ETag: the same state may be sent gzip/brotli encoded
+        etag = f'W/"{world.uid}-{world.version}-{zlib.crc32(repr(key).encode()):08x}"'
+        if len(self.entries) >= self.max_entries:
+            self.entries.pop(next(iter(self.entries)))
+        self.entries[key] = (etag, body)
+        return etag, body
+    
+    def clear(self):
+        """Drop all cached entries"""
+        self.entries.clear()
+        self.stamp = None
@@ -1,10 +1,15 @@
 # backend/run.py
 import uvicorn
+from app import config
 
 if __name__ == "__main__":
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        # Auto-reload only works with a single process
+        reload=config.WORKERS == 1,
+        workers=config.WORKERS,
+        # Browsers negotiate permessage-deflate for the simulation WebSocket
+        ws_per_message_deflate=config.WS_PER_MESSAGE_DEFLATE
     )
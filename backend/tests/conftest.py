@@ -0,0 +1,68 @@
+# backend/tests/conftest.py
+import asyncio
+import json
+from typing import Callable, List, Optional, Union
+import pytest
+from fastapi.testclient import TestClient
+from app.nlp.backends import LLMBackend
+from app.nlp.cache import ParseCache
+from app.nlp.parser import PhysicsProblemParser
+from app.nlp.templates import TemplateCache
+from app.main import app
+
+class FakeBackend(LLMBackend):
+    """A model server that answers from a list or a function of the prompt"""
+    
+    kind = "fake"
+    
+    def __init__(self, respond: Union[str, dict, Callable[[str], str]], delay: float = 0.0, chunk_size: int = 0):
+        super().__init__("fake-model")
+        self.respond = respond
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self.prompts: List[str] = []
+    
+    def _response(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        response = self.respond(prompt) if callable(self.respond) else self.respond
+        return json.dumps(response) if isinstance(response, dict) else response
+    
+    async def generate(self, prompt: str, schema: Optional[dict] = None) -> str:
+        response = self._response(prompt)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return response
+    
+    async def generate_stream(self, prompt: str, schema: Optional[dict] = None):
+        response = self._response(prompt)
+        size = self.chunk_size or len(response) or 1
+        for start in range(0, len(response), size):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield response[start:start + size]
+
+@pytest.fixture
+def make_parser():
+    """Build a parser around a FakeBackend with in-memory caches"""
+    def build(respond, **kwargs) -> PhysicsProblemParser:
+        backend = FakeBackend(respond, **kwargs)
+        parser = PhysicsProblemParser(
+            backend=backend,
+            cache=ParseCache(path=None),
+            templates=TemplateCache()
+        )
+        parser.fake = backend
+        return parser
+    return build
+
+@pytest.fixture
+def client():
+    """A TestClient with the app's lifespan running"""
+    with TestClient(app) as client:
+        yield client
+
+def create_session(client: TestClient, preset_name: str = "free_fall") -> str:
+    """Create a preset world in a new session and return its ID"""
+    response = client.post("/api/preset", json={"preset_name": preset_name, "parameters": {}})
+    assert response.status_code == 200
+    return response.headers["X-Session-ID"]
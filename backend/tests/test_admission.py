@@ -0,0 +1,48 @@
+# backend/tests/test_admission.py
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from app.api import admission
+from app.api.admission import RateLimiter
+
+def request(session_id: str, host: str = "10.0.0.1"):
+    return SimpleNamespace(
+        path_params={},
+        headers={"X-Session-ID": session_id},
+        query_params={},
+        cookies={},
+        client=SimpleNamespace(host=host)
+    )
+
+def test_rate_limiter_allows_burst_then_rejects():
+    limiter = RateLimiter("test", rate=0.001, burst=2)
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(HTTPException) as e:
+        limiter.check("a")
+    assert e.value.status_code == 429
+    assert "Retry-After" in e.value.headers
+    limiter.check("b")
+
+def test_new_session_ids_share_the_client_bucket(monkeypatch):
+    limiter = RateLimiter("test", rate=0.001, burst=1)
+    monkeypatch.setitem(admission.rate_limiters, "test", limiter)
+    monkeypatch.setattr(admission.config, "RATE_LIMIT_CLIENT_FACTOR", 2.0)
+    check = admission.rate_limit("test")
+    
+    check(request("s1"))
+    check(request("s2"))
+    with pytest.raises(HTTPException):
+        check(request("s3"))
+    # Other addresses are unaffected
+    check(request("s4", host="10.0.0.2"))
+
+def test_session_limit_applies_within_client_allowance(monkeypatch):
+    limiter = RateLimiter("test", rate=0.001, burst=1)
+    monkeypatch.setitem(admission.rate_limiters, "test", limiter)
+    monkeypatch.setattr(admission.config, "RATE_LIMIT_CLIENT_FACTOR", 4.0)
+    check = admission.rate_limit("test")
+    
+    check(request("s1"))
+    with pytest.raises(HTTPException):
+        check(request("s1"))
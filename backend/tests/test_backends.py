@@ -0,0 +1,163 @@
+# backend/tests/test_backends.py
+import asyncio
+import json
+import httpx
+import pytest
+from app.nlp import backends
+from app.nlp.backends import OllamaBackend, OpenAIBackend, ReplayBackend, create_backend
+from .conftest import FakeBackend
+
+def ollama_server(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    if body["stream"]:
+        lines = [json.dumps({"response": part, "done": False}) for part in ('{"a":', ' 1}')]
+        lines.append(json.dumps({"response": "", "done": True}))
+        return httpx.Response(200, text="\n".join(lines) + "\n")
+    return httpx.Response(200, json={"response": json.dumps({"format": body["format"]})})
+
+def openai_server(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    if body["stream"]:
+        events = [{"choices": [{"delta": {"content": part}}]} for part in ('{"a":', ' 1}')]
+        text = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        return httpx.Response(200, text=text)
+    return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps(body["response_format"])}}]})
+
+@pytest.fixture
+def pooled(monkeypatch):
+    """Count the pooled clients the backends create"""
+    created = []
+    
+    def create(handler):
+        def factory(http2: bool = False) -> httpx.AsyncClient:
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            created.append(client)
+            return client
+        monkeypatch.setattr(backends, "create_http_client", factory)
+    
+    create.created = created
+    return create
+
+def test_calls_share_one_pooled_client(pooled):
+    pooled(ollama_server)
+    backend = OllamaBackend("m", "http://model", api_key="k")
+    
+    async def run():
+        return [await backend.generate("p") for _ in range(3)]
+    
+    assert len(asyncio.run(run())) == 3
+    assert len(pooled.created) == 1
+
+def test_owned_client_is_closed_and_reopened(pooled):
+    pooled(ollama_server)
+    backend = OllamaBackend("m", "http://model", api_key="k")
+    
+    async def run():
+        first = await backend.open()
+        await backend.aclose()
+        second = await backend.open()
+        await backend.aclose()
+        return first, second
+    
+    first, second = asyncio.run(run())
+    assert first.is_closed and second.is_closed
+    assert first is not second
+
+def test_injected_client_is_left_open():
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(ollama_server)) as client:
+            backend = OllamaBackend("m", "http://model", api_key="k", client=client)
+            await backend.generate("p")
+            await backend.aclose()
+            return client.is_closed
+    
+    assert asyncio.run(run()) is False
+
+def test_missing_api_key_is_reported_on_use(pooled):
+    pooled(ollama_server)
+    with pytest.raises(ValueError, match="API_KEY"):
+        asyncio.run(OllamaBackend("m", "http://model").generate("p"))
+    assert asyncio.run(OllamaBackend("m", "http://model", require_key=False).generate("p"))
+
+@pytest.mark.parametrize("cls, server", [(OllamaBackend, ollama_server), (OpenAIBackend, openai_server)])
+def test_streams_are_reassembled(pooled, cls, server):
+    pooled(server)
+    backend = cls("m", "http://model", api_key="k")
+    
+    async def run():
+        return [chunk async for chunk in backend.generate_stream("p")]
+    
+    assert "".join(asyncio.run(run())) == '{"a": 1}'
+
+def test_schema_is_sent_as_the_output_format(pooled):
+    schema = {"type": "object"}
+    pooled(ollama_server)
+    assert json.loads(asyncio.run(OllamaBackend("m", "http://model", api_key="k").generate("p", schema))) == {"format": schema}
+    pooled(openai_server)
+    sent = json.loads(asyncio.run(OpenAIBackend("m", "http://model", api_key="k").generate("p", schema)))
+    assert sent["type"] == "json_schema" and sent["json_schema"]["schema"] == schema
+
+def test_replay_serves_recordings_and_refuses_unknown_prompts(tmp_path):
+    backend = ReplayBackend("m", path=str(tmp_path), chunk_size=4)
+    backend._save(backend.key("known"), "known", '{"entities": []}')
+    
+    async def run():
+        whole = await backend.generate("known")
+        chunks = [chunk async for chunk in backend.generate_stream("known")]
+        return whole, chunks
+    
+    whole, chunks = asyncio.run(run())
+    assert whole == '{"entities": []}'
+    assert chunks[0] == '{"en' and "".join(chunks) == whole
+    with pytest.raises(LookupError):
+        asyncio.run(backend.generate("unknown"))
+    # Recordings are per model
+    with pytest.raises(LookupError):
+        asyncio.run(ReplayBackend("other", path=str(tmp_path)).generate("known"))
+
+def test_record_mode_saves_misses_for_later_replay(tmp_path):
+    upstream = FakeBackend('{"a": 1}', chunk_size=3)
+    recorder = ReplayBackend("m", path=str(tmp_path), upstream=upstream)
+    
+    async def run():
+        first = await recorder.generate("p")
+        again = await recorder.generate("p")
+        streamed = "".join([chunk async for chunk in recorder.generate_stream("q")])
+        return first, again, streamed
+    
+    first, again, streamed = asyncio.run(run())
+    assert first == again == streamed == '{"a": 1}'
+    assert upstream.prompts == ["p", "q"]
+    
+    replay = ReplayBackend("m", path=str(tmp_path))
+    assert asyncio.run(replay.generate("q")) == '{"a": 1}'
+
+def test_replay_delays_are_repeatable(tmp_path, monkeypatch):
+    slept = []
+    
+    async def sleep(seconds):
+        slept.append(seconds)
+    
+    monkeypatch.setattr(backends.asyncio, "sleep", sleep)
+    for _ in range(2):
+        backend = ReplayBackend("m", path=str(tmp_path), latency=0.5, jitter=0.5, seed=7)
+        backend._save(backend.key("p"), "p", "{}")
+        asyncio.run(backend.generate("p"))
+    
+    assert slept[0] == slept[1]
+    assert 0.5 <= slept[0] <= 1.0
+
+def test_create_backend_picks_the_configured_kind(monkeypatch):
+    monkeypatch.setattr(backends.config, "LLM_RECORD_BACKEND", "ollama-local")
+    
+    assert isinstance(create_backend("ollama", "m"), OllamaBackend)
+    assert isinstance(create_backend("openai", "m"), OpenAIBackend)
+    assert create_backend("replay", "m").upstream is None
+    recorder = create_backend("record", "m")
+    assert isinstance(recorder, ReplayBackend) and isinstance(recorder.upstream, OllamaBackend)
+    with pytest.raises(ValueError):
+        create_backend("telepathy", "m")
+    
+    monkeypatch.setattr(backends.config, "LLM_RECORD_BACKEND", "replay")
+    with pytest.raises(ValueError):
+        create_backend("record", "m")
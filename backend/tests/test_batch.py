@@ -0,0 +1,30 @@
+# backend/tests/test_batch.py
+import asyncio
+from app.services.batch_service import parse_batch
+from app.services.resources import resources
+from .test_parser import PROBLEM, drop
+
+def test_batch_tries_the_fast_path_once_per_problem(make_parser, monkeypatch):
+    parser = make_parser(drop(10))
+    monkeypatch.setattr(resources, "_parser", parser)
+    fast_calls = []
+    parse_fast = parser._parse_fast
+    
+    async def counting(problem_text, *args):
+        fast_calls.append(problem_text)
+        return await parse_fast(problem_text, *args)
+    
+    monkeypatch.setattr(parser, "_parse_fast", counting)
+    problems = [PROBLEM.format(10), "A ball is dropped from a height of 20 m", PROBLEM.format(10)]
+    
+    async def run():
+        return [event async for event in parse_batch(problems)]
+    
+    events = asyncio.run(run())
+    
+    items = {e["index"]: e for e in events if e["type"] == "item"}
+    assert all(item["success"] for item in items.values())
+    assert items[0]["source"] == items[2]["source"] == "model"
+    assert items[1]["source"] == "cache"
+    assert len(parser.fake.prompts) == 1
+    assert sorted(fast_calls) == sorted(set(problems))
@@ -0,0 +1,128 @@
+# backend/tests/test_broadcast.py
+import asyncio
+import json
+from app.api import websocket as ws_module
+from app.api.websocket import ConnectionManager
+from app.services.simulation_service import SimulationService
+
+class FakeSocket:
+    """Records frames; can stall or fail on send"""
+    
+    def __init__(self, stall: bool = False, fail: bool = False):
+        self.stall = stall
+        self.fail = fail
+        self.sent = []
+        self.closed = None
+    
+    async def accept(self):
+        pass
+    
+    async def send_text(self, text: str):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        if self.stall:
+            await asyncio.Event().wait()
+        self.sent.append(text)
+    
+    async def close(self, code: int = 1000):
+        self.closed = code
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_broadcast_encodes_once_for_all_viewers(monkeypatch):
+    encoded = []
+    dumps_text = ws_module.dumps_text
+    monkeypatch.setattr(ws_module, "dumps_text", lambda message: encoded.append(message) or dumps_text(message))
+    
+    async def run():
+        manager = ConnectionManager()
+        sockets = [FakeSocket() for _ in range(3)]
+        for socket in sockets:
+            await manager.connect(socket, "s")
+        other = FakeSocket()
+        await manager.connect(other, "elsewhere")
+        
+        await manager.broadcast("s", {"status": "stopped"})
+        await settle()
+        return sockets, other
+    
+    sockets, other = asyncio.run(run())
+    
+    assert len(encoded) == 1
+    assert all(socket.sent == ['{"status":"stopped"}'] for socket in sockets)
+    assert other.sent == []
+
+def test_slow_client_is_evicted_without_delaying_others():
+    async def run():
+        manager = ConnectionManager(queue_size=2, send_timeout=5.0)
+        fast, slow = FakeSocket(), FakeSocket(stall=True)
+        await manager.connect(fast, "s")
+        await manager.connect(slow, "s")
+        for i in range(5):
+            await manager.broadcast("s", {"frame": i})
+            await settle()
+        return manager, fast, slow
+    
+    manager, fast, slow = asyncio.run(run())
+    
+    assert [json.loads(frame)["frame"] for frame in fast.sent] == list(range(5))
+    assert slow not in manager.active_connections
+    assert slow.closed == 1013
+    assert [c.websocket for c in manager.session_clients("s")] == [fast]
+
+def test_failed_send_evicts_client():
+    async def run():
+        manager = ConnectionManager()
+        broken = FakeSocket(fail=True)
+        await manager.connect(broken, "s")
+        await manager.broadcast("s", {"frame": 0})
+        await settle()
+        return manager
+    
+    manager = asyncio.run(run())
+    assert manager.session_clients("s") == []
+
+def test_state_is_encoded_once_per_projection():
+    service = SimulationService()
+    service.create_preset("elastic_collision", {})
+    calls = []
+    to_dict = service.world.to_dict
+    service.world.to_dict = lambda detail="full", fields=None: calls.append(detail) or to_dict(detail, fields)
+    
+    async def run():
+        manager = ConnectionManager()
+        sockets = [FakeSocket() for _ in range(4)]
+        for i, socket in enumerate(sockets):
+            client = await manager.connect(socket, "s")
+            client.detail = "minimal" if i % 2 else "full"
+        await manager.broadcast_state("s", service)
+        await settle()
+        return sockets
+    
+    sockets = asyncio.run(run())
+    
+    assert sorted(calls) == ["full", "minimal"]
+    assert sockets[0].sent == sockets[2].sent
+    assert sockets[1].sent == sockets[3].sent
+    assert set(json.loads(sockets[1].sent[0])) == {"objects", "time"}
+
+def test_frames_reuse_the_state_cache():
+    service = SimulationService()
+    service.create_preset("free_fall", {})
+    
+    async def run():
+        manager = ConnectionManager()
+        socket = FakeSocket()
+        await manager.connect(socket, "s")
+        await manager.broadcast_state("s", service)
+        await manager.broadcast_state("s", service)
+        await settle()
+        return socket
+    
+    socket = asyncio.run(run())
+    
+    assert service.state_cache.misses == 1
+    assert service.state_cache.hits == 1
+    assert socket.sent[0] == socket.sent[1] == service.get_state_payload()[1].decode()
@@ -0,0 +1,82 @@
+# backend/tests/test_command_queue.py
+import asyncio
+import threading
+from app.services.executor import simulation_executor
+from app.services.simulation_service import SimulationService
+
+def count_serializations(service: SimulationService) -> list:
+    calls = []
+    to_dict = service.world.to_dict
+    service.world.to_dict = lambda *args, **kwargs: calls.append(args) or to_dict(*args, **kwargs)
+    return calls
+
+async def submit_while_lane_busy(service: SimulationService, *commands) -> list:
+    """Queue commands while the session's lane is busy, so they land in one batch"""
+    busy = threading.Event()
+    blocker = asyncio.ensure_future(simulation_executor.run(service.session_id, busy.wait, 5))
+    await asyncio.sleep(0.01)
+    pending = [asyncio.ensure_future(service.commands.submit(fn, *args)) for fn, *args in commands]
+    await asyncio.sleep(0.01)
+    busy.set()
+    await blocker
+    return await asyncio.gather(*pending)
+
+def test_queued_mutations_share_one_serialized_state():
+    service = SimulationService(session_id="commands-batch")
+    service.create_preset("elastic_collision", {})
+    object_id = service.world.objects[0].object_id
+    calls = count_serializations(service)
+    
+    results = asyncio.run(submit_while_lane_busy(
+        service,
+        (service.update_world, {"gravity_enabled": False}),
+        (service.update_parameter, object_id, "mass", 7.0),
+        (service.update_world, {"collision_enabled": False}),
+    ))
+    
+    assert all(result["success"] for result in results)
+    assert len(calls) == 1
+    assert results[0]["world_state"] is results[1]["world_state"] is results[2]["world_state"]
+    state = results[0]["world_state"]
+    assert state["gravity_enabled"] is False and state["collision_enabled"] is False
+    assert state["objects"][0]["mass"] == 7.0
+
+def test_a_failing_command_does_not_spoil_its_batch():
+    service = SimulationService(session_id="commands-errors")
+    service.create_preset("free_fall", {})
+    
+    def explode():
+        raise RuntimeError("boom")
+    
+    results = asyncio.run(submit_while_lane_busy(
+        service,
+        (explode,),
+        (service.update_parameter, "missing", "mass", 1.0),
+        (service.update_world, {"gravity_strength": 3.0}),
+    ))
+    
+    assert results[0] == {"error": "boom"}
+    assert "error" in results[1]
+    assert results[2]["success"] and results[2]["world_state"]["gravity_strength"] == 3.0
+
+def test_steps_apply_queued_mutations_first():
+    service = SimulationService(session_id="commands-step")
+    service.create_preset("free_fall", {})
+    service.start()
+    
+    async def run():
+        busy = threading.Event()
+        blocker = asyncio.ensure_future(simulation_executor.run(service.session_id, busy.wait, 5))
+        await asyncio.sleep(0.01)
+        update = asyncio.ensure_future(service.commands.submit(service.update_world, {"gravity_enabled": False}))
+        await asyncio.sleep(0.01)
+        # The step runs on this thread before the lane gets to the drain
+        state = service.step(1, "full")
+        busy.set()
+        await blocker
+        return state, await update
+    
+    state, result = asyncio.run(run())
+    
+    assert state["gravity_enabled"] is False
+    assert result["success"]
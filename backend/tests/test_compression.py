@@ -0,0 +1,41 @@
+# backend/tests/test_compression.py
+import gzip
+from app import config
+from app.api import compression
+from app.api.compression import compress_body
+from .conftest import create_session
+
+BODY = b'{"objects":[' + b'{"x":1.0,"y":2.0},' * 200 + b'{}]}'
+
+def test_small_bodies_are_sent_as_is():
+    assert compress_body(b"{}", "gzip", 6) == (b"{}", None)
+
+def test_level_zero_disables_compression():
+    assert compress_body(BODY, "gzip", 0) == (BODY, None)
+
+def test_gzip_when_accepted(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    body, encoding = compress_body(BODY, "deflate, gzip;q=0.8", 6)
+    
+    assert encoding == "gzip"
+    assert gzip.decompress(body) == BODY
+    assert len(body) < len(BODY)
+
+def test_refused_codings_are_not_used(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert compress_body(BODY, "gzip;q=0, identity", 6) == (BODY, None)
+    assert compress_body(BODY, "", 6) == (BODY, None)
+    assert compress_body(BODY, "*", 6)[1] == "gzip"
+
+def test_state_route_compresses_large_bodies(client, monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    monkeypatch.setattr(config, "COMPRESSION_MIN_SIZE", 64)
+    headers = {"X-Session-ID": create_session(client, "elastic_collision")}
+    
+    compressed = client.get("/api/state", headers={**headers, "Accept-Encoding": "gzip"})
+    plain = client.get("/api/state", headers={**headers, "Accept-Encoding": "identity"})
+    
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in plain.headers
+    assert compressed.json() == plain.json()
@@ -0,0 +1,36 @@
+# backend/tests/test_encoding.py
+import json
+import numpy as np
+import pytest
+from app import encoding
+from app.api.responses import FastJSONResponse
+from app.services.simulation_service import SimulationService
+
+STATE = {"objects": [{"id": "a", "position": {"x": 1.5, "y": -2.0}, "label": "bäll"}], "time": 0.016}
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(encoding, "orjson", None)
+    return request.param
+
+def test_dumps_round_trips_engine_state(encoder):
+    assert json.loads(encoding.dumps(STATE)) == STATE
+    assert json.loads(encoding.dumps_text(STATE)) == STATE
+
+def test_dumps_encodes_numpy_values(encoder):
+    data = {"array": np.array([1.0, 2.5]), "scalar": np.float64(3.25), "count": np.int64(4)}
+    assert json.loads(encoding.dumps(data)) == {"array": [1.0, 2.5], "scalar": 3.25, "count": 4}
+
+def test_dumps_rejects_unknown_types(encoder):
+    with pytest.raises(TypeError):
+        encoding.dumps({"value": object()})
+
+def test_fast_response_renders_state_unchanged():
+    service = SimulationService()
+    state = service.create_preset("elastic_collision", {})["world_state"]
+    
+    response = FastJSONResponse(state)
+    
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == json.loads(json.dumps(state))
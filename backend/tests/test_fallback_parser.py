@@ -0,0 +1,119 @@
+# backend/tests/test_fallback_parser.py
+import asyncio
+import math
+import pytest
+from app import config
+from app.nlp.fallback_parser import parse_local
+from app.services.simulation_service import SimulationService
+
+def build(text: str):
+    local = parse_local(text)
+    assert local is not None
+    service = SimulationService()
+    assert service.create_from_scenario(local.scenario)["success"]
+    service.start()
+    return local, service
+
+def run_until(service: SimulationService, seconds: float):
+    steps = math.ceil(seconds / service.simulator.dt)
+    service.advance(steps)
+
+def test_projectile_lands_at_expected_range():
+    local, service = build("A ball is thrown at 20 m/s at 30 degrees")
+    assert local.scenario_type == "projectile"
+    assert local.confidence >= config.LOCAL_PARSER_THRESHOLD
+    
+    ball = service.world.objects[0]
+    start_x = ball.position.x
+    flight = 2 * 20 * math.sin(math.radians(30)) / 9.8
+    peak = 0.0
+    while service.world.time < flight - 1e-9:
+        service.advance(1)
+        peak = max(peak, ball.position.y)
+    
+    assert ball.position.x - start_x == pytest.approx(20 ** 2 * math.sin(math.radians(60)) / 9.8, rel=0.05)
+    # The ground nudges a ball launched from y = 0 up by at most its radius
+    assert peak == pytest.approx((20 * 0.5) ** 2 / (2 * 9.8), abs=ball.radius)
+    assert ball.position.x < service.world.width
+    assert local.scenario.duration >= flight
+
+def test_freefall_lands_after_expected_time():
+    local, service = build("A 2 kg ball is dropped from 20 m")
+    assert local.scenario_type == "freefall"
+    assert local.confidence >= config.LOCAL_PARSER_THRESHOLD
+    
+    ball = service.world.objects[0]
+    assert ball.mass == 2
+    while ball.position.y > ball.radius:
+        service.advance(1)
+    assert service.world.time == pytest.approx(math.sqrt(2 * (20 - ball.radius) / 9.8), rel=0.05)
+
+def test_collision_conserves_momentum():
+    local, service = build("A 2 kg ball moving at 3 m/s collides head-on with a 1 kg ball moving at 2 m/s")
+    assert local.scenario_type == "collision"
+    assert local.confidence >= config.LOCAL_PARSER_THRESHOLD
+    
+    a, b = service.world.objects
+    before = a.mass * a.velocity.x + b.mass * b.velocity.x
+    assert a.velocity.x > 0 > b.velocity.x
+    run_until(service, local.scenario.duration)
+    
+    assert a.mass * a.velocity.x + b.mass * b.velocity.x == pytest.approx(before, abs=1e-6)
+    # They met and bounced apart
+    assert a.velocity.x < 0 < b.velocity.x
+
+def test_circular_motion_follows_the_circle():
+    local, service = build("A car moves in a circle of radius 10 m at 5 m/s")
+    assert local.scenario_type == "circular_motion"
+    assert local.confidence >= config.LOCAL_PARSER_THRESHOLD
+    
+    car = service.world.objects[0]
+    center = car.circular_motion.center
+    angles = []
+    for _ in range(8):
+        run_until(service, 0.5)
+        offset = car.position - center
+        assert offset.magnitude() == pytest.approx(10, rel=1e-6)
+        assert car.velocity.magnitude() == pytest.approx(5, rel=1e-6)
+        angles.append(math.atan2(offset.y, offset.x) % (2 * math.pi))
+    
+    # ω = v / r = 0.5 rad/s, so 4 s of motion sweeps about 2 rad
+    assert angles[-1] == pytest.approx(0.5 * service.world.time, abs=0.05)
+    # The whole circle fits in the world
+    assert center.x - 10 >= 0 and center.x + 10 <= service.world.width
+    assert center.y - 10 >= 0 and center.y + 10 <= service.world.height
+
+def test_spring_oscillates_with_hookes_law_period():
+    local, service = build("A 0.5 kg mass on a spring with k = 10 N/m is displaced by 3 m")
+    assert local.scenario_type == "oscillation"
+    assert local.confidence >= config.LOCAL_PARSER_THRESHOLD
+    assert [force.type for force in local.scenario.forces] == ["spring"]
+    
+    mass = service.world.objects[0]
+    assert [type(force).__name__ for force in mass.forces] == ["Spring"]
+    spring = mass.forces[0]
+    equilibrium = spring.anchor.x + spring.rest_length
+    assert mass.position.x - equilibrium == pytest.approx(3)
+    
+    period = 2 * math.pi * math.sqrt(0.5 / 10)
+    lowest = math.inf
+    while service.world.time < period / 2:
+        service.advance(1)
+        lowest = min(lowest, mass.position.x - equilibrium)
+    # Half a period later it is at the other extreme
+    assert lowest == pytest.approx(-3, rel=0.1)
+    
+    run_until(service, period / 2)
+    assert mass.position.x - equilibrium == pytest.approx(3, rel=0.1)
+
+def test_unsupported_setups_are_left_to_the_model():
+    local = parse_local("A 2 kg block slides down a 30 degree incline with friction 0.2")
+    assert local is None or local.confidence < config.LOCAL_PARSER_THRESHOLD
+
+def test_confident_local_parse_skips_the_model(make_parser):
+    parser = make_parser("{}")
+    parsed = asyncio.run(parser.parse("A 0.5 kg mass on a spring with k = 10 N/m is displaced by 3 m"))
+    
+    assert parsed.success
+    assert parsed.scenario.scenario_type == "oscillation"
+    assert parser.fake.prompts == []
@@ -0,0 +1,47 @@
+# backend/tests/test_json_extract.py
+from app.nlp.json_extract import extract_json, iter_json_objects, repair_json
+
+def is_scenario(data: dict) -> bool:
+    return "entities" in data
+
+def test_braces_inside_strings_do_not_count():
+    text = 'Here: {"description": "a } and a { in prose", "n": 1} done'
+    assert list(iter_json_objects(text)) == ['{"description": "a } and a { in prose", "n": 1}']
+
+def test_fenced_json_is_found():
+    text = 'Sure!\n```json\n{"entities": [], "duration": 3}\n```\nLet me know.'
+    assert extract_json(text) == {"entities": [], "duration": 3}
+
+def test_unclosed_brace_does_not_hide_later_objects():
+    text = 'Note {this is prose. Answer: {"entities": []}'
+    assert list(iter_json_objects(text)) == ['{"entities": []}']
+    assert extract_json(text) == {"entities": []}
+
+def test_nested_spans_follow_their_container():
+    text = '{"a": {"b": {}}, "c": {}} {"d": 1}'
+    assert list(iter_json_objects(text)) == [
+        '{"a": {"b": {}}, "c": {}}', '{"b": {}}', "{}", "{}", '{"d": 1}',
+    ]
+
+def test_wrapped_scenario_is_preferred_over_its_wrapper():
+    text = 'Result: {"result": {"scenario_type": "freefall", "entities": [{"name": "ball"}]}}'
+    assert extract_json(text, prefer=is_scenario) == {
+        "scenario_type": "freefall", "entities": [{"name": "ball"}],
+    }
+    assert extract_json(text) == {
+        "result": {"scenario_type": "freefall", "entities": [{"name": "ball"}]},
+    }
+
+def test_echoed_example_is_skipped_for_the_scenario():
+    text = 'Like {"example": true}, here is mine: {"entities": [], "duration": 2}'
+    assert extract_json(text, prefer=is_scenario) == {"entities": [], "duration": 2}
+
+def test_near_json_is_repaired():
+    assert repair_json("{'a': True, 'b': [1, 2,], 'c': None,}") == '{"a": true, "b": [1, 2], "c": null}'
+    assert extract_json("Answer: {'entities': [], 'note': 'it\\'s, fine',}") == {
+        "entities": [], "note": "it's, fine",
+    }
+
+def test_no_object_gives_none():
+    assert extract_json("I could not parse that problem.") is None
+    assert extract_json('{"entities": [') is None
@@ -0,0 +1,88 @@
+# backend/tests/test_parse_cache.py
+import asyncio
+import sqlite3
+import pytest
+from app.nlp import cache as cache_module
+from app.nlp.cache import ParseCache, cache_key, normalize_text
+from app.nlp.schema import SimulationScenario
+from .test_parser import drop
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+    
+    def __call__(self) -> float:
+        self.now += 0.001
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+def scenario(height: float) -> SimulationScenario:
+    return SimulationScenario(**drop(height))
+
+def get(cache: ParseCache, key: str):
+    return asyncio.run(cache.get(key))
+
+def put(cache: ParseCache, key: str, value: SimulationScenario):
+    asyncio.run(cache.put(key, value))
+
+def test_normalization_ignores_case_punctuation_and_spacing():
+    assert normalize_text("A Ball,  dropped from 2.5 m!") == normalize_text("a ball dropped from 2.5 m")
+    assert normalize_text("dropped from 2.5 m") != normalize_text("dropped from 25 m")
+    assert cache_key("m", "v1", "A ball.") == cache_key("m", "v1", "a ball")
+    assert cache_key("m", "v1", "a ball") != cache_key("m", "v2", "a ball")
+
+def test_memory_tier_is_lru(clock):
+    cache = ParseCache(max_entries=2, path=None)
+    put(cache, "a", scenario(1))
+    put(cache, "b", scenario(2))
+    get(cache, "a")
+    put(cache, "c", scenario(3))
+    
+    assert get(cache, "b") is None
+    assert get(cache, "a") == scenario(1)
+    assert get(cache, "c") == scenario(3)
+
+def test_entries_expire_after_ttl(clock, tmp_path):
+    cache = ParseCache(ttl=60, path=str(tmp_path / "cache.db"))
+    put(cache, "a", scenario(1))
+    assert get(cache, "a") is not None
+    
+    clock.now += 61
+    assert get(cache, "a") is None
+    # Nor from disk, for another worker
+    assert get(ParseCache(ttl=60, path=str(tmp_path / "cache.db")), "a") is None
+
+def test_disk_tier_is_shared_and_promoted_to_memory(clock, tmp_path):
+    path = str(tmp_path / "nested" / "cache.db")
+    put(ParseCache(path=path), "a", scenario(7))
+    
+    other = ParseCache(path=path)
+    assert other._memory_get("a") is None
+    assert get(other, "a") == scenario(7)
+    assert other._memory_get("a") is not None
+
+def test_disk_tier_keeps_the_newest_entries(clock, tmp_path):
+    cache = ParseCache(max_entries=0, path=str(tmp_path / "cache.db"), max_disk_entries=2)
+    for i, key in enumerate("abc"):
+        # Trimming runs every 100th write; make the last one trim
+        cache._writes = 100 if key == "c" else 1
+        put(cache, key, scenario(i + 1))
+    
+    assert get(cache, "a") is None
+    assert get(cache, "b") == scenario(2)
+    assert get(cache, "c") == scenario(3)
+
+def test_disk_errors_degrade_to_misses(clock, tmp_path):
+    cache = ParseCache(max_entries=0, path=str(tmp_path / "cache.db"))
+    
+    def fail(*args):
+        raise sqlite3.OperationalError("database is locked")
+    
+    cache._disk_put = cache._disk_get = fail
+    put(cache, "a", scenario(1))
+    assert get(cache, "a") is None
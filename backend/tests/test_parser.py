@@ -0,0 +1,117 @@
+# backend/tests/test_parser.py
+import asyncio
+import time
+import pytest
+from app.nlp import parser as parser_module
+from app.services.simulation_service import SimulationService
+
+def drop(height: float) -> dict:
+    return {
+        "description": f"A 2 kg ball is dropped from {height:g} m off a bridge",
+        "scenario_type": "freefall",
+        "entities": [{
+            "name": "ball", "mass": 2.0, "radius": 0.5,
+            "initial_position": {"x": 50, "y": height}, "initial_velocity": {"x": 0, "y": 0},
+        }],
+        "forces": [{"type": "gravity", "parameters": {"g": 9.8}}],
+        "environment": {"width": 100, "height": 2 * height, "ground_level": 0},
+        "duration": 3.0,
+    }
+
+# Phrased so the local rules aren't confident enough to answer it
+PROBLEM = "A 2 kg ball is dropped from {} m off a bridge; what is the tension in the rope?"
+
+def test_model_parse_is_cached(make_parser):
+    parser = make_parser(drop(10))
+    
+    first = asyncio.run(parser.parse(PROBLEM.format(10)))
+    second = asyncio.run(parser.parse(PROBLEM.format(10)))
+    
+    assert first.success and second.success
+    assert len(parser.fake.prompts) == 1
+    assert second.scenario == first.scenario
+    assert second.scenario is not first.scenario
+
+def test_same_problem_with_other_numbers_uses_template(make_parser):
+    parser = make_parser(drop(10))
+    asyncio.run(parser.parse(PROBLEM.format(10)))
+    
+    parsed = asyncio.run(parser.parse(PROBLEM.format(80)))
+    
+    assert len(parser.fake.prompts) == 1
+    assert parsed.scenario.entities[0].initial_position["y"] == 80
+    assert parsed.scenario.environment["height"] >= 80
+
+def test_parse_cached_never_calls_the_model(make_parser):
+    parser = make_parser(drop(10))
+    assert asyncio.run(parser.parse_cached(PROBLEM.format(10))) is None
+    assert parser.fake.prompts == []
+
+def test_model_circle_is_kept_and_simulated(make_parser):
+    parser = make_parser({
+        "description": "A stone whirled on a string",
+        "scenario_type": "circular_motion",
+        "entities": [{
+            "name": "stone", "radius": 0.5,
+            "initial_position": {"x": 62, "y": 50}, "initial_velocity": {"x": 0, "y": 6},
+            "circular_motion": {"enabled": True, "center": {"x": 50, "y": 50}, "radius": 12, "linear_velocity": 6},
+        }],
+    })
+    parsed = asyncio.run(parser.parse("A stone is whirled on a string, what is the tension?"))
+    
+    assert parsed.scenario.entities[0].circular_motion["radius"] == 12
+    service = SimulationService()
+    service.create_from_scenario(parsed.scenario)
+    service.start()
+    service.advance(100)
+    stone = service.world.objects[0]
+    assert (stone.position - stone.circular_motion.center).magnitude() == pytest.approx(12)
+
+def invalid_then_fixed(prompt: str) -> dict:
+    """An invalid parse, then a valid repair"""
+    scenario = drop(10)
+    if "failed validation" not in prompt:
+        scenario["entities"][0]["initial_position"] = "up"
+    return scenario
+
+def test_repair_is_skipped_once_the_deadline_has_passed(make_parser, monkeypatch):
+    monkeypatch.setattr(parser_module.config, "LLM_DEADLINE", 0.05)
+    
+    def slow(prompt: str) -> dict:
+        time.sleep(0.06)  # Answers, but only after the request's deadline
+        return invalid_then_fixed(prompt)
+    
+    parser = make_parser(slow)
+    parsed = asyncio.run(parser.parse(PROBLEM.format(10)))
+    
+    assert parsed.success  # From the local fallback
+    assert len(parser.fake.prompts) == 1
+
+def test_repair_only_gets_the_remaining_budget(make_parser, monkeypatch):
+    monkeypatch.setattr(parser_module.config, "LLM_DEADLINE", 0.3)
+    parser = make_parser(invalid_then_fixed, delay=0.2)
+    
+    started = time.monotonic()
+    parsed = asyncio.run(parser.parse(PROBLEM.format(10)))
+    
+    assert parsed.success
+    assert len(parser.fake.prompts) == 2
+    assert time.monotonic() - started < 0.38
+
+def test_repair_within_budget_fixes_the_parse(make_parser):
+    parser = make_parser(invalid_then_fixed)
+    parsed = asyncio.run(parser.parse(PROBLEM.format(10)))
+    
+    assert len(parser.fake.prompts) == 2
+    assert parsed.scenario.entities[0].initial_position == {"x": 50, "y": 10}
+
+def test_parse_logs_instead_of_printing(make_parser, capsys, caplog):
+    parser = make_parser(drop(10))
+    
+    with caplog.at_level("DEBUG", logger=parser_module.__name__):
+        asyncio.run(parser.parse(PROBLEM.format(10)))
+    
+    assert capsys.readouterr().out == ""
+    messages = [record.getMessage() for record in caplog.records if record.levelname == "DEBUG"]
+    assert any(message.startswith("Raw LLM response:") for message in messages)
+    assert any(message.startswith("Extracted JSON:") for message in messages)
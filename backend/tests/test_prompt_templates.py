@@ -0,0 +1,45 @@
+# backend/tests/test_prompt_templates.py
+from app.nlp.prompt_templates import (
+    EXAMPLES, PHYSICS_PARSER_PROMPT, PROMPT_PREFIX, RULE_SECTIONS, classify, get_parser_prompt, select_examples
+)
+
+def titles(indexes) -> list:
+    return [EXAMPLES[i][0] for i in indexes]
+
+def test_classifier_tags_problem_families_and_modifiers():
+    assert classify("A ball is thrown at 20 m/s at 30 degrees") == ["projectile", "angle"]
+    assert classify("Two carts collide and stick together") == ["collision", "inelastic"]
+    assert "oscillation" in classify("A pendulum bob swings")
+    assert classify("What is the meaning of life") == []
+
+def test_examples_are_ranked_by_family_first():
+    chosen = select_examples(["projectile", "angle"], 2)
+    assert titles(chosen) == ["Angled Projectile", "Projectile with Drag"]
+    
+    # Family tags outweigh modifiers shared with other families
+    chosen = select_examples(["collision", "drag"], 1)
+    assert EXAMPLES[chosen[0]][1][0] == "collision"
+
+def test_unmatched_problems_get_the_default_examples():
+    assert titles(select_examples([], 3)) == ["Angled Projectile", "Elastic Collision"]
+    assert titles(select_examples([], 1)) == ["Angled Projectile"]
+
+def test_zero_examples_means_all_of_them():
+    assert select_examples(["projectile"], 0) == list(range(len(EXAMPLES)))
+    assert get_parser_prompt("A ball", max_examples=0) == PHYSICS_PARSER_PROMPT.replace("__PROBLEM_TEXT__", "A ball")
+
+def test_prompt_includes_only_relevant_sections_after_a_fixed_prefix():
+    prompt = get_parser_prompt("Two carts collide and stick together", max_examples=2)
+    
+    assert prompt.startswith(PROMPT_PREFIX)
+    assert "Two carts collide and stick together" in prompt
+    assert "__PROBLEM_TEXT__" not in prompt
+    assert RULE_SECTIONS["collision"] in prompt
+    assert RULE_SECTIONS["circular_motion"] not in prompt
+    assert "Perfectly Inelastic Collision" in prompt
+    assert "Circular Motion (CRITICAL)" not in prompt
+    assert len(prompt) < len(PHYSICS_PARSER_PROMPT)
+
+def test_oscillation_brings_the_spring_rules():
+    prompt = get_parser_prompt("A pendulum oscillates", max_examples=1)
+    assert RULE_SECTIONS["spring"] in prompt
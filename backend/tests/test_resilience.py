@@ -0,0 +1,92 @@
+# backend/tests/test_resilience.py
+import asyncio
+import time
+import pytest
+from app.nlp.resilience import CircuitOpenError, ResilientBackend, UnusableResponseError
+from app.services.metrics import metrics
+from .conftest import FakeBackend
+
+def test_caller_deadline_bounds_the_call():
+    backend = ResilientBackend(FakeBackend("{}", delay=0.5), deadline=10.0, hedging=False)
+    
+    async def call():
+        started = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            await backend.generate("prompt", deadline=started + 0.05)
+        return time.monotonic() - started
+    
+    assert asyncio.run(call()) < 0.3
+    # The request ran out of budget; the server isn't at fault
+    assert backend.breaker.failures == 0
+
+def test_own_deadline_still_applies():
+    backend = ResilientBackend(FakeBackend("{}", delay=0.5), deadline=0.05, hedging=False)
+    
+    async def call():
+        with pytest.raises(asyncio.TimeoutError):
+            await backend.generate("prompt", deadline=time.monotonic() + 10.0)
+    
+    asyncio.run(call())
+    assert backend.breaker.failures == 1
+
+def test_repair_latencies_do_not_move_the_hedge_delay():
+    backend = ResilientBackend(FakeBackend("{}"), hedge_delay=8.0, min_hedge_delay=0.0)
+    
+    async def calls():
+        for _ in range(30):
+            await backend.generate("repair this", kind="repair")
+    
+    asyncio.run(calls())
+    assert len(backend.latencies["repair"].samples) == 30
+    assert len(backend.latencies["parse"].samples) == 0
+    assert backend.hedge_after() == 8.0
+    assert backend.hedge_after("repair") < 1.0
+
+class SlowFailure(FakeBackend):
+    """Fails "bad" prompts, after the same delay as good ones"""
+    
+    async def generate(self, prompt: str, schema=None) -> str:
+        await asyncio.sleep(self.delay)
+        if prompt == "bad":
+            raise ConnectionError("reset")
+        return "{}"
+
+def test_only_the_trial_call_ends_the_trial():
+    backend = ResilientBackend(SlowFailure("{}", delay=0.05), hedging=False)
+    backend.breaker.reset_timeout = 0.02
+    
+    async def run():
+        # A call admitted while the circuit was closed...
+        early = asyncio.ensure_future(backend.generate("bad"))
+        await asyncio.sleep(0)
+        for _ in range(backend.breaker.failure_threshold):
+            backend.breaker.record_failure()
+        await asyncio.sleep(0.03)
+        # ...fails while the single half-open trial is running
+        trial = asyncio.ensure_future(backend.generate("trial"))
+        await asyncio.sleep(0.03)
+        with pytest.raises(ConnectionError):
+            await early
+        backend.breaker.opened_at -= backend.breaker.reset_timeout
+        assert backend.breaker.state == "half_open"
+        with pytest.raises(CircuitOpenError):
+            await backend.generate("second trial")
+        await trial
+    
+    asyncio.run(run())
+    assert backend.breaker.state == "closed"
+    assert not backend.breaker.trial_running
+
+def test_unusable_answers_do_not_open_the_circuit():
+    backend = ResilientBackend(FakeBackend("no json here"), accept=lambda text: "{" in text, hedging=False)
+    before = metrics.counter("llm_calls_total", outcome="unusable")
+    
+    async def run():
+        for _ in range(backend.breaker.failure_threshold + 1):
+            with pytest.raises(UnusableResponseError):
+                await backend.generate("p")
+    
+    asyncio.run(run())
+    assert backend.breaker.state == "closed"
+    assert backend.breaker.failures == 0
+    assert metrics.counter("llm_calls_total", outcome="unusable") == before + backend.breaker.failure_threshold + 1
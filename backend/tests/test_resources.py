@@ -0,0 +1,58 @@
+# backend/tests/test_resources.py
+import asyncio
+import time
+from app.services.metrics import metrics
+from app.services.resources import Resources, resources
+from .conftest import FakeBackend
+
+class OpeningBackend(FakeBackend):
+    """Records whether its connections were opened and closed"""
+    
+    def __init__(self):
+        super().__init__("{}")
+        self.opened = self.closed = 0
+    
+    async def open(self):
+        self.opened += 1
+    
+    async def aclose(self):
+        self.closed += 1
+
+def test_startup_without_warmup_leaves_the_parser_unloaded():
+    shared = Resources()
+    asyncio.run(shared.startup(warm_nlp=False))
+    assert shared._parser is None
+    assert shared.status() == "starting"
+
+def test_warm_startup_opens_the_parser_and_shutdown_closes_it(make_parser):
+    shared = Resources()
+    backend = OpeningBackend()
+    shared._parser = make_parser("{}")
+    shared._parser.backend.primary = shared._parser.backend.hedge = backend
+    
+    asyncio.run(shared.startup(warm_nlp=True))
+    shared.ready = True
+    assert backend.opened == 1
+    assert shared.status() == "ready"
+    
+    asyncio.run(shared.shutdown())
+    assert backend.closed == 1
+    assert shared.status() == "starting"
+
+def test_readiness_follows_the_lifespan(client, monkeypatch):
+    assert client.get("/ready").json() == {"status": "ready"}
+    assert client.get("/health").status_code == 200
+    
+    monkeypatch.setattr(resources, "draining", True)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"status": "draining"}
+
+def test_parsers_do_not_register_metrics_collectors(make_parser, monkeypatch):
+    collectors = len(metrics._collectors)
+    parsers = [make_parser("{}") for _ in range(3)]
+    assert len(metrics._collectors) == collectors
+    
+    monkeypatch.setattr(resources, "_parser", parsers[0])
+    parsers[0].backend.breaker.opened_at = time.monotonic()
+    assert metrics.to_dict()["gauges"]["llm_circuit_open"] == 1
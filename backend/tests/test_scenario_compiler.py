@@ -0,0 +1,90 @@
+# backend/tests/test_scenario_compiler.py
+import pytest
+from app.nlp.fallback_parser import parse_local
+from app.physics.vector import Vector
+from app.physics.world import World
+from app.services.scenario_compiler import compiled_worlds, preset_key, scenario_key
+from app.services.simulation_service import SimulationService
+
+SPRING = "A 0.5 kg mass on a spring with k = 10 N/m is displaced by 3 m"
+
+def positions(service: SimulationService) -> list:
+    return [(obj.position.x, obj.position.y) for obj in service.world.objects]
+
+def test_spring_scenario_compiles_and_clones_match_a_fresh_build():
+    compiled_worlds.clear()
+    scenario = parse_local(SPRING).scenario
+    built = SimulationService()
+    built.create_from_scenario(scenario)
+    assert compiled_worlds.get(scenario_key(scenario)) is not None
+    
+    clone = SimulationService()
+    result = clone.create_from_scenario(scenario)
+    
+    assert result["world_state"] == built.world.to_dict()
+    spring = clone.world.objects[0].forces[0]
+    assert type(spring).__name__ == "Spring"
+    assert spring.anchor is not built.world.objects[0].forces[0].anchor
+    for service in (built, clone):
+        service.start()
+        service.advance(150)
+    assert positions(clone) == pytest.approx(positions(built))
+
+def test_clones_do_not_share_state():
+    compiled_worlds.clear()
+    scenario = parse_local(SPRING).scenario
+    SimulationService().create_from_scenario(scenario)
+    
+    first, second = SimulationService(), SimulationService()
+    first_state = first.create_from_scenario(scenario)["world_state"]
+    second_state = second.create_from_scenario(scenario)["world_state"]
+    
+    first_state["objects"][0]["position"]["x"] = -1.0
+    first_state["objects"].clear()
+    assert second_state["objects"][0]["position"]["x"] != -1.0
+    assert compiled_worlds.get(scenario_key(scenario)).state() == second_state
+    
+    first.world.objects[0].position = Vector(0, 0)
+    first.start()
+    first.advance(50)
+    assert second.world.time == 0
+    assert positions(second) == [(o["position"]["x"], o["position"]["y"]) for o in second_state["objects"]]
+
+def test_preset_clones_get_their_own_state():
+    compiled_worlds.clear()
+    SimulationService().create_preset("projectile_motion", {})
+    
+    first = SimulationService().create_preset("projectile_motion", {})["world_state"]
+    second = SimulationService().create_preset("projectile_motion", {})["world_state"]
+    
+    assert first == second
+    assert first is not second
+    assert first["objects"][0] is not second["objects"][0]
+
+def count_serializations(monkeypatch) -> list:
+    calls = []
+    to_dict = World.to_dict
+    
+    def counted(world, *args, **kwargs):
+        calls.append(world)
+        return to_dict(world, *args, **kwargs)
+    
+    monkeypatch.setattr(World, "to_dict", counted)
+    return calls
+
+def test_a_miss_serializes_the_world_once(monkeypatch):
+    compiled_worlds.clear()
+    calls = count_serializations(monkeypatch)
+    scenario = parse_local(SPRING).scenario
+    
+    state = SimulationService().create_from_scenario(scenario)["world_state"]
+    assert len(calls) == 1
+    
+    preset = SimulationService().create_preset("projectile_motion", {})["world_state"]
+    assert len(calls) == 2
+    
+    # The first response is still a copy: changing it leaves the entries alone
+    state["objects"].clear()
+    preset["objects"].clear()
+    assert compiled_worlds.get(scenario_key(scenario)).state()["objects"]
+    assert compiled_worlds.get(preset_key("projectile_motion", {})).state()["objects"]
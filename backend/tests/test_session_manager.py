@@ -0,0 +1,131 @@
+# backend/tests/test_session_manager.py
+import asyncio
+import time
+import pytest
+from app.services.session_manager import SessionManager
+
+def make_manager(**kwargs) -> SessionManager:
+    kwargs.setdefault("max_sessions", 0)
+    kwargs.setdefault("idle_ttl", 0)
+    kwargs.setdefault("hibernate_after", 0)
+    return SessionManager(**kwargs)
+
+def acquire(manager: SessionManager, session_id: str):
+    return asyncio.run(manager.acquire(session_id))
+
+def age(manager: SessionManager, session_id: str, seconds: float):
+    manager.sessions[session_id].last_access = time.monotonic() - seconds
+
+def test_evict_expired_drops_idle_sessions():
+    manager = make_manager(idle_ttl=60)
+    acquire(manager, "old")
+    acquire(manager, "new")
+    age(manager, "old", 120)
+    
+    expired = manager.evict_expired()
+    
+    assert [s.session_id for s in expired] == ["old"]
+    assert list(manager.sessions) == ["new"]
+
+def test_evict_expired_skips_pinned_sessions():
+    manager = make_manager(idle_ttl=60)
+    acquire(manager, "viewer")
+    acquire(manager, "idle")
+    manager.pin("viewer")
+    age(manager, "viewer", 120)
+    age(manager, "idle", 120)
+    
+    expired = manager.evict_expired()
+    
+    assert [s.session_id for s in expired] == ["idle"]
+    assert "viewer" in manager.sessions
+
+def test_unpin_restarts_idle_clock():
+    manager = make_manager(idle_ttl=60)
+    acquire(manager, "a")
+    manager.pin("a")
+    age(manager, "a", 120)
+    manager.unpin("a")
+    
+    assert not manager.in_use("a")
+    assert manager.evict_expired() == []
+
+def test_pins_are_counted():
+    manager = make_manager()
+    manager.pin("a")
+    manager.pin("a")
+    manager.unpin("a")
+    assert manager.in_use("a")
+    manager.unpin("a")
+    assert not manager.in_use("a")
+
+def test_capacity_evicts_least_recently_used_idle_session():
+    manager = make_manager(max_sessions=2)
+    acquire(manager, "a")
+    acquire(manager, "b")
+    manager.pin("a")
+    acquire(manager, "c")
+    
+    assert list(manager.sessions) == ["a", "c"]
+    assert manager.evicted == 1
+
+def test_capacity_never_evicts_sessions_in_use():
+    manager = make_manager(max_sessions=1)
+    manager.pin("a")
+    acquire(manager, "a")
+    manager.pin("b")
+    acquire(manager, "b")
+    
+    assert set(manager.sessions) == {"a", "b"}
+    assert manager.evicted == 0
+
+def test_hibernation_skips_pinned_sessions(tmp_path):
+    from app.services.snapshot import FileSnapshotStore
+    manager = make_manager(hibernation_store=FileSnapshotStore(str(tmp_path)), hibernate_after=60)
+    for session_id in ("viewer", "idle"):
+        acquire(manager, session_id).create_preset("free_fall", {})
+        age(manager, session_id, 120)
+    manager.pin("viewer")
+    
+    asyncio.run(manager.hibernate_idle())
+    
+    assert list(manager.sessions) == ["viewer"]
+    assert manager.hibernated == 1
+
+def test_hibernated_session_wakes_up_where_it_left_off(tmp_path):
+    from app.services.snapshot import FileSnapshotStore
+    store = FileSnapshotStore(str(tmp_path), compress_level=6)
+    manager = make_manager(hibernation_store=store, hibernate_after=60)
+    service = acquire(manager, "sleepy")
+    service.create_preset("elastic_collision", {})
+    service.start()
+    service.advance(40)
+    service.stop()
+    before = service.world.to_dict()
+    age(manager, "sleepy", 120)
+    
+    asyncio.run(manager.hibernate_idle())
+    assert "sleepy" not in manager.sessions
+    assert store.load("sleepy") is not None
+    
+    woken = acquire(manager, "sleepy")
+    
+    assert woken is not service
+    assert woken.world.to_dict() == before
+    assert manager.hibernated == 1 and manager.restored == 1
+    # The local snapshot is consumed on wake-up
+    assert store.load("sleepy") is None
+    woken.start()
+    woken.advance(10)
+    assert woken.world.time > before["time"]
+
+def test_running_sessions_are_not_hibernated(tmp_path):
+    from app.services.snapshot import FileSnapshotStore
+    manager = make_manager(hibernation_store=FileSnapshotStore(str(tmp_path)), hibernate_after=60)
+    acquire(manager, "busy").create_preset("free_fall", {})
+    manager.sessions["busy"].service.start()
+    age(manager, "busy", 120)
+    
+    asyncio.run(manager.hibernate_idle())
+    
+    assert "busy" in manager.sessions
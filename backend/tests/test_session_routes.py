@@ -0,0 +1,37 @@
+# backend/tests/test_session_routes.py
+import json
+from app.services.resources import resources
+from app.services.session_manager import session_manager
+from .test_streaming import PROBLEM, scenario
+
+def test_stream_keeps_its_session_pinned(client, make_parser, monkeypatch):
+    pinned_while_generating = []
+    
+    def respond(prompt: str) -> dict:
+        pinned_while_generating.append(session_manager.in_use("streaming"))
+        return scenario(2)
+    
+    monkeypatch.setattr(resources, "_parser", make_parser(respond, chunk_size=32))
+    
+    response = client.post("/api/simulate/stream", json={"problem_text": PROBLEM}, headers={"X-Session-ID": "streaming"})
+    events = [json.loads(line) for line in response.text.splitlines()]
+    
+    assert events[-1]["type"] == "complete"
+    assert pinned_while_generating == [True]
+    assert not session_manager.in_use("streaming")
+
+def test_websocket_sends_a_minted_session_id(client):
+    with client.websocket_connect("/ws") as ws:
+        greeting = ws.receive_json()
+        assert greeting["type"] == "session"
+        session_id = greeting["session_id"]
+        assert session_id in session_manager.sessions
+    
+    response = client.post("/api/preset", json={"preset_name": "free_fall", "parameters": {}}, headers={"X-Session-ID": session_id})
+    assert response.status_code == 200
+    assert "X-Session-ID" not in response.headers
+
+def test_websocket_with_a_session_id_gets_no_greeting(client):
+    with client.websocket_connect("/ws?session_id=known") as ws:
+        ws.send_json({"type": "subscribe", "detail": "minimal"})
+        assert ws.receive_json()["status"] == "subscribed"
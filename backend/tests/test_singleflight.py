@@ -0,0 +1,95 @@
+# backend/tests/test_singleflight.py
+import asyncio
+from app.nlp.singleflight import SingleFlight
+
+class Call:
+    """A slow call that counts its runs and notices cancellation"""
+    
+    def __init__(self, result="done", delay: float = 0.05):
+        self.result = result
+        self.delay = delay
+        self.runs = 0
+        self.cancelled = False
+    
+    async def __call__(self):
+        self.runs += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+def test_concurrent_callers_share_one_call():
+    flights, call = SingleFlight(), Call()
+    
+    async def run():
+        return await asyncio.gather(*(flights.do("k", call) for _ in range(5)))
+    
+    assert asyncio.run(run()) == ["done"] * 5
+    assert call.runs == 1
+    assert not flights.in_flight("k")
+
+def test_finished_calls_are_forgotten():
+    flights, call = SingleFlight(), Call(delay=0)
+    
+    async def run():
+        await flights.do("k", call)
+        await flights.do("k", call)
+    
+    asyncio.run(run())
+    assert call.runs == 2
+
+def test_errors_reach_every_waiter():
+    flights, call = SingleFlight(), Call(result=ValueError("bad"))
+    
+    async def run():
+        return await asyncio.gather(*(flights.do("k", call) for _ in range(3)), return_exceptions=True)
+    
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert call.runs == 1
+
+def test_a_cancelled_waiter_leaves_the_call_running_for_others():
+    flights, call = SingleFlight(), Call()
+    
+    async def run():
+        first = asyncio.ensure_future(flights.do("k", call))
+        second = asyncio.ensure_future(flights.do("k", call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await asyncio.gather(first, second, return_exceptions=True)
+    
+    first, second = asyncio.run(run())
+    assert isinstance(first, asyncio.CancelledError)
+    assert second == "done"
+    assert not call.cancelled
+
+def test_the_call_is_cancelled_with_its_last_waiter():
+    flights, call = SingleFlight(), Call(delay=1.0)
+    
+    async def run():
+        waiters = [asyncio.ensure_future(flights.do("k", call)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        return flights.in_flight("k")
+    
+    assert asyncio.run(run()) is False
+    assert call.cancelled
+
+def test_parse_waiters_get_independent_copies(make_parser):
+    from .test_parser import PROBLEM, drop
+    parser = make_parser(drop(10), delay=0.02)
+    
+    async def run():
+        return await asyncio.gather(parser.parse(PROBLEM.format(10)), parser.parse(PROBLEM.format(10)))
+    
+    first, second = asyncio.run(run())
+    assert len(parser.fake.prompts) == 1
+    assert first.scenario == second.scenario
+    assert first.scenario is not second.scenario
@@ -0,0 +1,128 @@
+# backend/tests/test_snapshot.py
+import asyncio
+import pytest
+from app.services.session_manager import SessionManager
+from app.services.simulation_service import SimulationService
+from app.services.snapshot import (
+    FileSnapshotStore, SQLiteSnapshotStore, SnapshotError, SnapshotStore,
+    decode_snapshot, encode_snapshot, restore_service, snapshot_service
+)
+
+def running_service(preset: str, steps: int = 25, **params) -> SimulationService:
+    service = SimulationService()
+    assert service.create_preset(preset, params)["success"]
+    service.start()
+    service.advance(steps)
+    return service
+
+def roundtrip(service: SimulationService) -> SimulationService:
+    payload = encode_snapshot(snapshot_service(service))
+    return restore_service(SimulationService(), decode_snapshot(payload))
+
+@pytest.mark.parametrize("preset", [
+    "projectile_motion", "elastic_collision", "circular_motion", "pendulum", "spring_oscillation", "newton_cradle"
+])
+def test_restored_session_continues_identically(preset):
+    original = running_service(preset)
+    restored = roundtrip(original)
+    
+    assert restored.world.to_dict() == original.world.to_dict()
+    assert (restored.world.uid, restored.world.version) == (original.world.uid, original.world.version)
+    
+    original.advance(50)
+    restored.advance(50)
+    assert restored.world.to_dict() == original.world.to_dict()
+
+def test_snapshot_store_is_abstract():
+    with pytest.raises(TypeError):
+        SnapshotStore()
+
+@pytest.fixture(params=["file", "file-gzip", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteSnapshotStore(str(tmp_path / "snapshots.db"))
+    return FileSnapshotStore(str(tmp_path), compress_level=6 if request.param == "file-gzip" else 0)
+
+def test_store_roundtrip(store):
+    assert store.load("a") is None
+    assert store.revision("a") is None
+    
+    revision = store.save("a", b'{"x": 1}')
+    assert store.load("a") == (revision, b'{"x": 1}')
+    assert store.revision("a") == revision
+    
+    store.delete("a")
+    assert store.load("a") is None
+
+def test_back_to_back_saves_get_new_revisions(store):
+    revisions = [store.save("a", f'{{"step": {i}}}'.encode()) for i in range(20)]
+    assert len(set(revisions)) == len(revisions)
+    assert store.revision("a") == revisions[-1]
+
+def test_file_store_keeps_similar_session_ids_apart(tmp_path):
+    store = FileSnapshotStore(str(tmp_path))
+    ids = ["ab", "a/b", "a.b", "../ab", ""]
+    for i, session_id in enumerate(ids):
+        store.save(session_id, str(i).encode())
+    
+    assert [store.load(session_id)[1] for session_id in ids] == [str(i).encode() for i in range(len(ids))]
+    assert all(p.parent == tmp_path for p in tmp_path.iterdir())
+
+def test_file_store_rejects_foreign_files(tmp_path):
+    store = FileSnapshotStore(str(tmp_path))
+    with open(store._path("a"), "wb") as f:
+        f.write(b'{"not": "a snapshot file"}')
+    with pytest.raises(SnapshotError):
+        store.load("a")
+
+def test_other_worker_picks_up_newer_snapshot(tmp_path):
+    store = FileSnapshotStore(str(tmp_path))
+    worker_a = SessionManager(store=store, max_sessions=0, idle_ttl=0, hibernate_after=0)
+    worker_b = SessionManager(store=store, max_sessions=0, idle_ttl=0, hibernate_after=0)
+    
+    async def scenario():
+        service = await worker_a.acquire("s")
+        service.create_preset("free_fall", {})
+        service.start()
+        await worker_a.release("s")
+        
+        # Worker B loads the session and moves it forward twice in a row
+        for _ in range(2):
+            service_b = await worker_b.acquire("s")
+            service_b.advance(10)
+            await worker_b.release("s")
+        
+        # Worker A must see B's latest save, not its own stale copy
+        return await worker_a.acquire("s"), service_b
+    
+    service_a, service_b = asyncio.run(scenario())
+    assert service_a.world.time == pytest.approx(service_b.world.time)
+    assert service_a.world.to_dict() == service_b.world.to_dict()
+
+def test_start_and_stop_reach_the_other_worker(tmp_path):
+    store = FileSnapshotStore(str(tmp_path))
+    worker_a = SessionManager(store=store, max_sessions=0, idle_ttl=0, hibernate_after=0)
+    worker_b = SessionManager(store=store, max_sessions=0, idle_ttl=0, hibernate_after=0)
+    
+    async def scenario():
+        service = await worker_a.acquire("s")
+        service.create_preset("free_fall", {})
+        await worker_a.release("s")
+        
+        # Starting changes no world state, but must still be saved
+        (await worker_a.acquire("s")).start()
+        await worker_a.release("s")
+        
+        started = await worker_b.acquire("s")
+        running = started.simulator.is_running
+        started.advance(10)
+        await worker_b.release("s")
+        
+        (await worker_a.acquire("s")).stop()
+        await worker_a.release("s")
+        return running, started.world.time, (await worker_b.acquire("s")).simulator.is_running
+    
+    running, advanced, still_running = asyncio.run(scenario())
+    assert running
+    assert advanced > 0
+    assert not still_running
@@ -0,0 +1,55 @@
+# backend/tests/test_state_cache.py
+import json
+from app.api.routes import _etag_matches
+from app.services.simulation_service import SimulationService
+from .conftest import create_session
+
+def test_state_is_encoded_once_per_version_and_projection():
+    service = SimulationService()
+    service.create_preset("free_fall", {})
+    
+    etag, body = service.get_state_payload()
+    assert service.get_state_payload() == (etag, body)
+    minimal_etag, minimal = service.get_state_payload("minimal")
+    assert minimal_etag != etag
+    assert json.loads(minimal) == service.world.to_dict("minimal")
+    assert (service.state_cache.misses, service.state_cache.hits) == (2, 1)
+    
+    service.start()
+    service.advance(1)
+    new_etag, new_body = service.get_state_payload()
+    assert new_etag != etag
+    assert json.loads(new_body) == service.world.to_dict()
+
+def test_etag_comparison_is_weak():
+    etag = 'W/"abc-3-0000ffff"'
+    assert _etag_matches(etag, etag)
+    assert _etag_matches('"abc-3-0000ffff"', etag)
+    assert _etag_matches('W/"other", W/"abc-3-0000ffff"', etag)
+    assert _etag_matches("*", etag)
+    assert not _etag_matches('W/"abc-4-0000ffff"', etag)
+    assert not _etag_matches(None, etag)
+    assert not _etag_matches("", etag)
+
+def test_state_route_answers_if_none_match_with_304(client):
+    headers = {"X-Session-ID": create_session(client)}
+    
+    first = client.get("/api/state", headers=headers)
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert etag.startswith('W/"')
+    
+    unchanged = client.get("/api/state", headers={**headers, "If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == etag
+    assert unchanged.content == b""
+    
+    # Another projection of the same version has its own ETag
+    minimal = client.get("/api/state?detail=minimal", headers={**headers, "If-None-Match": etag})
+    assert minimal.status_code == 200
+    
+    client.post("/api/start", headers=headers)
+    client.post("/api/step", json={"num_steps": 1}, headers=headers)
+    changed = client.get("/api/state", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
@@ -0,0 +1,54 @@
+# backend/tests/test_state_projection.py
+import pytest
+from app.physics.object import OBJECT_DETAIL_FIELDS, OBJECT_FIELDS
+from app.physics.world import WORLD_DETAIL_FIELDS, WORLD_FIELDS, resolve_projection
+from app.services.simulation_service import SimulationService
+from .conftest import create_session
+
+@pytest.fixture
+def world():
+    service = SimulationService()
+    service.create_preset("elastic_collision", {})
+    return service.world
+
+@pytest.mark.parametrize("detail", list(WORLD_DETAIL_FIELDS))
+def test_detail_levels_select_their_fields(world, detail):
+    state = world.to_dict(detail)
+    
+    assert tuple(state) == WORLD_DETAIL_FIELDS[detail]
+    for obj in state["objects"]:
+        expected = [f for f in OBJECT_DETAIL_FIELDS[detail] if f != "circular_motion"]
+        assert list(obj) == expected
+
+def test_full_detail_is_the_complete_state(world):
+    state = world.to_dict()
+    assert tuple(state) == WORLD_FIELDS
+    assert world.to_dict("full", list(WORLD_FIELDS + OBJECT_FIELDS)) == state
+
+def test_fields_override_the_detail_level(world):
+    state = world.to_dict("full", ["mass", "total_kinetic_energy"])
+    
+    assert list(state) == ["objects", "time", "total_kinetic_energy"]
+    assert [list(obj) for obj in state["objects"]] == [["id", "mass"]] * len(world.objects)
+    assert state["total_kinetic_energy"] == world.to_dict()["total_kinetic_energy"]
+
+def test_unknown_detail_or_field_is_rejected():
+    with pytest.raises(ValueError, match="detail level"):
+        resolve_projection("everything")
+    with pytest.raises(ValueError, match="bogus"):
+        resolve_projection("full", ["mass", "bogus"])
+
+def test_state_route_projects_and_rejects_unknown_fields(client):
+    session_id = create_session(client)
+    headers = {"X-Session-ID": session_id}
+    
+    minimal = client.get("/api/state?detail=minimal", headers=headers).json()
+    assert list(minimal) == ["objects", "time"]
+    assert set(minimal["objects"][0]) == {"id", "position", "velocity"}
+    
+    projected = client.get("/api/state?fields=mass,gravity_strength", headers=headers).json()
+    assert set(projected) == {"objects", "time", "gravity_strength"}
+    assert set(projected["objects"][0]) == {"id", "mass"}
+    
+    assert client.get("/api/state?fields=bogus", headers=headers).status_code == 400
+    assert client.get("/api/state?detail=everything", headers=headers).status_code == 422
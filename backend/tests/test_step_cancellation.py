@@ -0,0 +1,43 @@
+# backend/tests/test_step_cancellation.py
+import asyncio
+import threading
+import time
+from app.api.routes import _cancel_on_disconnect
+from app.services.simulation_service import SimulationService
+
+class FakeRequest:
+    """Reports a disconnect after ``connected_for`` seconds"""
+    
+    def __init__(self, connected_for: float):
+        self.disconnect_at = time.monotonic() + connected_for
+    
+    async def is_disconnected(self) -> bool:
+        return time.monotonic() >= self.disconnect_at
+
+def test_disconnect_stops_a_long_step_batch():
+    service = SimulationService()
+    service.create_preset("newton_cradle", {"num_balls": 40})
+    cancel_event = threading.Event()
+    
+    async def run():
+        async with _cancel_on_disconnect(FakeRequest(0.05), cancel_event, interval=0.01):
+            return await asyncio.get_running_loop().run_in_executor(
+                None, lambda: service.step(10 ** 7, deadline=time.monotonic() + 30, cancel_event=cancel_event)
+            )
+    
+    started = time.monotonic()
+    state = asyncio.run(run())
+    
+    assert cancel_event.is_set()
+    assert state["truncated"] is True
+    assert time.monotonic() - started < 5
+
+def test_connected_client_is_not_cancelled():
+    cancel_event = threading.Event()
+    
+    async def run():
+        async with _cancel_on_disconnect(FakeRequest(60), cancel_event, interval=0.01):
+            await asyncio.sleep(0.05)
+    
+    asyncio.run(run())
+    assert not cancel_event.is_set()
@@ -0,0 +1,100 @@
+# backend/tests/test_streaming.py
+import asyncio
+import json
+from app.nlp.schema import ParsedProblem, SimulationScenario
+from app.nlp.stream_json import IncrementalScenarioParser
+from app.services.scenario_compiler import compiled_worlds
+from app.services.simulation_service import SimulationService
+
+def scenario(balls: int) -> dict:
+    return {
+        "description": "Balls rolling off a table; what is the tension in the rope?",
+        "scenario_type": "projectile",
+        "entities": [{
+            "name": f"ball {i}", "mass": 1.0, "radius": 0.5,
+            "initial_position": {"x": 10 + i, "y": 20}, "initial_velocity": {"x": 3, "y": 0},
+        } for i in range(balls)],
+        "forces": [{"type": "gravity", "parameters": {"g": 9.8}}],
+        "environment": {"width": 100, "height": 100, "ground_level": 0},
+        "duration": 3.0,
+    }
+
+PROBLEM = "Balls roll off a table; what is the tension in the rope?"
+
+def feed_all(text: str, size: int) -> list:
+    incremental = IncrementalScenarioParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(incremental.feed(text[start:start + size]))
+    return events
+
+def test_incremental_events_do_not_depend_on_chunking():
+    text = "```json\n" + json.dumps(scenario(20)) + "\n```"
+    expected = feed_all(text, len(text))
+    
+    for size in (1, 3, 64):
+        assert feed_all(text, size) == expected
+    assert [e["value"]["name"] for e in expected if e["type"] == "entity"] == [f"ball {i}" for i in range(20)]
+    assert {e["key"] for e in expected if e["type"] == "field"} == set(scenario(1))
+
+def test_incremental_parser_drops_consumed_chunks():
+    text = json.dumps({"description": "x" * 5000, **{k: v for k, v in scenario(1).items() if k != "description"}})
+    incremental = IncrementalScenarioParser()
+    retained = 0
+    for start in range(0, len(text), 16):
+        incremental.feed(text[start:start + 16])
+        retained = max(retained, sum(len(chunk) for _, chunk in incremental.chunks))
+    
+    # Only the value being collected is held, never everything seen so far
+    assert 5000 < retained < 5100
+    assert sum(len(chunk) for _, chunk in incremental.chunks) <= 16
+
+async def collect(service: SimulationService, text: str) -> list:
+    return [event async for event in service.create_from_text_stream(text)]
+
+def test_partial_worlds_are_not_compiled(make_parser):
+    compiled_worlds.clear()
+    parser = make_parser(scenario(3), chunk_size=32)
+    service = SimulationService(parser=parser)
+    
+    events = asyncio.run(collect(service, PROBLEM))
+    
+    assert [e["type"] for e in events].count("partial") >= 2
+    assert events[-1]["type"] == "complete"
+    assert len(compiled_worlds._worlds) == 1
+    assert len(service.current_scenario.entities) == 3
+
+class FailingParser:
+    """Streams one entity, then fails the parse"""
+    
+    async def parse_stream(self, problem_text: str):
+        yield {"type": "entity", "index": 0, "value": scenario(1)["entities"][0]}
+        yield {"type": "done", "parsed": ParsedProblem(success=False, error_message="bad")}
+
+def test_failed_stream_restores_previous_world():
+    service = SimulationService(parser=FailingParser())
+    service.create_from_scenario(SimulationScenario(**scenario(2)))
+    world, previous = service.world, service.current_scenario
+    
+    events = asyncio.run(collect(service, PROBLEM))
+    
+    assert [e["type"] for e in events] == ["partial", "error"]
+    assert service.world is world
+    assert service.current_scenario is previous
+
+def test_identical_streams_share_one_model_call(make_parser):
+    parser = make_parser(scenario(2), delay=0.01, chunk_size=40)
+    
+    async def both():
+        first = SimulationService(parser=parser)
+        second = SimulationService(parser=parser)
+        return await asyncio.gather(collect(first, PROBLEM), collect(second, PROBLEM))
+    
+    first, second = asyncio.run(both())
+    
+    assert len(parser.fake.prompts) == 1
+    assert first[-1]["type"] == second[-1]["type"] == "complete"
+    assert first[-1]["world_state"] == second[-1]["world_state"]
+    # Only the caller that started the stream sees its partial worlds
+    assert any(e["type"] == "partial" for e in first)
+    assert [e["type"] for e in second] == ["complete"]
@@ -0,0 +1,94 @@
+# backend/tests/test_templates.py
+import math
+import pytest
+from app.nlp.schema import SimulationScenario
+from app.nlp.templates import ScenarioTemplate, TemplateCache, skeleton
+from app.services.simulation_service import SimulationService
+
+def drop_scenario(height: float, world_height: float, duration: float) -> SimulationScenario:
+    return SimulationScenario(
+        description=f"A 2 kg ball dropped from {height:g} m",
+        scenario_type="freefall",
+        entities=[{
+            "name": "Ball", "type": "projectile", "mass": 2.0, "radius": 0.5,
+            "initial_position": {"x": 50, "y": height}, "initial_velocity": {"x": 0, "y": 0},
+        }],
+        forces=[{"type": "gravity", "parameters": {"g": 9.8}}],
+        environment={"width": 100, "height": world_height, "ground_level": 0},
+        duration=duration
+    )
+
+def projectile_scenario(speed: float, angle: float) -> SimulationScenario:
+    vx = speed * math.cos(math.radians(angle))
+    vy = speed * math.sin(math.radians(angle))
+    return SimulationScenario(
+        description=f"A ball is launched at {speed:g} m/s at {angle:g} degrees",
+        entities=[{"name": "Ball", "initial_position": {"x": 10, "y": 0}, "initial_velocity": {"x": vx, "y": vy}}],
+        forces=[{"type": "gravity", "parameters": {"g": 9.8}}],
+        environment={"width": 60, "height": 20, "ground_level": 0},
+        duration=4.0
+    )
+
+def test_skeleton_ignores_numbers_but_keeps_units():
+    assert skeleton("Dropped from 10 m") == skeleton("dropped from 500 m")
+    assert skeleton("Dropped from 10 m") != skeleton("Dropped from 10 cm")
+
+def test_instantiate_substitutes_bound_numbers():
+    template = ScenarioTemplate.learn("A 2 kg ball is dropped from 10 m", drop_scenario(10, 20, 3.0))
+    scenario = template.instantiate("A 3 kg ball is dropped from 12 m")
+    
+    entity = scenario.entities[0]
+    assert entity.mass == 3
+    assert entity.initial_position == {"x": 50, "y": 12}
+    assert "12" in scenario.description
+
+@pytest.mark.parametrize("height", [0.5, 12, 500, 20000])
+def test_instantiate_resizes_world_and_duration(height):
+    template = ScenarioTemplate.learn("A 2 kg ball is dropped from 10 m", drop_scenario(10, 20, 3.0))
+    scenario = template.instantiate(f"A 2 kg ball is dropped from {height:g} m")
+    fall_time = math.sqrt(2 * height / 9.8)
+    
+    # The ball starts inside the world, which keeps the model's 2x headroom
+    assert scenario.environment["height"] >= height + 0.5
+    assert scenario.environment["height"] == pytest.approx(max(2 * (height + 0.5) * 20 / 21, height + 0.5), rel=0.05, abs=1)
+    assert scenario.environment["width"] == 100
+    # ... and the run lasts until it lands
+    assert scenario.duration >= fall_time
+    
+    service = SimulationService()
+    assert service.create_from_scenario(scenario)["success"]
+    service.simulator.max_time = scenario.duration + 1
+    service.start()
+    lowest = height
+    while service.world.time < scenario.duration and service.simulator.is_running:
+        service.advance(1)
+        lowest = min(lowest, service.world.objects[0].position.y)
+    # It reaches the ground (and bounces) before the run ends
+    assert lowest <= 0.5 + 1e-6
+
+def test_instantiate_resizes_width_for_longer_range():
+    template = ScenarioTemplate.learn(
+        "A ball is launched at 20 m/s at 30 degrees", projectile_scenario(20, 30)
+    )
+    assert template is not None
+    scenario = template.instantiate("A ball is launched at 80 m/s at 30 degrees")
+    
+    projected_range = 80 ** 2 * math.sin(math.radians(60)) / 9.8
+    assert scenario.environment["width"] >= 10 + projected_range
+    assert scenario.environment["height"] >= (80 * math.sin(math.radians(30))) ** 2 / (2 * 9.8)
+    assert scenario.duration >= 2 * 80 * math.sin(math.radians(30)) / 9.8
+
+def test_explicit_world_size_is_kept():
+    scenario = drop_scenario(10, 30, 3.0)
+    template = ScenarioTemplate.learn("A 2 kg ball is dropped from 10 m in a room 30 m tall", scenario)
+    resized = template.instantiate("A 2 kg ball is dropped from 5 m in a room 30 m tall")
+    assert resized.environment["height"] == 30
+
+def test_template_cache_roundtrip():
+    cache = TemplateCache(max_entries=4)
+    key = TemplateCache.key("model", "v1", "A 2 kg ball is dropped from 10 m")
+    assert cache.learn(key, "A 2 kg ball is dropped from 10 m", drop_scenario(10, 20, 3.0))
+    
+    other = "A 2 kg ball is dropped from 40 m"
+    assert TemplateCache.key("model", "v1", other) == key
+    assert cache.get(key, other).entities[0].initial_position["y"] == 40
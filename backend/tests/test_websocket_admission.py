@@ -0,0 +1,31 @@
+# backend/tests/test_websocket_admission.py
+from app.api import admission
+from app.api.admission import AdmissionController, RateLimiter
+from .conftest import create_session
+
+def test_websocket_steps_are_rate_limited(client, monkeypatch):
+    session_id = create_session(client)
+    monkeypatch.setitem(admission.rate_limiters, "heavy", RateLimiter("heavy", rate=0.001, burst=1))
+    
+    with client.websocket_connect(f"/ws?session_id={session_id}") as ws:
+        ws.send_json({"type": "step"})
+        assert "objects" in ws.receive_json()
+        
+        ws.send_json({"type": "step"})
+        rejected = ws.receive_json()
+        assert rejected["status_code"] == 429
+        assert rejected["retry_after"]
+        
+        # Cheap commands have their own budget
+        ws.send_json({"type": "subscribe", "detail": "minimal"})
+        assert ws.receive_json()["status"] == "subscribed"
+
+def test_websocket_steps_are_shed_when_heavy_class_is_full(client, monkeypatch):
+    session_id = create_session(client)
+    full = AdmissionController("heavy", max_concurrent=1, max_queue=0, queue_timeout=0.1)
+    full._slots._value = 0  # every slot taken by someone else
+    monkeypatch.setitem(admission.controllers, "heavy", full)
+    
+    with client.websocket_connect(f"/ws?session_id={session_id}") as ws:
+        ws.send_json({"type": "step"})
+        assert ws.receive_json()["status_code"] == 503
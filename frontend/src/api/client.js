@@ -2,18 +2,35 @@
 const API_BASE_URL = 'http://localhost:8000/api';
 const WS_URL = 'ws://localhost:8000/ws';
 
+// One simulation session per browser tab, shared by REST calls and the WebSocket
+function getSessionId() {
+  let sessionId = sessionStorage.getItem('simulation_session_id');
+  if (!sessionId) {
+    sessionId = crypto.randomUUID().replace(/-/g, '');
+    sessionStorage.setItem('simulation_session_id', sessionId);
+  }
+  return sessionId;
+}
+
 export class SimulationClient {
   constructor() {
     this.ws = null;
     this.messageHandlers = [];
+    this.sessionId = getSessionId();
+  }
+
+  headers(json = true) {
+    const headers = { 'X-Session-ID': this.sessionId };
+    if (json) {
+      headers['Content-Type'] = 'application/json';
+    }
+    return headers;
   }
 
   async createSimulation(problemText) {
     const response = await fetch(`${API_BASE_URL}/simulate`, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
+      headers: this.headers(),
       body: JSON.stringify({ problem_text: problemText }),
     });
 
@@ -25,12 +42,48 @@ export class SimulationClient {
     return await response.json();
   }
 
+  // Like createSimulation, but calls onEvent with each NDJSON event
+  // ("partial" world states, then "complete" or "error") as it arrives
+  async createSimulationStream(problemText, onEvent) {
+    const response = await fetch(`${API_BASE_URL}/simulate/stream`, {
+      method: 'POST',
+      headers: this.headers(),
+      body: JSON.stringify({ problem_text: problemText }),
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || 'Failed to create simulation');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let last = null;
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      for (const line of lines) {
+        if (line.trim()) {
+          last = JSON.parse(line);
+          onEvent(last);
+        }
+      }
+    }
+
+    if (!last || last.type === 'error') {
+      throw new Error((last && last.error_message) || 'Failed to create simulation');
+    }
+    return last;
+  }
+
   async createPreset(presetName, parameters = {}) {
     const response = await fetch(`${API_BASE_URL}/preset`, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
+      headers: this.headers(),
       body: JSON.stringify({ preset_name: presetName, parameters }),
     });
 
@@ -44,9 +97,7 @@ export class SimulationClient {
   async step(numSteps = 1) {
     const response = await fetch(`${API_BASE_URL}/step`, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
+      headers: this.headers(),
       body: JSON.stringify({ num_steps: numSteps }),
     });
 
@@ -60,6 +111,7 @@ export class SimulationClient {
   async stepOnce() {
     const response = await fetch(`${API_BASE_URL}/step-once`, {
       method: 'POST',
+      headers: this.headers(false),
     });
 
     if (!response.ok) {
@@ -72,9 +124,7 @@ export class SimulationClient {
   async addObject(objectData) {
     const response = await fetch(`${API_BASE_URL}/add-object`, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
+      headers: this.headers(),
       body: JSON.stringify(objectData),
     });
 
@@ -88,9 +138,7 @@ export class SimulationClient {
   async updateParameter(objectId, parameter, value) {
     const response = await fetch(`${API_BASE_URL}/update`, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
+      headers: this.headers(),
       body: JSON.stringify({
         object_id: objectId,
         parameter: parameter,
@@ -108,9 +156,7 @@ export class SimulationClient {
   async updateWorld(settings) {
     const response = await fetch(`${API_BASE_URL}/update-world`, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
+      headers: this.headers(),
       body: JSON.stringify(settings),
     });
 
@@ -124,9 +170,7 @@ export class SimulationClient {
   async setCircularMotion(objectId, center, radius, angularVelocity, initialAngle = 0, enabled = true) {
     const response = await fetch(`${API_BASE_URL}/circular-motion`, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
+      headers: this.headers(),
       body: JSON.stringify({
         object_id: objectId,
         center,
@@ -147,9 +191,7 @@ export class SimulationClient {
   async setCircularMotionRadius(objectId, radius) {
     const response = await fetch(`${API_BASE_URL}/circular-motion-radius`, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
+      headers: this.headers(),
       body: JSON.stringify({
         object_id: objectId,
         radius: radius,
@@ -166,9 +208,7 @@ export class SimulationClient {
   async setCollisionSettings(objectId, collisionType, restitution) {
     const response = await fetch(`${API_BASE_URL}/collision-settings`, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
+      headers: this.headers(),
       body: JSON.stringify({
         object_id: objectId,
         collision_type: collisionType,
@@ -186,6 +226,7 @@ export class SimulationClient {
   async reset() {
     const response = await fetch(`${API_BASE_URL}/reset`, {
       method: 'POST',
+      headers: this.headers(false),
     });
 
     if (!response.ok) {
@@ -198,6 +239,7 @@ export class SimulationClient {
   async start() {
     const response = await fetch(`${API_BASE_URL}/start`, {
       method: 'POST',
+      headers: this.headers(false),
     });
     
     if (!response.ok) {
@@ -210,6 +252,7 @@ export class SimulationClient {
   async stop() {
     const response = await fetch(`${API_BASE_URL}/stop`, {
       method: 'POST',
+      headers: this.headers(false),
     });
     
     if (!response.ok) {
@@ -220,7 +263,9 @@ export class SimulationClient {
   }
 
   async getState() {
-    const response = await fetch(`${API_BASE_URL}/state`);
+    const response = await fetch(`${API_BASE_URL}/state`, {
+      headers: this.headers(false),
+    });
     if (!response.ok) {
       throw new Error('Failed to get state');
     }
@@ -233,7 +278,7 @@ export class SimulationClient {
       this.disconnectWebSocket();
     }
 
-    this.ws = new WebSocket(WS_URL);
+    this.ws = new WebSocket(`${WS_URL}?session_id=${this.sessionId}`);
 
     this.ws.onopen = () => {
       console.log('WebSocket connected');